@@ -11,24 +11,36 @@
 8. לבצע מיזוג תיקיות לפי הרשימה.
 '''
 
-import csv
 import os
-import shutil
-from identify_similarities import similarity_sure
+from collections import defaultdict
+from difflib import SequenceMatcher
+from identify_similarities import similarity_sure, required_similarity, SimilarityCorpus
+from merge_journal import MergeJournal, JOURNAL_NAME, journaled
+from move_engine import MoveEngine
+from singer_aliases import AliasResolver, normalize_hebrew
+from name_index import NameIndex
+
+# סף מינימלי לאשכולות - הסף של similarity_sure יורד מתחת לאפס בשמות ארוכים מאוד
+MIN_CLUSTER_SIMILARITY = 0.5
 
 
 class SingerMerger:
-    def __init__(self, dir_path, file_path):
+    def __init__(self, dir_path, file_path, journal=None, move_engine=None):
         self.dir_path = dir_path
+        # MergeJournal אופציונלי - כל העברה נרשמת ליומן, כך שאפשר להמשיך או לבטל
+        self.journal = journal
+        # שינוי שם באותו כונן, העתקה מקבילית בין כוננים
+        self.move_engine = move_engine or MoveEngine()
         self.file_path = file_path
         self.dir_listing = os.listdir(dir_path)
         self.singer_list = self.read_csv()
         self.similarity_set = set()
+        self._corpus = None
 
     def read_csv(self):
-        with open(self.file_path, 'r') as file:
-            csv_reader = csv.reader(file)
-            return [tuple(row) for row in csv_reader]
+        # אינדקס הכינויים נטען מהמטמון הבינארי כשהקובץ לא השתנה
+        self.alias_resolver = AliasResolver.load(self.file_path)
+        return self.alias_resolver.pairs
 
 
     def check_similarity(self, artist):
@@ -36,7 +48,10 @@ class SingerMerger:
         if not list_dirs:
             return None
 
-        answer, similarity_str = similarity_sure(artist, list_dirs, False)
+        # אינדקס אחד לכל הבדיקות
+        if self._corpus is None:
+            self._corpus = SimilarityCorpus(list_dirs)
+        answer, similarity_str = similarity_sure(artist, self._corpus, False)
         if answer:
             return similarity_str
         else:
@@ -68,28 +83,109 @@ class SingerMerger:
 
         self.merge_folders_by_csv()
 
+    def find_similarity_clusters(self):
+        """
+        קיבוץ תיקיות עם שמות דומים לאשכולות.
+        Each folder name is queried once against a NameIndex with the
+        similarity_sure threshold for its length; similar pairs are joined
+        with union-find. Returns lists of folder names, largest first.
+        """
+        folders_list = [item for item in self.dir_listing if os.path.isdir(os.path.join(self.dir_path, item))]
+        index = NameIndex(folders_list)
 
-    def merge_folders_by_csv(self):
-        os.chdir(self.dir_path)
-        for source_name, target_name in self.singer_list:
-            if source_name == target_name:
+        parent = {name: name for name in folders_list}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for artist in folders_list:
+            threshold = self.cluster_threshold(artist)
+            for score, other in index.neighbors(artist, threshold):
+                parent[find(other)] = find(artist)
+
+        clusters = defaultdict(list)
+        for name in folders_list:
+            clusters[find(name)].append(name)
+        return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=lambda c: (-len(c), c))
+
+    @staticmethod
+    def cluster_threshold(name):
+        return max(required_similarity(name, False), MIN_CLUSTER_SIMILARITY)
+
+    def similar_to_target(self, name, target_name):
+        """
+        True if name is similar to target_name itself. Clusters chain pairs
+        (A~B, B~C), so A and C can be in one cluster without being similar.
+        """
+        threshold = min(self.cluster_threshold(name), self.cluster_threshold(target_name))
+        return SequenceMatcher(None, name, target_name).ratio() >= threshold
+
+    def create_similarity_clusters(self):
+        """מצב אשכולות - שאלה אחת לכל קבוצת שמות דומים, במקום שאלה לכל זוג"""
+        for cluster in self.find_similarity_clusters():
+            print('Found similar names:')
+            for number, name in enumerate(cluster, 1):
+                print(f'  {number}. {name}')
+            print('Enter the number of the folder to merge into, optionally followed by the numbers to merge into it')
+            print('(default: the names similar to it), or Enter to skip.')
+            answer = input(">>> ")
+
+            try:
+                numbers = [int(part) for part in answer.split()]
+                if not numbers:
+                    continue
+                target_name = cluster[numbers[0] - 1]
+                sources = [cluster[n - 1] for n in numbers[1:]]
+            except (ValueError, IndexError):
                 continue
-            if source_name not in self.dir_listing or target_name not in self.dir_listing:
+            if not sources:
+                # ברירת מחדל - רק שמות שדומים ליעד עצמו, לא דרך שם אחר באשכול
+                sources = [name for name in cluster if name != target_name and self.similar_to_target(name, target_name)]
+                for name in cluster:
+                    if name != target_name and name not in sources:
+                        print(f'Skipping "{name}": not similar enough to "{target_name}".')
+
+            for source_name in sources:
+                if source_name != target_name:
+                    self.similarity_set.add((source_name, target_name))
+                    self.merge_folders(source_name, target_name)
+
+        self.merge_folders_by_csv()
+
+
+    def csv_merge_plan(self):
+        """
+        (source folder, target folder) pairs by the aliases in the CSV. The
+        target is the folder named exactly as the canonical name; when there
+        is none, the first of the folders whose name normalizes to it. Every
+        other folder with the same normalized name is merged into it.
+        """
+        # שם מנורמל -> כל התיקיות בשם הזה
+        folders = defaultdict(list)
+        for name in sorted(self.dir_listing):
+            folders[normalize_hebrew(name)].append(name)
+        plan = []
+        for source_name in sorted(self.dir_listing):
+            target = self.alias_resolver.resolve(source_name)
+            if not target:
                 continue
+            candidates = folders.get(normalize_hebrew(target), [])
+            if not candidates:
+                continue
+            target_name = target if target in candidates else candidates[0]
+            if source_name != target_name:
+                plan.append((source_name, target_name))
+        return plan
 
+    def merge_folders_by_csv(self):
+        os.chdir(self.dir_path)
+        for source_name, target_name in self.csv_merge_plan():
             old_path = os.path.join(os.getcwd(), source_name)
             new_path = os.path.join(os.getcwd(), target_name)
-
-            if os.path.exists(old_path) and not os.path.exists(new_path):
-                os.rename(old_path, new_path)
-                print(f"{old_path} -->\n{new_path}")
-            elif os.path.exists(old_path):
-                for filename in os.listdir(old_path):
-                    source_path = os.path.join(old_path, filename)
-                    destination_path = os.path.join(new_path, filename)
-                    shutil.move(source_path, destination_path)
-                print(f"{old_path} -->\n{new_path}")
-                shutil.rmtree(old_path)
+            self.move_folder(old_path, new_path)
 
 
     def merge_folders(self, source_name, target_name):
@@ -100,29 +196,40 @@ class SingerMerger:
 
         old_path = os.path.join(self.dir_path, source_name)
         new_path = os.path.join(self.dir_path, target_name)
+        self.move_folder(old_path, new_path)
 
+    def move_folder(self, old_path, new_path):
+        """העברת תיקיית זמר אל תיקיית היעד, דרך יומן המיזוג"""
         if os.path.exists(old_path) and not os.path.exists(new_path):
-            os.rename(old_path, new_path)
+            journaled(self.journal, 'rename', lambda: os.rename(old_path, new_path), src=old_path, dst=new_path)
             print(f"{old_path} -->\n{new_path}")
         elif os.path.exists(old_path):
-            for filename in os.listdir(old_path):
-                source_path = os.path.join(old_path, filename)
-                destination_path = os.path.join(new_path, filename)
-                shutil.move(source_path, destination_path)
+            pairs = [(os.path.join(old_path, filename), os.path.join(new_path, filename))
+                     for filename in os.listdir(old_path)]
+            report = self.move_engine.move_files(pairs, self.journal)
             print(f"{old_path} -->\n{new_path}")
 
+            # קבצים שלא הועברו (שם תפוס ביעד, שגיאה) נשארים - התיקיה לא נמחקת
+            left = sorted(os.listdir(old_path))
+            if report['failed'] or left:
+                print(f"Keeping {old_path}: {len(left)} items were not moved: {', '.join(left)}")
+                return
             try:
-                shutil.rmtree(old_path)
-            except PermissionError as e:
-                print(f"Permission error: {e}. Skipping directory deletion.")
+                journaled(self.journal, 'rmdir', lambda: os.rmdir(old_path), path=old_path)
+            except OSError as e:
+                print(f"Error removing {old_path}: {e}. Skipping directory deletion.")
 
 
 
 def main():
     dir_path = r'D:\שמע\מסודר מחדש\זמרי שירים בודדים'
     file_path = r"C:\Users\משתמש\AppData\Roaming\singles-sorter\singer-list.csv"
-    singer_merger = SingerMerger(dir_path, file_path)
-    singer_merger.create_similarity_list()
+    journal = MergeJournal(os.path.join(dir_path, JOURNAL_NAME))
+    journal.start()
+    singer_merger = SingerMerger(dir_path, file_path, journal)
+    singer_merger.create_similarity_clusters()
+    singer_merger.move_engine.print_report()
+    journal.finish()
 
 
 if __name__ == '__main__':
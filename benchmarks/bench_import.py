@@ -0,0 +1,73 @@
+"""
+Benchmark: import time of each entry point against a budget.
+
+Imports every entry point in a fresh interpreter with `python -X
+importtime` (best of a few runs, stdin closed so a stray input() fails
+instead of waiting), reports the cumulative import time and the heavy
+modules that were loaded, and exits with 1 when an entry point is over
+its budget or pulls in a module it should load lazily.
+
+    python benchmarks/bench_import.py [runs]
+"""
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# נקודת כניסה -> תקציב במילישניות (זמן ייבוא מצטבר, כולל מודולי הפרויקט)
+BUDGETS_MS = {
+    'find_duplic_albums': 120,
+    'main': 60,
+    'Folder_Merger': 80,
+    'cli': 150,
+    'o1_project/fda_o1': 80,
+    'o1_project/ma_o1': 200,
+    'o1_project/ma_o1_b': 200,
+}
+# מודולים שאסור שייטענו בזמן ייבוא
+LAZY_MODULES = ('numpy', 'PIL.Image', 'sklearn', 'tkinter', 'requests', 'bs4', 'PyQt6')
+
+
+def import_time(entry_point):
+    """(cumulative import time in ms, lazy modules that got imported) for one fresh import."""
+    folder, module = os.path.split(entry_point)
+    code = (f"import sys; sys.path.insert(0, {os.path.join(ROOT, folder)!r}); import {module}; "
+            f"print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONDONTWRITEBYTECODE=''))
+    if result.returncode != 0:
+        raise RuntimeError(f"{entry_point}: {result.stderr.strip().splitlines()[-1]}")
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            loaded = [name for name in result.stdout.strip().split(',') if name]
+            return int(parts[1]) / 1000, loaded
+    raise RuntimeError(f"{entry_point}: no importtime line")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failed = False
+    print(f"{'entry point':<22} {'ms':>8} {'budget':>8}  lazy modules loaded")
+    for entry_point, budget in BUDGETS_MS.items():
+        if not os.path.exists(os.path.join(ROOT, entry_point + '.py')):
+            continue
+        try:
+            timings = [import_time(entry_point) for _ in range(runs)]
+        except RuntimeError as e:
+            print(f"{entry_point:<22} {'error':>8} {budget:>8}  {e}")
+            failed = True
+            continue
+        best = min(ms for ms, _ in timings)
+        loaded = sorted({name for _, names in timings for name in names})
+        over = best > budget or loaded
+        failed = failed or over
+        print(f"{entry_point:<22} {best:>8.1f} {budget:>8}  {', '.join(loaded) or '-'}{'  OVER' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
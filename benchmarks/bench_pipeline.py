@@ -0,0 +1,74 @@
+"""
+Benchmark: the find_duplic_albums pipeline on synthetic libraries.
+
+Generates a library per size with library_generator (tiny payloads) in a
+temporary folder and times each stage of the interactive flow:
+get_file_lists, scan_music_library, find_similar_folders,
+get_folders_quality and MergeFolders.merge. music_data.json is kept in
+the temporary folder, so the repository cache is not touched.
+
+    python benchmarks/bench_pipeline.py [folders ...]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from find_duplic_albums import SelectQuality, MergeFolders
+from library_generator import generate_library
+
+STAGES = ['get_file_lists', 'scan_music_library', 'find_similar_folders', 'get_folders_quality', 'merge']
+
+
+def run_pipeline(root, data_file, preferred_bitrate='high'):
+    """Seconds per stage for one library, and the number of similar pairs."""
+    timings = {}
+
+    def timed(stage, func):
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = func()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    comparer = SelectQuality([root], preferred_bitrate)
+    comparer.DATA_FILE = data_file
+    comparer.music_data = {}
+
+    timed('get_file_lists', comparer.get_file_lists)
+    timed('scan_music_library', comparer.scan_music_library)
+    similar_folders = timed('find_similar_folders', comparer.find_similar_folders)
+    # כמו find_similar_folders_main, בלי ההדפסה
+    comparer.sorted_similar_folders = sorted(
+        (item for item in similar_folders.items() if item[1].get('weighted_score', 0) >= comparer.MINIMAL_SIMILARITY),
+        key=lambda item: item[1]['weighted_score'],
+        reverse=True
+    )
+    organized_info = timed('get_folders_quality', comparer.get_folders_quality)
+    merger = MergeFolders(organized_info, comparer.folder_files, preferred_bitrate, comparer.sorted_similar_folders)
+    timed('merge', merger.merge)
+    return timings, len(comparer.sorted_similar_folders)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20, 100, 400]
+    print(f"{'folders':>8} {'files':>7} {'pairs':>6} " + ' '.join(f"{stage:>21}" for stage in STAGES))
+    for folders in sizes:
+        work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+        try:
+            root = os.path.join(work_dir, 'library')
+            summary = generate_library(root, folders=folders, seed=folders)
+            timings, pairs = run_pipeline(root, os.path.join(work_dir, 'music_data.json'))
+            print(f"{folders:>8} {summary['files']:>7} {pairs:>6} " +
+                  ' '.join(f"{timings[stage]:>20.3f}s" for stage in STAGES))
+        finally:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
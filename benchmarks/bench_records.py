@@ -0,0 +1,89 @@
+"""
+Benchmark: memory of folder_files as dicts against TrackRecord/FolderRecord.
+
+Builds the folder_files of a synthetic library in memory (no files on
+disk): tracks with the fields gather_file_info collects and a metadata
+dict like extract_metadata returns, with artists and albums repeating
+across folders the way they do in a real library. Reports the bytes per
+track of each layout, measured with tracemalloc.
+
+    python benchmarks/bench_records.py [tracks]
+"""
+
+import os
+import sys
+import random
+import hashlib
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from track_records import TrackRecord, FolderRecord
+from library_generator import SINGERS, WORDS, GENRES
+
+TRACKS_PER_FOLDER = 12
+
+
+def fresh(text):
+    # עותק חדש של המחרוזת, כמו ערך שנקרא מקובץ - לא אותו אובייקט בכל רצועה
+    return (text + ' ')[:-1]
+
+
+def track_fields(rng, folder, number):
+    """The values gather_file_info collects for one track."""
+    artist = fresh(SINGERS[folder % len(SINGERS)])
+    album = f"{WORDS[folder % len(WORDS)]} {folder}"
+    title = ' '.join(rng.choice(WORDS) for _ in range(3))
+    bitrate = rng.choice([128, 192, 320])
+    duration = round(rng.uniform(120, 420), 2)
+    metadata = {
+        'title': title, 'artist': fresh(artist), 'album': fresh(album),
+        'tracknumber': f"{number}/{TRACKS_PER_FOLDER}",
+        'genre': fresh(GENRES[folder % len(GENRES)]),
+        'date': str(1990 + folder % 30),
+        'bitrate': bitrate, 'duration': duration,
+    }
+    return dict(file=f"{number:02d} - {title}.mp3", artist=artist, album=album, title=title, bitrate=bitrate,
+                duration=duration, metadata=metadata, file_hash=hashlib.md5(f"{folder}/{number}".encode()).hexdigest(),
+                extension=fresh('.mp3'))
+
+
+def build(tracks, compact, seed=0):
+    rng = random.Random(seed)
+    folder_files = {}
+    for folder in range(tracks // TRACKS_PER_FOLDER):
+        files = []
+        for number in range(1, TRACKS_PER_FOLDER + 1):
+            fields = track_fields(rng, folder, number)
+            files.append(TrackRecord(**fields) if compact else fields)
+        folder_info = dict(files=files, file_similarity=0.4, title_similarity=0.3, album_art=None)
+        folder_files[f"/music/{folder}"] = FolderRecord(**folder_info) if compact else folder_info
+    return folder_files
+
+
+def measure(tracks, compact):
+    tracemalloc.start()
+    folder_files = build(tracks, compact)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, folder_files
+
+
+def main():
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 120000
+    tracks -= tracks % TRACKS_PER_FOLDER
+    dict_size, dict_files = measure(tracks, compact=False)
+    record_size, record_files = measure(tracks, compact=True)
+
+    # אותו תוכן בשתי הצורות
+    for folder, folder_data in dict_files.items():
+        assert [dict(record) for record in record_files[folder]['files']] == folder_data['files']
+
+    print(f"Tracks: {tracks}")
+    print(f"dicts:   {dict_size / tracks:8.0f} bytes/track, {dict_size / 2 ** 20:8.1f} MB")
+    print(f"records: {record_size / tracks:8.0f} bytes/track, {record_size / 2 ** 20:8.1f} MB")
+    print(f"Saved: {1 - record_size / dict_size:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: tag_reader.read_tags against mutagen.File(easy=True).
+
+Builds a corpus of small tagged MP3/FLAC files in a temporary folder,
+checks that both readers agree and prints the time per file.
+
+    python benchmarks/bench_tag_reader.py [num_files]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mutagen import File
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, TRCK, TCON, COMM
+from mutagen.flac import FLAC
+
+from tag_reader import read_tags
+
+# MPEG1 Layer III, 128 kbps, 44.1 kHz, no padding -> 417 bytes per frame
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+FLAC_STREAMINFO = (
+    b'fLaC' + b'\x80\x00\x00\x22' +
+    b'\x10\x00\x10\x00\x00\x00\x00\x00\x00\x00' +
+    # 44100 Hz, 2 channels, 16 bits, 441000 samples (10 seconds)
+    (44100 << 44 | 1 << 41 | 15 << 36 | 441000).to_bytes(8, 'big') +
+    b'\x00' * 16
+)
+
+
+def make_mp3(path, index, frames=200):
+    with open(path, 'wb') as f:
+        f.write(MP3_FRAME * frames)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=f'שיר {index}'))
+    tags.add(TPE1(encoding=1, text='אמן לדוגמה'))
+    tags.add(TALB(encoding=0, text='Album Name'))
+    tags.add(TRCK(encoding=0, text=f'{index % 12 + 1}/12'))
+    tags.add(TCON(encoding=3, text='Pop'))
+    tags.add(COMM(encoding=3, lang='heb', desc='', text='x' * 200))
+    tags.save(path)
+
+
+def make_flac(path, index, payload=40000):
+    with open(path, 'wb') as f:
+        f.write(FLAC_STREAMINFO + b'\x00' * payload)
+    audio = FLAC(path)
+    audio['title'] = f'שיר {index}'
+    audio['artist'] = 'אמן לדוגמה'
+    audio['album'] = 'Album Name'
+    audio['tracknumber'] = str(index % 12 + 1)
+    audio['genre'] = 'Pop'
+    audio.save()
+
+
+def mutagen_fields(path):
+    audio = File(path, easy=True)
+    fields = {key: audio.get(key, [None])[0] for key in ('artist', 'album', 'title', 'tracknumber') if key in audio}
+    fields['bitrate'] = audio.info.bitrate // 1000
+    if audio.info.length > 0:
+        fields['duration'] = round(audio.info.length, 2)
+    return fields
+
+
+def build_corpus(folder, num_files):
+    paths = []
+    for i in range(num_files):
+        path = os.path.join(folder, f'{i:05d}.mp3' if i % 2 == 0 else f'{i:05d}.flac')
+        if path.endswith('.mp3'):
+            make_mp3(path, i)
+        else:
+            make_flac(path, i)
+        paths.append(path)
+    return paths
+
+
+def time_reader(reader, paths, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            reader(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    folder = tempfile.mkdtemp(prefix='bench_tags_')
+    try:
+        paths = build_corpus(folder, num_files)
+
+        mismatches = [p for p in paths if read_tags(p) != mutagen_fields(p)]
+        fallbacks = [p for p in paths if read_tags(p) is None]
+
+        lean_time = time_reader(read_tags, paths)
+        mutagen_time = time_reader(mutagen_fields, paths)
+
+        print(f"Files: {num_files} (mp3 + flac)")
+        print(f"Fallbacks to mutagen: {len(fallbacks)}, mismatches: {len(mismatches)}")
+        print(f"mutagen:    {mutagen_time * 1e6 / num_files:8.1f} us/file")
+        print(f"tag_reader: {lean_time * 1e6 / num_files:8.1f} us/file")
+        print(f"Speedup: {mutagen_time / lean_time:.1f}x")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+עץ BK - חיפוש שכנים לפי מרחק בלי להשוות לכל הפריטים.
+
+A BK-tree indexes keys under a metric (here: Hamming distance between
+64-bit image hashes). search(key, radius) only visits subtrees whose
+edge distance is within radius of the query distance (triangle
+inequality), instead of comparing against every key.
+"""
+
+
+def hamming(a, b):
+    """Number of differing bits between two integers."""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    def __init__(self, distance=hamming):
+        self.distance = distance
+        # צומת: [מפתח, [ערכים], {מרחק: צומת בן}]
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key, value=None):
+        """Insert key with an attached value. Equal keys share one node."""
+        self.size += 1
+        if self.root is None:
+            self.root = [key, [value], {}]
+            return
+        node = self.root
+        while True:
+            d = self.distance(key, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, [value], {}]
+                return
+            node = child
+
+    def search(self, key, radius):
+        """All (distance, key, value) with distance(key, indexed key) <= radius, nearest first."""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node_key, values, children = stack.pop()
+            d = self.distance(key, node_key)
+            if d <= radius:
+                results.extend((d, node_key, value) for value in values)
+            low, high = d - radius, d + radius
+            for edge, child in children.items():
+                if low <= edge <= high:
+                    stack.append(child)
+        results.sort(key=lambda item: item[0])
+        return results
@@ -0,0 +1,410 @@
+"""
+ממשק שורת פקודה - הרצה ללא קלט מהמשתמש (cron, משימות מתוזמנות, מדידות).
+
+    python cli.py <command> [roots ...] [--config FILE] [--json] [options]
+
+Commands:
+    scan      read tags and hashes of every album folder under the roots
+              into the catalog (music_data.json); scanned folders are skipped
+    dupes     list similar folder pairs with their similarity score
+    quality   quality score and breakdown of every album folder
+    merge     merge similar folders into the better copy (journaled, see
+              merge_journal.py undo); --dedup reflinks identical files that
+              are left (--hardlinks uses hardlinks instead, which share
+              tag edits), --singers merges singer folders by singer-list.csv
+    fix-tags  fix jibrish tags, replace "track" in titles and file names,
+              list files without album art
+    report    print the run report saved by the last run
+
+Settings come from a TOML or JSON config file (DEFAULT_CONFIG lists the
+keys); roots given on the command line replace the configured ones.
+With --json the result is one JSON document on stdout and all progress
+output goes to stderr. Every run except report saves its run report
+(run_metrics) next to the catalog, or to --metrics-json.
+
+Exit codes: 0 done, 1 error during the run, 2 bad arguments, config or
+roots, 3 dupes --fail-on-found found similar folders, 130 interrupted.
+"""
+
+import os
+import sys
+import json
+import copy
+import argparse
+import contextlib
+
+from find_duplic_albums import SelectQuality, MergeFolders, SelectAndThrow
+from main import FixNames, MusicManger
+from Folder_Merger import SingerMerger
+from tag_buffer import TagBuffer
+from rename_planner import RenamePlanner
+from merge_journal import MergeJournal, JOURNAL_NAME
+from move_engine import MoveEngine, COPY_WORKERS
+from dedup_links import MANIFEST_NAME
+from run_metrics import RunMetrics, REPORT_NAME
+from tracing import Tracer
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_FOUND = 3
+EXIT_INTERRUPTED = 130
+
+DATA_NAME = 'music_data.json'
+SINGER_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'singer-list.csv')
+
+# מפתחות קובץ ההגדרות וערכי ברירת המחדל. None בנתיבים - קובץ בתיקיית השורש הראשונה
+DEFAULT_CONFIG = {
+    'roots': [],
+    'preferred_bitrate': 'high',  # 'high' או '128'
+    'lean_tags': False,
+    'cover_hash': None,  # 'dhash' / 'phash'
+    'duration_blocking': False,
+    'workers': COPY_WORKERS,  # העתקות מקביליות בין כוננים
+    'thresholds': {
+        'similarity': 0.8,
+        'minimal_similarity': 30.0,
+        'merge_similarity': 85.0,
+    },
+    'cache': {
+        'data_file': None,
+        'singer_csv': SINGER_CSV,
+        'report': None,
+        'journal': None,
+    },
+}
+
+FIX_ACTIONS = {
+    'jibrish': (FixNames, 'fix_jibrish_files'),
+    'track-names': (FixNames, 'fix_track_names'),
+    'albumart': (MusicManger, 'check_albumart'),
+}
+
+
+class ConfigError(Exception):
+    pass
+
+
+def load_config(path=None):
+    """DEFAULT_CONFIG updated from a .toml or .json file."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if not path:
+        return config
+    try:
+        if path.lower().endswith('.toml'):
+            import tomllib
+            with open(path, 'rb') as f:
+                loaded = tomllib.load(f)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+    except ImportError:
+        raise ConfigError("TOML config needs Python 3.11 or later, use a .json config")
+    except Exception as e:
+        raise ConfigError(f"Error reading config file {path}: {e}")
+
+    for key, value in loaded.items():
+        if key not in config:
+            raise ConfigError(f"Unknown config key: {key}")
+        if isinstance(config[key], dict):
+            if not isinstance(value, dict):
+                raise ConfigError(f"Config key {key} must be a table")
+            unknown = set(value) - set(config[key])
+            if unknown:
+                raise ConfigError(f"Unknown config key: {key}.{sorted(unknown)[0]}")
+            config[key].update(value)
+        else:
+            config[key] = value
+    if isinstance(config['roots'], str):
+        config['roots'] = [config['roots']]
+    if config['preferred_bitrate'] not in ('high', '128'):
+        raise ConfigError("preferred_bitrate must be 'high' or '128'")
+    return config
+
+
+def resolve_paths(config, roots=None, need_roots=True):
+    """Apply command line roots, check them and fill in the default cache paths."""
+    if roots:
+        config['roots'] = list(roots)
+    config['roots'] = [os.path.abspath(root) for root in config['roots']]
+    if need_roots and not config['roots']:
+        raise ConfigError("No roots given (command line or 'roots' in the config file)")
+    for root in config['roots']:
+        if need_roots and not os.path.isdir(root):
+            raise ConfigError(f"Root is not a directory: {root}")
+
+    base = config['roots'][0] if config['roots'] else os.getcwd()
+    cache = config['cache']
+    for key, name in (('data_file', DATA_NAME), ('report', REPORT_NAME), ('journal', JOURNAL_NAME)):
+        if not cache[key]:
+            cache[key] = os.path.join(base, name)
+    return config
+
+
+def make_comparer(config, metrics, roots=None):
+    comparer = SelectQuality(roots or config['roots'], config['preferred_bitrate'], lean_tags=config['lean_tags'],
+                             cover_hash=config['cover_hash'], duration_blocking=config['duration_blocking'],
+                             metrics=metrics)
+    # הקטלוג וקובץ הזמרים נטענים בגישה הראשונה - אפשר להחליף את הנתיבים אחרי הבנאי
+    comparer.DATA_FILE = config['cache']['data_file']
+    comparer.CSV_FILE = config['cache']['singer_csv']
+    comparer.SIMILARITY_THRESHOLD = config['thresholds']['similarity']
+    comparer.MINIMAL_SIMILARITY = config['thresholds']['minimal_similarity']
+    return comparer
+
+
+def is_under(path, root):
+    path = os.path.abspath(path)
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def pair_result(folder_pair, similarities):
+    return {
+        'folders': list(folder_pair),
+        'score': similarities.get('weighted_score', 0),
+        'identical': bool(similarities.get('identical')),
+    }
+
+
+def cmd_scan(args, config, metrics):
+    for root in config['roots']:
+        make_comparer(config, metrics, [root]).scan_music_library()
+    with open(config['cache']['data_file'], 'r', encoding='utf-8') as f:
+        music_data = json.load(f)
+    folders = [
+        {'path': folder['path'], 'artist': folder['artist'], 'album': folder['album'], 'files': len(folder['files'])}
+        for folder in music_data.values()
+        if any(is_under(folder['path'], root) for root in config['roots'])
+    ]
+    return {'data_file': config['cache']['data_file'], 'folders': folders}, EXIT_OK
+
+
+def cmd_dupes(args, config, metrics):
+    comparer = make_comparer(config, metrics)
+    comparer.main()
+    pairs = [pair_result(*item) for item in comparer.sorted_similar_folders]
+    return {'pairs': pairs}, EXIT_FOUND if pairs and args.fail_on_found else EXIT_OK
+
+
+def cmd_quality(args, config, metrics):
+    comparer = make_comparer(config, metrics)
+    comparer.get_file_lists()
+    with metrics.stage('quality'):
+        scores = comparer.compute_folders_quality(comparer.folder_files)
+    folders = {folder: {'score': score, 'breakdown': breakdown} for folder, (score, breakdown) in scores.items()}
+    return {'folders': folders}, EXIT_OK
+
+
+def cmd_merge(args, config, metrics):
+    if args.singers:
+        return merge_singers(args, config)
+
+    comparer = make_comparer(config, metrics)
+    comparer.main()
+    organized_info = comparer.get_folders_quality()
+    tag_buffer = TagBuffer()
+    journal = None if args.dry_run else MergeJournal(config['cache']['journal'])
+    merger = MergeFolders(organized_info, comparer.folder_files, config['preferred_bitrate'],
+                          comparer.sorted_similar_folders, tag_buffer, journal, metrics)
+    merger.MINIMUM_SIMILARITY_SCORE_FOR_MERGE = config['thresholds']['merge_similarity']
+
+    pairs = []
+    for folder_pair, similarities in comparer.sorted_similar_folders:
+        pair = pair_result(folder_pair, similarities)
+        if pair['score'] >= merger.MINIMUM_SIMILARITY_SCORE_FOR_MERGE and folder_pair in organized_info:
+            (quality1, _), (quality2, _) = organized_info[folder_pair]
+            pair['preferred'], pair['other'] = merger.decide_preferred_folder(*folder_pair, quality1, quality2)
+        pairs.append(pair)
+    result = {'dry_run': args.dry_run, 'pairs': pairs}
+    if args.dry_run:
+        return result, EXIT_OK
+
+    journal.start()
+    try:
+        merger.merge()
+        result['tags'] = merger.flush_tags()
+    except BaseException:
+        # הריצה נשארת פתוחה ביומן - ההרצה הבאה ממשיכה ממנה
+        journal.close()
+        raise
+    journal.finish()
+    result['merged'] = metrics.counters.get('pairs_merged', 0)
+    result['journal'] = config['cache']['journal']
+    if args.dedup:
+        manifest_path = os.path.join(os.path.dirname(config['cache']['journal']), MANIFEST_NAME)
+        selecter = SelectAndThrow(organized_info, config['preferred_bitrate'], comparer.folder_files)
+        result['bytes_reclaimed'] = selecter.dedup(manifest_path, 'hardlink' if args.hardlinks else 'reflink')
+        result['manifest'] = manifest_path
+    return result, EXIT_OK
+
+
+def merge_singers(args, config):
+    """Merge singer folders directly under each root by the aliases in singer-list.csv."""
+    planned = {}
+    journal = None if args.dry_run else MergeJournal(config['cache']['journal'])
+    if journal is not None:
+        journal.start()
+    cwd = os.getcwd()
+    try:
+        for root in config['roots']:
+            merger = SingerMerger(root, config['cache']['singer_csv'], journal, MoveEngine(workers=config['workers']))
+            # אותה תוכנית כמו merge_folders_by_csv - לפלט ולמצב --dry-run
+            for source_name, target_name in merger.csv_merge_plan():
+                planned[os.path.join(root, source_name)] = os.path.join(root, target_name)
+            if not args.dry_run:
+                merger.merge_folders_by_csv()
+    except BaseException:
+        if journal is not None:
+            journal.close()
+        raise
+    finally:
+        # merge_folders_by_csv משנה את תיקיית העבודה
+        os.chdir(cwd)
+    if journal is not None:
+        journal.finish()
+    return {'dry_run': args.dry_run, 'singers': planned}, EXIT_OK
+
+
+def cmd_fix_tags(args, config, metrics):
+    actions = args.action or ['jibrish']
+    tag_buffer = TagBuffer()
+    planner = RenamePlanner()
+    files = {}
+    for action in actions:
+        cls, method = FIX_ACTIONS[action]
+        files[action] = []
+        for root in config['roots']:
+            manager = cls(root, tag_buffer, planner)
+            manager.list_generator = manager.build_folder_structure()
+            manager.files_procces = set()
+            with metrics.stage(action):
+                processed, _ = getattr(manager, method)()
+            files[action] += sorted(processed)
+            metrics.count('files', len(processed))
+
+    # שינויי השמות קודם - ה-TagBuffer עוקב אחרי הנתיבים החדשים
+    renamed = planner.execute(dry_run=args.dry_run, tag_buffer=tag_buffer)
+    result = {'dry_run': args.dry_run, 'files': files, 'renamed': renamed}
+    if not args.dry_run:
+        result['tags'] = tag_buffer.flush()
+    return result, EXIT_OK
+
+
+def cmd_report(args, config, metrics):
+    path = args.report or config['cache']['report']
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No run report at {path}")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f), EXIT_OK
+
+
+COMMANDS = {
+    'scan': cmd_scan,
+    'dupes': cmd_dupes,
+    'quality': cmd_quality,
+    'merge': cmd_merge,
+    'fix-tags': cmd_fix_tags,
+    'report': cmd_report,
+}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('roots', nargs='*', help="library folders (replace 'roots' from the config file)")
+    common.add_argument('--config', help="TOML or JSON config file")
+    common.add_argument('--json', action='store_true', help="print the result as JSON on stdout, progress on stderr")
+    common.add_argument('--bitrate', choices=['high', '128'], help="preferred bitrate (overrides the config)")
+    common.add_argument('--metrics-json', help="save the run report here instead of next to the catalog")
+    common.add_argument('--prometheus', help="also save the run report in Prometheus text format")
+    common.add_argument('--trace', help="save a Chrome trace of the run")
+
+    parser = argparse.ArgumentParser(description="Music-Automatic batch runs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('scan', parents=[common], help="update the catalog of album folders")
+    dupes = commands.add_parser('dupes', parents=[common], help="list similar folders")
+    dupes.add_argument('--fail-on-found', action='store_true', help=f"exit with {EXIT_FOUND} when similar folders are found")
+    commands.add_parser('quality', parents=[common], help="quality score of every folder")
+    merge = commands.add_parser('merge', parents=[common], help="merge similar folders")
+    merge.add_argument('--dry-run', action='store_true', help="only list what would be merged")
+    merge.add_argument('--dedup', action='store_true', help="link identical files left in the other folder")
+    merge.add_argument('--hardlinks', action='store_true', help="make --dedup use hardlinks instead of reflinks (tag edits then show in both copies)")
+    merge.add_argument('--singers', action='store_true', help="merge singer folders by singer-list.csv instead")
+    fix_tags = commands.add_parser('fix-tags', parents=[common], help="fix tags and file names")
+    fix_tags.add_argument('--action', action='append', choices=sorted(FIX_ACTIONS),
+                          help="fix to run, may be repeated (default: jibrish)")
+    fix_tags.add_argument('--dry-run', action='store_true', help="report changes without writing them")
+    report = commands.add_parser('report', parents=[common], help="print the last run report")
+    report.add_argument('--report', help="report file (default: the configured one)")
+    return parser
+
+
+def _json_default(value):
+    # ערכי numpy ו-set מהציונים ומהתוצאות
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def print_result(result, as_json, out):
+    if as_json:
+        out.write(json.dumps(result, ensure_ascii=False, indent=2, default=_json_default) + "\n")
+        return
+    if not result.get('ok'):
+        out.write(f"Error: {result['error']}\n")
+        return
+    for key, value in result['result'].items():
+        if isinstance(value, (list, dict)):
+            out.write(f"{key}: {len(value)}\n")
+            items = value.items() if isinstance(value, dict) else enumerate(value)
+            for item_key, item in items:
+                out.write(f"  {item if isinstance(value, list) else f'{item_key}: {item}'}\n")
+        else:
+            out.write(f"{key}: {value}\n")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    tracer = Tracer() if args.trace else None
+    metrics = RunMetrics(tracer)
+    result = {'command': args.command, 'ok': False}
+    config = None
+    code = EXIT_ERROR
+
+    # עם --json כל ההדפסות של שלבי העבודה עוברות ל-stderr, ו-stdout נשאר JSON תקין
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        try:
+            config = load_config(args.config)
+            if args.bitrate:
+                config['preferred_bitrate'] = args.bitrate
+            resolve_paths(config, args.roots, need_roots=args.command != 'report')
+            result['result'], code = COMMANDS[args.command](args, config, metrics)
+            result['ok'] = True
+        except ConfigError as e:
+            result['error'] = str(e)
+            code = EXIT_USAGE
+        except KeyboardInterrupt:
+            result['error'] = 'interrupted'
+            code = EXIT_INTERRUPTED
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            code = EXIT_ERROR
+
+        if args.command != 'report' and config is not None and code != EXIT_USAGE:
+            report_path = args.metrics_json or config['cache']['report']
+            metrics.save_json(report_path)
+            result['report'] = report_path
+            if args.prometheus:
+                metrics.save_prometheus(args.prometheus)
+            if tracer is not None:
+                tracer.save(args.trace)
+
+    result['exit_code'] = code
+    print_result(result, args.json, out)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
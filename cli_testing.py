@@ -0,0 +1,169 @@
+# test_cli.py
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from mutagen import File
+
+import cli
+from run_metrics import REPORT_NAME
+from merge_journal import MergeJournal
+
+from library_generator import generate_library
+
+
+class TestCli(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.library_dir = tempfile.mkdtemp()
+        cls.library = generate_library(cls.library_dir, folders=4, tracks=4, duplicate_rate=0.5, flac_rate=0, seed=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.library_dir)
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = {
+            'data_file': os.path.join(self.work_dir, 'music_data.json'),
+            'report': os.path.join(self.work_dir, REPORT_NAME),
+            'journal': os.path.join(self.work_dir, 'journal.jsonl'),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def write_config(self, name, text):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def run_cli(self, *argv):
+        out, err = StringIO(), StringIO()
+        with patch('sys.stdout', out), patch('sys.stderr', err):
+            code = cli.main(list(argv))
+        return code, out.getvalue()
+
+    def json_config(self, **changes):
+        config = {'roots': [self.library_dir], 'cache': self.cache}
+        config.update(changes)
+        return self.write_config('config.json', json.dumps(config))
+
+    def test_dupes_json_output_and_report(self):
+        code, out = self.run_cli('dupes', '--json', '--config', self.json_config())
+        self.assertEqual(code, cli.EXIT_OK)
+        result = json.loads(out)
+        self.assertTrue(result['ok'])
+        found = {frozenset(pair['folders']) for pair in result['result']['pairs']}
+        for original, duplicate in self.library['duplicates']:
+            self.assertIn(frozenset((original, duplicate)), found)
+        self.assertEqual(result['report'], self.cache['report'])
+
+        code, out = self.run_cli('report', '--json', '--config', self.json_config())
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertIn('scoring', json.loads(out)['result']['stages'])
+
+        code, _ = self.run_cli('dupes', '--fail-on-found', '--config', self.json_config())
+        self.assertEqual(code, cli.EXIT_FOUND)
+
+    def test_toml_config_and_quality(self):
+        config = self.write_config('config.toml', f"""
+roots = [{json.dumps(self.library_dir)}]
+preferred_bitrate = "128"
+
+[cache]
+data_file = {json.dumps(self.cache['data_file'])}
+report = {json.dumps(self.cache['report'])}
+""")
+        code, out = self.run_cli('quality', '--json', '--config', config)
+        self.assertEqual(code, cli.EXIT_OK)
+        folders = json.loads(out)['result']['folders']
+        self.assertEqual(set(folders), set(self.library['folders']))
+        self.assertIn('Bitrate Score', next(iter(folders.values()))['breakdown'])
+
+    def test_scan_and_merge_dry_run_leave_the_library(self):
+        before = sorted(os.path.join(root, name) for root, _, files in os.walk(self.library_dir) for name in files)
+        code, out = self.run_cli('scan', '--json', '--config', self.json_config())
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertTrue(os.path.exists(self.cache['data_file']))
+        self.assertEqual(len(json.loads(out)['result']['folders']), len(self.library['folders']))
+
+        config = self.json_config(thresholds={'merge_similarity': 30.0})
+        code, out = self.run_cli('merge', '--dry-run', '--json', '--config', config)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertTrue(any('preferred' in pair for pair in json.loads(out)['result']['pairs']))
+        code, _ = self.run_cli('fix-tags', '--action', 'jibrish', '--action', 'track-names', '--dry-run',
+                               '--config', self.json_config())
+        self.assertEqual(code, cli.EXIT_OK)
+        after = sorted(os.path.join(root, name) for root, _, files in os.walk(self.library_dir) for name in files)
+        self.assertEqual(before, after)
+
+    def own_library(self, **options):
+        # ספרייה נפרדת לבדיקות שמשנות קבצים
+        root = os.path.join(self.work_dir, 'library')
+        generate_library(root, folders=4, tracks=4, duplicate_rate=0.5, flac_rate=0, seed=3, **options)
+        config = {'roots': [root], 'cache': self.cache, 'thresholds': {'merge_similarity': 30.0}}
+        return root, self.write_config('merge.json', json.dumps(config))
+
+    def journal_runs(self):
+        return MergeJournal.runs(MergeJournal.load(self.cache['journal']))
+
+    def test_merge_finishes_the_journal_run(self):
+        _, config = self.own_library()
+        code, out = self.run_cli('merge', '--json', '--config', config)
+        self.assertEqual(code, cli.EXIT_OK)
+        result = json.loads(out)['result']
+        self.assertGreater(result['merged'], 0)
+        self.assertIn('files_saved', result['tags'])
+        runs = self.journal_runs()
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(all(run['finished'] for run in runs.values()))
+
+    def test_interrupted_merge_is_resumed(self):
+        _, config = self.own_library()
+        with patch('find_duplic_albums.MergeFolders.flush_tags', side_effect=KeyboardInterrupt):
+            code, _ = self.run_cli('merge', '--config', config)
+        self.assertEqual(code, cli.EXIT_INTERRUPTED)
+        (run_id, run), = self.journal_runs().items()
+        self.assertFalse(run['finished'])
+
+        # הזוגות לא סומנו כממוזגים לפני שהתגיות נשמרו - ההמשך ממזג אותם שוב
+        code, out = self.run_cli('merge', '--json', '--config', config)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertGreater(json.loads(out)['result']['merged'], 0)
+        runs = self.journal_runs()
+        self.assertEqual(list(runs), [run_id])
+        self.assertTrue(runs[run_id]['finished'])
+
+    def test_fix_tags_writes_the_fixes(self):
+        root, config = self.own_library(jibrish_rate=1.0)
+        code, out = self.run_cli('fix-tags', '--json', '--config', config)
+        self.assertEqual(code, cli.EXIT_OK)
+        result = json.loads(out)['result']
+        self.assertTrue(result['files']['jibrish'])
+        self.assertEqual(result['tags']['files_saved'], len(result['files']['jibrish']))
+        titles = [File(os.path.join(folder, name), easy=True)['title'][0]
+                  for folder, _, files in os.walk(root) for name in files if name.endswith('.mp3')]
+        self.assertTrue(any('שלום' in title for title in titles))
+        self.assertFalse(any('ùìåí' in title for title in titles))
+
+    def test_usage_errors(self):
+        code, out = self.run_cli('dupes', '--json', os.path.join(self.work_dir, 'missing'))
+        self.assertEqual(code, cli.EXIT_USAGE)
+        self.assertFalse(json.loads(out)['ok'])
+        code, _ = self.run_cli('scan', '--config', self.json_config(threads=4))
+        self.assertEqual(code, cli.EXIT_USAGE)
+        code, _ = self.run_cli('report', '--report', os.path.join(self.work_dir, 'none.json'))
+        self.assertEqual(code, cli.EXIT_ERROR)
+        with self.assertRaises(SystemExit):
+            self.run_cli('unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+גיבוב תפיסתי לתמונות עטיפה.
+
+FolderComparer.extract_album_art decodes the whole cover and MD5s the
+pixels, so the same cover saved at another size or JPEG quality never
+matches. Here:
+
+- JPEGs are decoded at reduced scale through Pillow draft mode (the
+  decoder skips most of the DCT work),
+- dhash() / phash() give a 64-bit hash, stored as 16 hex digits,
+- covers are compared by Hamming distance, and CoverIndex (a BK-tree)
+  finds every cover within COVER_DISTANCE bits without comparing all pairs.
+"""
+
+import math
+import hashlib
+
+from lazy_import import lazy_module
+from bk_tree import BKTree, hamming
+
+Image = lazy_module('PIL.Image')
+
+HASH_SIZE = 8  # 8x8 = 64 ביט
+COVER_DISTANCE = 10  # מרחק האמינג מקסימלי לעטיפה "זהה"
+PHASH_SIZE = 32
+HASH_METHODS = ('dhash', 'phash')
+PIXEL_DIGEST_SIZE = (100, 100)
+
+
+def _load_gray(image_path, size):
+    """Open an image decoded at the smallest scale that still covers size, as grayscale."""
+    with Image.open(image_path) as img:
+        # JPEG בלבד: פענוח בקנה מידה 1/2, 1/4 או 1/8
+        img.draft('L', (size[0] * 2, size[1] * 2))
+        return img.convert('L').resize(size, Image.LANCZOS)
+
+
+def dhash(image_path, hash_size=HASH_SIZE):
+    """Difference hash: one bit per horizontally adjacent pixel pair."""
+    img = _load_gray(image_path, (hash_size + 1, hash_size))
+    pixels = img.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def _dct_matrix(n, k):
+    """First k rows of the n-point DCT-II basis."""
+    return [[math.cos(math.pi * (2 * x + 1) * u / (2 * n)) for x in range(n)] for u in range(k)]
+
+
+_DCT = _dct_matrix(PHASH_SIZE, HASH_SIZE)
+
+
+def phash(image_path, hash_size=HASH_SIZE):
+    """DCT hash: the low-frequency 8x8 DCT coefficients compared to their median."""
+    n = PHASH_SIZE
+    img = _load_gray(image_path, (n, n))
+    pixels = img.tobytes()
+    rows = [pixels[r * n:(r + 1) * n] for r in range(n)]
+
+    # DCT נפרד: קודם שורות, אחר כך עמודות, רק hash_size התדרים הנמוכים
+    row_dct = [[sum(b * p for b, p in zip(basis, row)) for basis in _DCT[:hash_size]] for row in rows]
+    coefficients = []
+    for u in range(hash_size):
+        basis = _DCT[u]
+        for v in range(hash_size):
+            coefficients.append(sum(basis[x] * row_dct[x][v] for x in range(n)))
+
+    # מקדם ה-DC (הבהירות הכללית) לא נכנס לחציון
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+def cover_hash(image_path, method='dhash'):
+    """Perceptual hash of an image as 16 hex digits."""
+    value = phash(image_path) if method == 'phash' else dhash(image_path)
+    return f"{value:016x}"
+
+
+def pixel_digest(image_path):
+    """MD5 of the pixels at PIXEL_DIGEST_SIZE: equal for the same image in a file or in the tags."""
+    with Image.open(image_path) as img:
+        return hashlib.md5(img.resize(PIXEL_DIGEST_SIZE).tobytes()).hexdigest()
+
+
+def is_perceptual(hash_str):
+    return isinstance(hash_str, str) and len(hash_str) == HASH_SIZE * HASH_SIZE // 4
+
+
+def cover_distance(hash1, hash2):
+    """Hamming distance between two hex hashes."""
+    return hamming(int(hash1, 16), int(hash2, 16))
+
+
+class CoverIndex:
+    """BK-tree of cover hashes: find covers within a Hamming distance."""
+
+    def __init__(self):
+        self.tree = BKTree(hamming)
+
+    def __len__(self):
+        return len(self.tree)
+
+    def add(self, hash_str, value):
+        self.tree.add(int(hash_str, 16), value)
+
+    def similar(self, hash_str, max_distance=COVER_DISTANCE):
+        """(distance, value) for every indexed cover within max_distance, nearest first."""
+        return [(d, value) for d, key, value in self.tree.search(int(hash_str, 16), max_distance)]
@@ -0,0 +1,76 @@
+# test_cover_hash.py
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from PIL import Image, ImageDraw
+
+from cover_hash import cover_hash, cover_distance, CoverIndex, HASH_METHODS, COVER_DISTANCE
+from find_duplic_albums import FolderComparer
+
+
+def make_cover(seed, path, size, quality=90):
+    random.seed(seed)
+    img = Image.new('RGB', (600, 600), (random.randint(0, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+    for _ in range(25):
+        x, y = random.randint(0, 500), random.randint(0, 500)
+        draw.ellipse([x, y, x + random.randint(20, 200), y + random.randint(20, 200)],
+                     fill=tuple(random.randint(0, 255) for _ in range(3)))
+    img.resize((size, size)).save(path, quality=quality)
+
+
+class TestCoverHash(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, seed, size, quality in [('a/cover.jpg', 1, 600, 95), ('b/folder.jpg', 1, 250, 40), ('c/cover.jpg', 2, 600, 95)]:
+            os.makedirs(os.path.join(self.folder, os.path.dirname(name)))
+            make_cover(seed, os.path.join(self.folder, name), size, quality)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def test_resized_cover_matches(self):
+        for method in HASH_METHODS:
+            big, small, other = (cover_hash(self.path(n), method) for n in ('a/cover.jpg', 'b/folder.jpg', 'c/cover.jpg'))
+            self.assertLessEqual(cover_distance(big, small), COVER_DISTANCE)
+            self.assertGreater(cover_distance(big, other), COVER_DISTANCE)
+
+    def test_index_and_comparer(self):
+        comparer = FolderComparer([self.folder], 'high', cover_hash='dhash')
+        for folder in 'abc':
+            comparer.folder_files[self.path(folder)] = {'files': [], 'album_art': comparer.extract_album_art(self.path(folder))}
+        self.assertEqual(comparer.similar_cover_pairs(), {(self.path('a'), self.path('b'))})
+        # מספר קבצים שונה - הזוג נבדק בזכות העטיפה
+        comparer.folder_files[self.path('b')]['files'] = [{'file': '01.mp3'}]
+        self.assertEqual(comparer.candidate_pairs(), [(self.path('a'), self.path('c')), (self.path('a'), self.path('b'))])
+
+        index = CoverIndex()
+        index.add(comparer.folder_files[self.path('a')]['album_art'], 'a')
+        self.assertEqual([v for d, v in index.similar(comparer.folder_files[self.path('b')]['album_art'])], ['a'])
+        self.assertEqual(comparer.album_art_similarity(comparer.folder_files[self.path('a')]['album_art'],
+                                                       comparer.folder_files[self.path('b')]['album_art']), 1.0)
+
+    def test_shorter_folder_is_not_identical(self):
+        comparer = FolderComparer([self.folder], 'high', cover_hash='dhash')
+
+        def folder(count):
+            return {'files': [{'file': f'{i:02d}.mp3', 'title': f'שיר {i}', 'file_hash': f'h{i}'} for i in range(count)],
+                    'file_similarity': 0.0, 'title_similarity': 0.0, 'album_art': None}
+
+        comparer.folder_files.update({'short': folder(3), 'long': folder(12)})
+        # שלושת הגיבובים הראשונים זהים, אבל לתיקיה הארוכה יש עוד תשע רצועות
+        similarity = comparer.compare_folder_pair('short', 'long')
+        self.assertNotIn('identical', similarity)
+        self.assertEqual(similarity['file_hash'], 0.25)
+        self.assertLess(similarity['weighted_score'], 50.0)
+        self.assertTrue(comparer.compare_folder_pair('long', 'long')['identical'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+איחוד קבצים זהים בקישורים - במקום מחיקה.
+
+For byte-identical files (same file_hash) in two similar folders, the
+copy in the lower-quality folder is replaced by a reflink (copy-on-write
+clone, where the filesystem supports it) to the kept copy, or by a
+hardlink when that is asked for explicitly.
+Space is reclaimed right away and both folder layouts stay intact.
+
+- Files are re-hashed first; a file whose hash changed since the scan is skipped.
+- The swap is atomic (link to a temporary name, then os.replace).
+- Every replacement is written to a JSON manifest; undo_dedup() turns
+  the links back into independent files.
+
+Note: a hardlink shares the data, so an in-place tag edit on one name
+(fix-tags, the tag buffer) shows on the other. That is why hardlinks are
+opt-in only: the default mode skips a file when the filesystem has no
+reflinks instead of falling back to a hardlink. Reflinks don't have this
+problem.
+
+    python dedup_links.py undo <manifest>
+"""
+
+import os
+import sys
+import json
+import uuid
+import shutil
+import hashlib
+import argparse
+
+from move_engine import same_device
+
+MANIFEST_NAME = '.dedup_manifest.json'
+FICLONE = 0x40049409  # Linux ioctl: שכפול copy-on-write (btrfs, xfs)
+
+
+def file_md5(file_path):
+    """MD5 hex digest, as FolderComparer.get_file_hash computes it."""
+    hash_func = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash_func.update(chunk)
+    return hash_func.hexdigest()
+
+
+def reflink(src, dst):
+    """Create dst as a copy-on-write clone of src. Raises OSError if unsupported."""
+    if not sys.platform.startswith('linux'):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def _tmp_name(path):
+    return os.path.join(os.path.dirname(path), f".dedup-{uuid.uuid4().hex}")
+
+
+def link_duplicate(keep_path, dup_path, expected_hash, mode='reflink'):
+    """
+    Replace dup_path with a link to keep_path.
+    mode: 'reflink' (skip when unsupported) or 'hardlink' (opt-in, shares tag edits).
+    Returns a manifest entry, or None if the file was skipped.
+    """
+    try:
+        keep_stat = os.stat(keep_path)
+        dup_stat = os.stat(dup_path)
+    except OSError as e:
+        print(f"Skipping {dup_path}: {e}")
+        return None
+
+    if (keep_stat.st_dev, keep_stat.st_ino) == (dup_stat.st_dev, dup_stat.st_ino):
+        return None  # כבר מקושר
+    if not same_device(keep_path, dup_path):
+        print(f"Skipping {dup_path}: not on the same drive as {keep_path}")
+        return None
+    if keep_stat.st_size != dup_stat.st_size or file_md5(keep_path) != expected_hash or file_md5(dup_path) != expected_hash:
+        print(f"Skipping {dup_path}: file changed since the scan")
+        return None
+
+    tmp = _tmp_name(dup_path)
+    if mode == 'hardlink':
+        try:
+            os.link(keep_path, tmp)
+        except OSError as e:
+            print(f"Skipping {dup_path}: {e}")
+            return None
+    else:
+        # אין נפילה שקטה לקישור קשיח - עריכת תגיות במקום הייתה משנה את שני העותקים
+        try:
+            reflink(keep_path, tmp)
+        except OSError:
+            print(f"Skipping {dup_path}: reflinks not supported here (hardlinks must be asked for)")
+            return None
+
+    os.replace(tmp, dup_path)
+    return {
+        'keep': keep_path,
+        'dup': dup_path,
+        'mode': mode,
+        'hash': expected_hash,
+        # לשחזור: הרשאות וזמני הקובץ המקורי
+        'st_mode': dup_stat.st_mode,
+        'atime': dup_stat.st_atime,
+        'mtime': dup_stat.st_mtime,
+        # קובץ עם כמה שמות לא פינה מקום
+        'bytes_saved': dup_stat.st_size if dup_stat.st_nlink == 1 else 0,
+    }
+
+
+def save_manifest(manifest_path, entries):
+    """Append entries to the manifest file."""
+    existing = load_manifest(manifest_path)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(existing + entries, f, ensure_ascii=False, indent=4)
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def undo_dedup(manifest_path):
+    """Turn every linked duplicate in the manifest back into its own file."""
+    entries = load_manifest(manifest_path)
+    restored = 0
+    remaining = []
+    for entry in reversed(entries):
+        dup_path = entry['dup']
+        try:
+            tmp = _tmp_name(dup_path)
+            # התוכן זהה - עותק עצמאי מחזיר את המצב הקודם
+            shutil.copyfile(dup_path, tmp)
+            os.chmod(tmp, entry['st_mode'] & 0o7777)
+            os.utime(tmp, (entry['atime'], entry['mtime']))
+            os.replace(tmp, dup_path)
+            restored += 1
+        except Exception as e:
+            print(f"Error restoring {dup_path}: {e}")
+            remaining.append(entry)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(list(reversed(remaining)), f, ensure_ascii=False, indent=4)
+    print(f"Restored {restored} of {len(entries)} linked files.")
+    return restored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Undo a hardlink/reflink dedup run")
+    parser.add_argument('command', choices=['undo'])
+    parser.add_argument('manifest', help="dedup manifest file")
+    args = parser.parse_args()
+    undo_dedup(args.manifest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# test_dedup_links.py
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from dedup_links import undo_dedup, load_manifest
+from find_duplic_albums import SelectAndThrow
+
+
+class TestDedupLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.good = os.path.join(self.root, 'good')
+        self.bad = os.path.join(self.root, 'bad')
+        self.manifest = os.path.join(self.root, 'manifest.json')
+        os.makedirs(self.good)
+        os.makedirs(self.bad)
+        files = {'1.mp3': b'a' * 5000, '2.mp3': b'b' * 7000, '3.mp3': b'c' * 3000}
+        self.folder_files = {self.good: {'files': []}, self.bad: {'files': []}}
+        for folder in (self.good, self.bad):
+            for name, data in files.items():
+                with open(os.path.join(folder, name), 'wb') as f:
+                    f.write(data)
+                self.folder_files[folder]['files'].append({'file': name, 'file_hash': hashlib.md5(data).hexdigest()})
+        # קובץ שהשתנה אחרי הסריקה
+        with open(os.path.join(self.bad, '3.mp3'), 'ab') as f:
+            f.write(b'changed')
+        organized_info = {(self.good, self.bad): ((90.0, {}), (70.0, {}))}
+        self.selecter = SelectAndThrow(organized_info, 'high', self.folder_files)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def inode(self, folder, name):
+        return os.stat(os.path.join(folder, name)).st_ino
+
+    def test_dedup_and_undo(self):
+        saved = self.selecter.dedup(self.manifest, mode='hardlink')
+        self.assertEqual(saved, 12000)
+        self.assertEqual(self.inode(self.good, '1.mp3'), self.inode(self.bad, '1.mp3'))
+        self.assertNotEqual(self.inode(self.good, '3.mp3'), self.inode(self.bad, '3.mp3'))
+        self.assertEqual(sorted(os.listdir(self.bad)), ['1.mp3', '2.mp3', '3.mp3'])
+
+        # הרצה חוזרת לא מקשרת שוב
+        self.assertEqual(self.selecter.dedup(self.manifest, mode='hardlink'), 0)
+
+        self.assertEqual(undo_dedup(self.manifest), 2)
+        self.assertNotEqual(self.inode(self.good, '1.mp3'), self.inode(self.bad, '1.mp3'))
+        with open(os.path.join(self.bad, '2.mp3'), 'rb') as f:
+            self.assertEqual(f.read(), b'b' * 7000)
+        self.assertEqual(load_manifest(self.manifest), [])
+
+    def test_no_silent_hardlink_fallback(self):
+        with patch('dedup_links.reflink', side_effect=OSError("not supported")):
+            self.assertEqual(self.selecter.dedup(self.manifest), 0)
+        self.assertNotEqual(self.inode(self.good, '1.mp3'), self.inode(self.bad, '1.mp3'))
+        self.assertEqual(load_manifest(self.manifest), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+חסימה לפי משך - מועמדים להשוואה לפי אורכי הרצועות.
+
+Two copies of an album have the same track lengths, give or take a
+fraction of a second of encoder padding, while names, tags and hashes
+may all differ. A folder's duration signature is its rounded track
+lengths, sorted (file order differs between copies; sorting keeps
+per-track differences within the tolerance). DurationIndex blocks
+folders by (track count, total length bucket), so only folders whose
+signatures can match are compared at all. Folders with a missing
+duration fall back to the old blocking by track count.
+"""
+
+from collections import defaultdict
+
+DURATION_TOLERANCE = 2.0  # שניות
+TOTAL_BUCKET = 10  # שניות לדלי של אורך כולל
+
+
+def round_duration(seconds):
+    return int(round(seconds))
+
+
+def duration_signature(durations):
+    """Sorted rounded lengths, or None if any duration is missing."""
+    if not durations or any(not duration for duration in durations):
+        return None
+    return tuple(sorted(round_duration(duration) for duration in durations))
+
+
+def signatures_match(sig1, sig2, tolerance=DURATION_TOLERANCE):
+    return len(sig1) == len(sig2) and all(abs(a - b) <= tolerance for a, b in zip(sig1, sig2))
+
+
+class DurationIndex:
+    def __init__(self):
+        self.order = {}
+        self.signatures = {}
+        # (מספר רצועות, דלי אורך כולל) -> [מפתחות]
+        self.blocks = defaultdict(list)
+        # מספר רצועות -> מפתחות בלי משך ידוע
+        self.unknown = defaultdict(list)
+        self.sizes = {}
+        self.by_size = defaultdict(list)
+
+    def __len__(self):
+        return len(self.order)
+
+    def add(self, key, durations):
+        self.order[key] = len(self.order)
+        self.sizes[key] = len(durations)
+        self.by_size[len(durations)].append(key)
+        signature = duration_signature(durations)
+        if signature is None:
+            self.unknown[len(durations)].append(key)
+            return
+        self.signatures[key] = signature
+        self.blocks[(len(signature), sum(signature) // TOTAL_BUCKET)].append(key)
+
+    def candidates(self, key):
+        """Keys other than key that could be the same album."""
+        signature = self.signatures.get(key)
+        if signature is None:
+            # משך לא ידוע - כל תיקייה עם אותו מספר רצועות
+            result = [other for other in self.by_size[self.sizes[key]] if other != key]
+        else:
+            bucket = sum(signature) // TOTAL_BUCKET
+            result = list(self.unknown.get(len(signature), []))
+            # ההפרש באורך הכולל קטן מ-n * tolerance, כמה דליים שכנים
+            spread = int(len(signature) * DURATION_TOLERANCE // TOTAL_BUCKET) + 1
+            for neighbour in range(bucket - spread, bucket + spread + 1):
+                for other in self.blocks.get((len(signature), neighbour), ()):
+                    if other != key and signatures_match(signature, self.signatures[other]):
+                        result.append(other)
+        result.sort(key=self.order.get)
+        return result
+
+    def pairs(self):
+        """Candidate pairs (a, b), a added before b, in insertion order."""
+        result = []
+        for key in self.order:
+            position = self.order[key]
+            result.extend((key, other) for other in self.candidates(key) if self.order[other] > position)
+        return result
@@ -0,0 +1,61 @@
+# test_duration_index.py
+import random
+import unittest
+
+from duration_index import DurationIndex, duration_signature, signatures_match
+from find_duplic_albums import FolderComparer
+
+
+class TestDurationIndex(unittest.TestCase):
+
+    def test_signature(self):
+        self.assertEqual(duration_signature([200.4, 180.6, 95.0]), (95, 181, 200))
+        self.assertIsNone(duration_signature([200.4, None]))
+        self.assertTrue(signatures_match((95, 181, 200), (96, 180, 200)))
+        self.assertFalse(signatures_match((95, 181, 200), (95, 181, 210)))
+
+    def test_reencoded_copy_is_a_candidate(self):
+        album = [random.Random(i).uniform(120, 400) for i in range(12)]
+        # קידוד אחר: הבדל קטן בכל רצועה וסדר קבצים אחר
+        copy = [length + 0.05 for length in reversed(album)]
+        other = [length + 30 for length in album]
+
+        index = DurationIndex()
+        index.add('album', album)
+        index.add('other', other)
+        index.add('copy', copy)
+        index.add('short', album[:5])
+        self.assertEqual(index.candidates('album'), ['copy'])
+        self.assertEqual(index.pairs(), [('album', 'copy')])
+
+    def test_unknown_duration_falls_back_to_track_count(self):
+        index = DurationIndex()
+        index.add('a', [100, 200, 300])
+        index.add('b', [100, None, 300])
+        index.add('c', [400, 500, 600])
+        index.add('d', [100, 200])
+        self.assertEqual(index.pairs(), [('a', 'b'), ('b', 'c')])
+
+
+class TestDurationBlocking(unittest.TestCase):
+
+    def folder(self, durations):
+        return {'files': [{'file': f'{i}.mp3', 'duration': d} for i, d in enumerate(durations)],
+                'file_similarity': 0.0, 'title_similarity': 0.0, 'album_art': None}
+
+    def test_candidate_pairs(self):
+        comparer = FolderComparer(['/path/to/music'], 'high')
+        comparer.folder_files.update({
+            'a': self.folder([100, 200, 300]),
+            'b': self.folder([300.4, 100.2, 199.9]),
+            'c': self.folder([150, 250, 350]),
+            'd': self.folder([100, 200]),
+        })
+        self.assertEqual(comparer.candidate_pairs(), [('a', 'b'), ('a', 'c'), ('b', 'c')])
+        comparer.duration_blocking = True
+        self.assertEqual(comparer.candidate_pairs(), [('a', 'b')])
+        self.assertEqual(list(comparer.find_similar_folders()), [('a', 'b')])
+
+
+if __name__ == '__main__':
+    unittest.main()
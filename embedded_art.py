@@ -0,0 +1,213 @@
+"""
+תמונות עטיפה מוטמעות - זיהוי ואיחוד לקובץ צד.
+
+Most tracks carry their cover inside the tags (ID3 APIC, FLAC PICTURE,
+MP4 covr), and the 12 tracks of an album often embed the same 500 KB
+image. This module:
+
+- reads embedded images as raw bytes (no image decoding) and hashes
+  them, so identical embeds are recognized across the album;
+- gives FolderComparer an album_art hash for folders without a side-car
+  cover file, hashed like a side-car file (only this one image is
+  decoded), so the same cover matches either way;
+- optionally moves an image embedded in several tracks of a folder to a
+  single side-car file (cover.jpg / cover.png) and strips it from the
+  tracks, reporting the bytes saved.
+
+    python embedded_art.py <music folder> [--move] [--min-tracks N]
+"""
+
+import io
+import os
+import hashlib
+import argparse
+from collections import defaultdict
+
+from lazy_import import lazy_module
+from tag_padding import PADDING_RESERVE
+from cover_hash import cover_hash, pixel_digest
+
+id3 = lazy_module('mutagen.id3')
+flac = lazy_module('mutagen.flac')
+mp4 = lazy_module('mutagen.mp4')
+
+EMBEDDED_ART_EXTENSIONS = {'.mp3', '.flac', '.m4a', '.mp4'}
+FRONT_COVER = 3  # סוג תמונה "Cover (front)"
+SIDECAR_NAMES = {'image/png': 'cover.png'}
+DEFAULT_SIDECAR = 'cover.jpg'
+
+
+def embedded_pictures(file_path):
+    """Raw embedded images of a track as (data, mime, picture type). Nothing is decoded."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.mp3':
+        try:
+            tags = id3.ID3(file_path)
+        except id3.ID3NoHeaderError:
+            return []
+        return [(frame.data, frame.mime, frame.type) for frame in tags.getall('APIC')]
+    if ext == '.flac':
+        return [(picture.data, picture.mime, picture.type) for picture in flac.FLAC(file_path).pictures]
+    if ext in ('.m4a', '.mp4'):
+        tags = mp4.MP4(file_path).tags or {}
+        return [(bytes(cover), 'image/png' if cover.imageformat == mp4.MP4Cover.FORMAT_PNG else 'image/jpeg', FRONT_COVER)
+                for cover in tags.get('covr', [])]
+    return []
+
+
+def front_cover(pictures):
+    """The front cover if there is one, otherwise the first image."""
+    for picture in pictures:
+        if picture[2] == FRONT_COVER:
+            return picture
+    return pictures[0] if pictures else None
+
+
+def image_digest(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def embedded_art_hash(folder_path, method=None):
+    """
+    Hash of the first embedded front cover in a folder: MD5 of its pixels
+    (as for a side-car file), or a perceptual hash (cover_hash.py) when
+    method is given.
+    """
+    for file in sorted(os.listdir(folder_path)):
+        if os.path.splitext(file)[1].lower() not in EMBEDDED_ART_EXTENSIONS:
+            continue
+        try:
+            picture = front_cover(embedded_pictures(os.path.join(folder_path, file)))
+        except Exception:
+            continue
+        if picture is None:
+            continue
+        try:
+            if method:
+                return cover_hash(io.BytesIO(picture[0]), method)
+            return pixel_digest(io.BytesIO(picture[0]))
+        except Exception:
+            continue
+    return None
+
+
+def _strip_picture(file_path, digest):
+    """Remove embedded images with the given digest and shrink the tag. Returns bytes saved."""
+    size_before = os.path.getsize(file_path)
+    # ריפוד מוגבל - בלי זה המקום שהתפנה נשאר כריפוד והקובץ לא קטן
+    trim = lambda info: min(max(info.padding, 0), PADDING_RESERVE)
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.mp3':
+        tags = id3.ID3(file_path)
+        for frame in tags.getall('APIC'):
+            if image_digest(frame.data) == digest:
+                del tags[frame.HashKey]
+        tags.save(file_path, padding=trim)
+    elif ext == '.flac':
+        audio = flac.FLAC(file_path)
+        keep = [picture for picture in audio.pictures if image_digest(picture.data) != digest]
+        audio.clear_pictures()
+        for picture in keep:
+            audio.add_picture(picture)
+        audio.save(padding=trim)
+    elif ext in ('.m4a', '.mp4'):
+        audio = mp4.MP4(file_path)
+        keep = [cover for cover in audio.tags.get('covr', []) if image_digest(bytes(cover)) != digest]
+        if keep:
+            audio.tags['covr'] = keep
+        else:
+            del audio.tags['covr']
+        audio.save(padding=trim)
+    return size_before - os.path.getsize(file_path)
+
+
+def consolidate_embedded_art(folder_path, min_tracks=2, dry_run=True):
+    """
+    Find images embedded in at least min_tracks tracks of a folder. Unless
+    dry_run, write the image once as a side-car file and strip it from
+    the tracks. Returns {'duplicated_bytes', 'bytes_saved', 'tracks', 'sidecar'}.
+    """
+    report = {'duplicated_bytes': 0, 'bytes_saved': 0, 'tracks': 0, 'sidecar': None}
+    by_digest = defaultdict(list)
+    images = {}
+    for file in sorted(os.listdir(folder_path)):
+        file_path = os.path.join(folder_path, file)
+        if os.path.splitext(file)[1].lower() not in EMBEDDED_ART_EXTENSIONS:
+            continue
+        try:
+            picture = front_cover(embedded_pictures(file_path))
+        except Exception as e:
+            print(f"Error reading embedded art from {file_path}: {e}")
+            continue
+        if picture:
+            digest = image_digest(picture[0])
+            by_digest[digest].append(file_path)
+            images[digest] = picture
+
+    if not by_digest:
+        return report
+    digest, tracks = max(by_digest.items(), key=lambda item: len(item[1]))
+    if len(tracks) < min_tracks:
+        return report
+
+    data, mime, picture_type = images[digest]
+    # כל עותק מעבר לראשון הוא כפילות
+    report['duplicated_bytes'] = len(data) * (len(tracks) - 1)
+    if dry_run:
+        return report
+
+    sidecar = os.path.join(folder_path, SIDECAR_NAMES.get(mime, DEFAULT_SIDECAR))
+    if os.path.exists(sidecar):
+        with open(sidecar, 'rb') as f:
+            if image_digest(f.read()) != digest:
+                print(f"Skipping {folder_path}: {os.path.basename(sidecar)} already holds a different image")
+                return report
+    else:
+        with open(sidecar, 'wb') as f:
+            f.write(data)
+        report['bytes_saved'] -= len(data)
+    report['sidecar'] = sidecar
+
+    for file_path in tracks:
+        try:
+            report['bytes_saved'] += _strip_picture(file_path, digest)
+            report['tracks'] += 1
+        except Exception as e:
+            print(f"Error removing embedded art from {file_path}: {e}")
+    return report
+
+
+def consolidate_library(root_dir, min_tracks=2, dry_run=True):
+    """Run consolidate_embedded_art on every folder under root_dir and print the totals."""
+    totals = {'folders': 0, 'tracks': 0, 'duplicated_bytes': 0, 'bytes_saved': 0}
+    for root, dirs, files in os.walk(root_dir):
+        report = consolidate_embedded_art(root, min_tracks, dry_run)
+        if not report['duplicated_bytes']:
+            continue
+        totals['folders'] += 1
+        totals['tracks'] += report['tracks']
+        totals['duplicated_bytes'] += report['duplicated_bytes']
+        totals['bytes_saved'] += report['bytes_saved']
+        action = 'Duplicated embeds' if dry_run else 'Moved to side-car'
+        print(f"{action} ({report['duplicated_bytes'] / 1024:.0f} KB): {root}")
+
+    if dry_run:
+        print(f"{totals['folders']} folders repeat the same embedded cover: "
+              f"{totals['duplicated_bytes'] / 1024 / 1024:.1f} MB could be saved.")
+    else:
+        print(f"{totals['tracks']} tracks in {totals['folders']} folders: "
+              f"{totals['bytes_saved'] / 1024 / 1024:.1f} MB saved.")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and consolidate duplicated embedded cover art")
+    parser.add_argument('root_dir', help="music folder")
+    parser.add_argument('--move', action='store_true', help="move duplicated embeds to a side-car cover file")
+    parser.add_argument('--min-tracks', type=int, default=2)
+    args = parser.parse_args()
+    consolidate_library(args.root_dir, args.min_tracks, dry_run=not args.move)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# test_embedded_art.py
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from mutagen.id3 import ID3, APIC
+
+from embedded_art import embedded_art_hash, consolidate_embedded_art
+from cover_hash import pixel_digest
+from find_duplic_albums import FolderComparer
+
+from library_generator import write_mp3
+
+
+def jpeg_bytes(seed, size=300):
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (size, size), random.Random(seed).randbytes(size * size * 3)).save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+class TestEmbeddedArt(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cover = jpeg_bytes(1)
+        for i in range(4):
+            path = os.path.join(self.folder, f'{i:02d}.mp3')
+            write_mp3(path, {'title': f'שיר {i}', 'artist': 'אמן', 'album': 'Album Name',
+                             'tracknumber': str(i + 1), 'genre': 'Pop', 'encoding': 3})
+            tags = ID3(path)
+            tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='', data=self.cover))
+            tags.save(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_album_art_from_embedded_cover(self):
+        self.assertEqual(embedded_art_hash(self.folder), pixel_digest(io.BytesIO(self.cover)))
+        comparer = FolderComparer([self.folder], 'high')
+        embedded = comparer.extract_album_art(self.folder)
+        self.assertEqual(embedded, embedded_art_hash(self.folder))
+
+        # אותה עטיפה כקובץ צד בתיקייה אחרת מקבלת אותו גיבוב
+        other = tempfile.mkdtemp(dir=self.folder)
+        with open(os.path.join(other, 'cover.jpg'), 'wb') as f:
+            f.write(self.cover)
+        self.assertEqual(comparer.extract_album_art(other), embedded)
+
+    def test_consolidate_to_sidecar(self):
+        sizes = sum(os.path.getsize(os.path.join(self.folder, f)) for f in os.listdir(self.folder))
+        report = consolidate_embedded_art(self.folder, dry_run=True)
+        self.assertEqual(report['duplicated_bytes'], len(self.cover) * 3)
+        self.assertEqual(report['bytes_saved'], 0)
+
+        report = consolidate_embedded_art(self.folder, dry_run=False)
+        self.assertEqual(report['tracks'], 4)
+        with open(os.path.join(self.folder, 'cover.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), self.cover)
+        after = sum(os.path.getsize(os.path.join(self.folder, f)) for f in os.listdir(self.folder))
+        self.assertEqual(report['bytes_saved'], sizes - after)
+        self.assertGreater(report['bytes_saved'], len(self.cover) * 2)
+        for i in range(4):
+            tags = ID3(os.path.join(self.folder, f'{i:02d}.mp3'))
+            self.assertEqual(tags.getall('APIC'), [])
+            self.assertEqual(str(tags['TIT2']), f'שיר {i}')
+
+
+if __name__ == '__main__':
+    unittest.main()
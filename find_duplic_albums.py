@@ -1,17 +1,37 @@
 import os
-import csv
+import sys
 import json
 import hashlib
 from collections import defaultdict
 from difflib import SequenceMatcher
-from mutagen.easyid3 import EasyID3
-from mutagen import File
-from PIL import Image
 import shutil
 import re
 
+from lazy_import import lazy_module, lazy_callable
+
+from tag_reader import read_tags
+from tag_buffer import TagBuffer
+from tag_padding import padding_policy
+from merge_journal import MergeJournal, JOURNAL_NAME, journaled
+from dedup_links import link_duplicate, save_manifest, MANIFEST_NAME
+from singer_aliases import AliasResolver
+from cover_hash import cover_hash as perceptual_hash, pixel_digest, cover_distance, is_perceptual, CoverIndex, COVER_DISTANCE
+from embedded_art import embedded_art_hash
+from duration_index import DurationIndex, duration_signature
+from scan_progress import ScanProgress
+from run_metrics import RunMetrics, timed_stage, REPORT_NAME
+from tracing import Tracer
+from track_records import TrackRecord, FolderRecord
+from track_features import FeatureTable, contains_hebrew
+
+# mutagen, numpy ו-jibrish_to_hebrew נטענים רק בשימוש הראשון - הייבוא של המודול מהיר
+File = lazy_callable('mutagen', 'File')
+EasyID3 = lazy_callable('mutagen.easyid3', 'EasyID3')
+np = lazy_module('numpy')
+
 # ייבא את הפונקציות לטיפול בטקסט ג'יבריש
-from jibrish_to_hebrew import fix_jibrish, check_jibrish
+fix_jibrish = lazy_callable('jibrish_to_hebrew', 'fix_jibrish')
+check_jibrish = lazy_callable('jibrish_to_hebrew', 'check_jibrish')
 
 # קודי צבע ANSI עבור פלט מסוף
 class colors:
@@ -24,10 +44,24 @@ class colors:
     RESET = '\033[0m'
 
 class FolderComparer:
-    def __init__(self, folder_paths, preferred_bitrate):
+    def __init__(self, folder_paths, preferred_bitrate, lean_tags=False, cover_hash=None, duration_blocking=False, progress=None, metrics=None):
         self.folder_paths = folder_paths
+        # קריאת תגיות רזה (tag_reader) במקום אובייקט mutagen מלא
+        self.lean_tags = lean_tags
+        # 'dhash' / 'phash' - גיבוב תפיסתי לעטיפות במקום MD5 של הפיקסלים
+        self.cover_hash = cover_hash
+        # השוואה רק בין תיקיות שאורכי הרצועות שלהן תואמים
+        self.duration_blocking = duration_blocking
+        # ScanProgress אופציונלי - מונים, זמן משוער וביטול (ממשק גרפי)
+        self.progress = progress or ScanProgress()
+        # RunMetrics - זמן לכל שלב ומונים, לדוח הריצה
+        self.metrics = metrics or RunMetrics()
+        self._lean_cache = {}
         self.folder_files = defaultdict(dict)
-        self.music_data = {}
+        # קובץ הזמרים ומאגר הסריקות נטענים בגישה הראשונה, לא בבנאי
+        self._music_data = None
+        self._artists_map = None
+        self._artist_resolver = None
         self.DATA_FILE = "music_data.json"
         self.CSV_FILE = "singer-list.csv"
         self.ALLOWED_EXTENSIONS = {'.mp3', '.flac', '.wav', '.aac', '.m4a', '.ogg'}
@@ -49,22 +83,49 @@ class FolderComparer:
             'folder_name': 1.5,
             'album_art': 1.0
         }
-        self.artists_map = self.load_artists_from_csv()
         self.preferred_bitrate = preferred_bitrate
-        self.load_music_data()
         self.organized_info = {}
         self.sorted_similar_folders = []
 
+    @property
+    def artists_map(self):
+        if self._artists_map is None:
+            self._artists_map = self.load_artists_from_csv()
+        return self._artists_map
+
+    @artists_map.setter
+    def artists_map(self, value):
+        self._artists_map = value
+
+    @property
+    def artist_resolver(self):
+        if self._artist_resolver is None:
+            self._artists_map = self.load_artists_from_csv()
+        return self._artist_resolver
+
+    @artist_resolver.setter
+    def artist_resolver(self, value):
+        self._artist_resolver = value
+
+    @property
+    def music_data(self):
+        if self._music_data is None:
+            self.load_music_data()
+        return self._music_data
+
+    @music_data.setter
+    def music_data(self, value):
+        self._music_data = value
+
     def load_artists_from_csv(self):
         """Load a list of artists from a CSV file."""
         artists_map = {}
+        # אינדקס כינויים מנורמל (אותיות סופיות, ניקוד, פיסוק) עם מטמון בינארי
+        self.artist_resolver = AliasResolver([])
         try:
-            with open(self.CSV_FILE, mode='r', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if len(row) == 2:
-                        key, value = row
-                        artists_map[key.strip().lower()] = value.strip()
+            self.artist_resolver = AliasResolver.load(self.CSV_FILE)
+            for key, value in self.artist_resolver.pairs:
+                artists_map[key.lower()] = value
         except Exception as e:
             print(f"Error reading CSV file: {e}")
         return artists_map
@@ -93,17 +154,26 @@ class FolderComparer:
     def get_file_hash(self, filepath):
         """Compute MD5 hash for a file."""
         hash_func = hashlib.md5()
+        size = 0
         try:
-            with open(filepath, 'rb') as f:
+            with self.metrics.stage('hash', path=filepath), open(filepath, 'rb') as f:
                 for chunk in iter(lambda: f.read(4096), b""):
                     hash_func.update(chunk)
-                return hash_func.hexdigest()
+                    size += len(chunk)
+            self.metrics.count('bytes_hashed', size)
+            return hash_func.hexdigest()
         except Exception as e:
             print(f"Error hashing file {filepath}: {e}")
             return None
 
+    @timed_stage('tag_parse')
     def extract_metadata(self, filepath):
         """Extract metadata from a music file, including bitrate."""
+        if self.lean_tags:
+            # רק אמן, אלבום, כותרת, מספר רצועה וקצב סיביות. קבצים חריגים עוברים ל-mutagen
+            metadata = read_tags(filepath)
+            if metadata is not None:
+                return metadata
         try:
             audio = File(filepath, easy=True)
             if audio is None:
@@ -116,11 +186,16 @@ class FolderComparer:
                 metadata['bitrate'] = audio.info.bitrate // 1000  # קצב סיביות ב-kbps
             else:
                 metadata['bitrate'] = None
+            # משך מתוך פרטי הזרם, בלי פענוח
+            length = getattr(audio.info, 'length', None) if audio.info else None
+            if isinstance(length, (int, float)) and length > 0:
+                metadata['duration'] = round(length, 2)
             return metadata
         except Exception as e:
             print(f"Error extracting metadata from {filepath}: {e}")
             return {}
 
+    @timed_stage('cover')
     def extract_album_art(self, folder_path):
         """Extract hash of the album art image."""
         album_art_files = {'cd cover.jpg', 'album cover.jpg', 'albumartsmall.jpg', 'cover.jpg', 'folder.jpg', 'cover.png'}
@@ -128,13 +203,40 @@ class FolderComparer:
             if file.lower() in album_art_files:
                 try:
                     img_path = os.path.join(folder_path, file)
-                    with Image.open(img_path) as img:
-                        img = img.resize((100, 100))  # שנה את הגודל לגודל סטנדרטי
-                        img_bytes = img.tobytes()
-                        return hashlib.md5(img_bytes).hexdigest()
+                    if self.cover_hash:
+                        return perceptual_hash(img_path, self.cover_hash)
+                    # פיקסלים בגודל סטנדרטי - כמו עטיפה מוטמעת, כדי שאותה תמונה תתאים
+                    return pixel_digest(img_path)
                 except Exception as e:
                     print(f"Error processing image {file} in {folder_path}: {e}")
-        return None
+        # אין קובץ עטיפה - תמונה מוטמעת בשירים (APIC/covr), בלי פענוח
+        return embedded_art_hash(folder_path, self.cover_hash)
+
+    def album_art_similarity(self, art1, art2):
+        """1.0 for the same cover: equal hashes, or perceptual hashes within COVER_DISTANCE bits."""
+        if not art1 or not art2:
+            return 0.0
+        if art1 == art2:
+            return 1.0
+        if is_perceptual(art1) and is_perceptual(art2):
+            return 1.0 if cover_distance(art1, art2) <= COVER_DISTANCE else 0.0
+        return 0.0
+
+    def similar_cover_pairs(self, max_distance=COVER_DISTANCE):
+        """
+        Folder pairs whose covers are within max_distance bits, found through
+        a BK-tree instead of comparing every pair. A cheap candidate key.
+        """
+        index = CoverIndex()
+        pairs = set()
+        for folder_path, folder_data in self.folder_files.items():
+            art = folder_data.get('album_art')
+            if not is_perceptual(art):
+                continue
+            for distance, other_folder in index.similar(art, max_distance):
+                pairs.add((other_folder, folder_path))
+            index.add(art, folder_path)
+        return pairs
 
     def scan_music_library(self):
         """Scan the music library and collect data."""
@@ -145,6 +247,7 @@ class FolderComparer:
                 continue  # Skip folders without music files
 
             folder_hash = hashlib.md5(root.encode('utf-8')).hexdigest()
+            self.metrics.hit('folder_cache', folder_hash in self.music_data)
             if folder_hash in self.music_data:
                 print(f"Skipping already scanned folder: {root}")
                 continue  # Skip already scanned folders
@@ -152,6 +255,7 @@ class FolderComparer:
             metadata_list = []
             for file in music_files:
                 filepath = os.path.join(root, file)
+                self.metrics.count('files')
                 file_metadata = self.extract_metadata(filepath)
 
                 # Check for gibberish metadata and fix if necessary
@@ -181,14 +285,12 @@ class FolderComparer:
                     break
 
             # Check if artist name is in the CSV map
-            if artist and artist.lower() in self.artists_map:
-                artist = self.artists_map[artist.lower()]
+            if artist:
+                artist = self.artist_resolver.resolve(artist) or artist
 
             # If artist not set from metadata, set it from parent folder name in CSV
             if not artist:
-                parent_folder_lower = parent_folder.lower()
-                if parent_folder_lower in self.artists_map:
-                    artist = self.artists_map[parent_folder_lower]
+                artist = self.artist_resolver.resolve(parent_folder)
 
             # Set album name only if it exists in metadata
             for file_meta in metadata_list:
@@ -204,22 +306,26 @@ class FolderComparer:
                 'artist': artist,
                 'album': album,
                 'files': metadata_list,
-                'album_art': album_art_hash
+                'album_art': album_art_hash,
+                'duration_signature': duration_signature([file_meta['metadata'].get('duration') for file_meta in metadata_list])
             }
             print(f"Scanned folder: {root}")
 
         self.save_music_data()
 
+    @timed_stage('folder')
     def gather_file_info(self, folder_path, files_in_dir):
         """
         Collect information about files within a folder.
         """
+        self._lean_cache.clear()
+
         # Extract titles from the files
         titles = []
         for file in files_in_dir:
             file_path = os.path.join(folder_path, file)
             try:
-                audio = EasyID3(file_path)
+                audio = self.read_basic_tags(file_path)
                 title = audio['title'][0] if 'title' in audio else None
                 if title:
                     # Check for gibberish and fix if necessary
@@ -238,7 +344,7 @@ class FolderComparer:
         for file in files_in_dir:
             file_path = os.path.join(folder_path, file)
             try:
-                audio = EasyID3(file_path)
+                audio = self.read_basic_tags(file_path)
                 artist = audio['artist'][0] if 'artist' in audio else None
                 album = audio['album'][0] if 'album' in audio else None
                 title = audio['title'][0] if 'title' in audio else None
@@ -255,7 +361,9 @@ class FolderComparer:
                             title = fixed_value
 
                 # Add bitrate
-                metadata = self.extract_metadata(file_path)
+                self.metrics.count('files')
+                self.metrics.hit('tag_cache', bool(self._lean_cache.get(file_path)))
+                metadata = self._lean_cache.get(file_path) or self.extract_metadata(file_path)
 
                 # Collect all metadata
                 all_metadata = metadata
@@ -263,28 +371,45 @@ class FolderComparer:
                 # Get file hash
                 file_hash = self.get_file_hash(file_path)
 
-                file_list.append({
-                    'file': file,
-                    'artist': artist,
-                    'album': album,
-                    'title': title,
-                    'bitrate': metadata.get('bitrate', None),
-                    'metadata': all_metadata,
-                    'file_hash': file_hash,
-                    'extension': os.path.splitext(file)[1].lower()
-                })
+                # רשומה עם __slots__ ותקציר בינארי - נקראת כמו המילון הקודם
+                file_list.append(TrackRecord(
+                    file=file,
+                    artist=artist,
+                    album=album,
+                    title=title,
+                    bitrate=metadata.get('bitrate', None),
+                    duration=metadata.get('duration'),
+                    metadata=all_metadata,
+                    file_hash=file_hash,
+                    extension=os.path.splitext(file)[1].lower()
+                ))
             except Exception as e:
                 print(f"Error processing {file}: {e}")
 
+        self._lean_cache.clear()
+
         return {
-            folder_path: {
-                'files': file_list,
-                'file_similarity': file_similarity,
-                'title_similarity': title_similarity,
-                'album_art': self.extract_album_art(folder_path)
-            }
+            folder_path: FolderRecord(
+                files=file_list,
+                file_similarity=file_similarity,
+                title_similarity=title_similarity,
+                album_art=self.extract_album_art(folder_path)
+            )
         }
 
+    def read_basic_tags(self, file_path):
+        """
+        Read the easy tags used by gather_file_info.
+        In lean mode the values come from extract_metadata (cached per file),
+        so each file is read only once per folder.
+        """
+        if not self.lean_tags:
+            return EasyID3(file_path)
+        if file_path not in self._lean_cache:
+            self._lean_cache[file_path] = self.extract_metadata(file_path)
+        metadata = self._lean_cache[file_path]
+        return {key: [value] for key, value in metadata.items() if key in ('artist', 'album', 'title') and value}
+
     def build_folder_structure(self, root_dir):
         """
         Generate a list of files and their corresponding folder paths.
@@ -304,12 +429,22 @@ class FolderComparer:
         """
         Return the lists of files and their information.
         """
-        for folder_path in self.folder_paths:
-            for dir_path, files_in_dir in self.build_folder_structure(folder_path):
-                self.folder_files.update(self.gather_file_info(dir_path, files_in_dir))
-
+        for _ in self.iter_file_lists():
+            pass
         return self.folder_files
 
+    def iter_file_lists(self):
+        """Gather the file lists folder by folder, yielding (folder path, folder data)."""
+        with self.metrics.stage('walk'):
+            folders = [folder for folder_path in self.folder_paths for folder in self.build_folder_structure(folder_path)]
+        self.metrics.count('folders', len(folders))
+        self.progress.start('folders', len(folders))
+        for dir_path, files_in_dir in folders:
+            folder_info = self.gather_file_info(dir_path, files_in_dir)
+            self.folder_files.update(folder_info)
+            self.progress.advance()
+            yield dir_path, folder_info[dir_path]
+
     def similar(self, a, b):
         """
         Calculate similarity ratio between two strings.
@@ -339,113 +474,147 @@ class FolderComparer:
         average_similarity = total_similarity / total_pairs
         return average_similarity
 
+    def candidate_pairs(self):
+        """
+        Folder pairs worth comparing: every pair with the same number of
+        files, or with duration_blocking only pairs whose track lengths match.
+        With cover_hash, pairs with the same cover are added as well.
+        """
+        if self.duration_blocking:
+            index = DurationIndex()
+            for folder_path, folder_data in self.folder_files.items():
+                index.add(folder_path, [file_info.get('duration') for file_info in folder_data['files']])
+            pairs = index.pairs()
+        else:
+            folders = list(self.folder_files.items())
+            pairs = [(folder_path, other_folder_path)
+                     for i, (folder_path, folder_data) in enumerate(folders)
+                     for other_folder_path, other_folder_data in folders[i + 1:]
+                     if len(folder_data['files']) == len(other_folder_data['files'])]
+
+        if self.cover_hash:
+            # אותה עטיפה - גם כשמספר הקבצים או אורכי הרצועות שונים (רצועת בונוס, קובץ חסר)
+            known = set(pairs)
+            pairs += sorted(pair for pair in self.similar_cover_pairs() if pair not in known and pair[::-1] not in known)
+        return pairs
+
     def find_similar_folders(self):
         """
         Find similar folders based on the information of file lists.
         Calculate the percentage of matching file hashes and include it in the weighted scoring.
         """
-        folder_files = self.folder_files
         similar_folders = defaultdict(dict)
-        processed_pairs = set()
-        for folder_path, folder_data in folder_files.items():
-            files = folder_data['files']
-            for other_folder_path, other_folder_data in folder_files.items():
-                if folder_path != other_folder_path and (other_folder_path, folder_path) not in processed_pairs and len(files) == len(other_folder_data['files']):
-                    folder_similarity = {}
-                    total_files = len(files)
-
-                    # Step 1: Calculate the percentage of matching file hashes
-                    matching_hashes = sum(
-                        1 for file_info, other_file_info in zip(files, other_folder_data['files'])
-                        if file_info.get('file_hash') == other_file_info.get('file_hash')
-                    )
-                    file_hash_match_percentage = matching_hashes / total_files if total_files > 0 else 0.0
-                    folder_similarity['file_hash'] = file_hash_match_percentage
-
-                    # Check if all file hashes match
-                    if file_hash_match_percentage == 1.0:
-                        # Folders are identical
-                        folder_similarity['identical'] = True
-                        folder_similarity['weighted_score'] = 100.0  # Maximum score
+        for folder_pair, folder_similarity in self.iter_similar_folders():
+            similar_folders[folder_pair] = folder_similarity
+        return similar_folders
+
+    def iter_similar_folders(self):
+        """Score the candidate pairs one by one, yielding ((folder, other folder), similarity)."""
+        with self.metrics.stage('candidates'):
+            pairs = self.candidate_pairs()
+        all_pairs = len(self.folder_files) * (len(self.folder_files) - 1) // 2
+        self.metrics.count('pairs_candidates', len(pairs))
+        self.metrics.count('pairs_pruned', all_pairs - len(pairs))
+        self.progress.start('pairs', len(pairs))
+        for folder_path, other_folder_path in pairs:
+            with self.metrics.stage('scoring', folder=folder_path, other=other_folder_path):
+                folder_similarity = self.compare_folder_pair(folder_path, other_folder_path)
+            self.progress.advance()
+            if folder_similarity:
+                self.metrics.count('pairs_similar')
+                yield (folder_path, other_folder_path), folder_similarity
+
+    def compare_folder_pair(self, folder_path, other_folder_path):
+        """Similarity scores of two folders from folder_files."""
+        folder_data = self.folder_files[folder_path]
+        other_folder_data = self.folder_files[other_folder_path]
+        files = folder_data['files']
+        folder_similarity = {}
+        # רצועות לפי מיקום; תיקיות באורך שונה (זוגות לפי עטיפה או משך) מחולקות באורך הגדול
+        total_files = max(len(files), len(other_folder_data['files']))
+
+        # Step 1: Calculate the percentage of matching file hashes
+        matching_hashes = sum(
+            1 for file_info, other_file_info in zip(files, other_folder_data['files'])
+            if file_info.get('file_hash') == other_file_info.get('file_hash')
+        )
+        file_hash_match_percentage = matching_hashes / total_files if total_files > 0 else 0.0
+        folder_similarity['file_hash'] = file_hash_match_percentage
+
+        # Check if all file hashes match
+        if file_hash_match_percentage == 1.0 and len(files) == len(other_folder_data['files']):
+            # Folders are identical
+            folder_similarity['identical'] = True
+            folder_similarity['weighted_score'] = 100.0  # Maximum score
+        else:
+            # Proceed with weighted scoring
+            # Calculate folder name similarity
+            folder_name_similarity = self.similar(os.path.basename(folder_path).lower(), os.path.basename(other_folder_path).lower())
+            folder_similarity['folder_name'] = folder_name_similarity
+
+            # Get average similarities
+            file_similarity1 = folder_data['file_similarity']
+            title_similarity1 = folder_data['title_similarity']
+            file_similarity2 = other_folder_data['file_similarity']
+            title_similarity2 = other_folder_data['title_similarity']
+
+            # Adjustment factors
+            max_file_similarity = max(file_similarity1, file_similarity2)
+            max_title_similarity = max(title_similarity1, title_similarity2)
+
+            if max_file_similarity > self.GENERIC_SIMILARITY_THRESHOLD:
+                file_adjustment = 1 - (max_file_similarity * self.REDUCTION_FACTOR)
+            else:
+                file_adjustment = 1  # No reduction
+
+            if max_title_similarity > self.GENERIC_SIMILARITY_THRESHOLD:
+                title_adjustment = 1 - (max_title_similarity * self.REDUCTION_FACTOR)
+            else:
+                title_adjustment = 1  # No reduction
+
+            # Compare main parameters
+            for parameter in ['file', 'title', 'album', 'artist', 'album_art']:
+                total_similarity = 0
+                for file_info, other_file_info in zip(files, other_folder_data['files']):
+                    if parameter == 'album_art':
+                        # Compare album art
+                        similarity_score = self.album_art_similarity(folder_data.get('album_art'), other_folder_data.get('album_art'))
                     else:
-                        # Proceed with weighted scoring
-                        # Calculate folder name similarity
-                        folder_name_similarity = self.similar(os.path.basename(folder_path).lower(), os.path.basename(other_folder_path).lower())
-                        folder_similarity['folder_name'] = folder_name_similarity
-
-                        # Get average similarities
-                        file_similarity1 = folder_data['file_similarity']
-                        title_similarity1 = folder_data['title_similarity']
-                        file_similarity2 = other_folder_data['file_similarity']
-                        title_similarity2 = other_folder_data['title_similarity']
-
-                        # Adjustment factors
-                        max_file_similarity = max(file_similarity1, file_similarity2)
-                        max_title_similarity = max(title_similarity1, title_similarity2)
-
-                        if max_file_similarity > self.GENERIC_SIMILARITY_THRESHOLD:
-                            file_adjustment = 1 - (max_file_similarity * self.REDUCTION_FACTOR)
+                        if file_info.get(parameter) and other_file_info.get(parameter):
+                            similarity_score = self.similar(str(file_info[parameter]).lower(), str(other_file_info[parameter]).lower())
                         else:
-                            file_adjustment = 1  # No reduction
+                            similarity_score = 0.0
+                        if parameter == 'file':
+                            similarity_score *= file_adjustment
+                        elif parameter == 'title':
+                            similarity_score *= title_adjustment
+                    total_similarity += similarity_score
+                folder_similarity[parameter] = total_similarity / total_files if total_files > 0 else 0.0
 
-                        if max_title_similarity > self.GENERIC_SIMILARITY_THRESHOLD:
-                            title_adjustment = 1 - (max_title_similarity * self.REDUCTION_FACTOR)
-                        else:
-                            title_adjustment = 1  # No reduction
-
-                        # Compare main parameters
-                        for parameter in ['file', 'title', 'album', 'artist', 'album_art']:
-                            total_similarity = 0
-                            for file_info, other_file_info in zip(files, other_folder_data['files']):
-                                if parameter == 'album_art':
-                                    # Compare album art
-                                    if folder_data.get('album_art') and other_folder_data.get('album_art'):
-                                        similarity_score = 1.0 if folder_data['album_art'] == other_folder_data['album_art'] else 0.0
-                                    else:
-                                        similarity_score = 0.0
-                                else:
-                                    if file_info.get(parameter) and other_file_info.get(parameter):
-                                        similarity_score = self.similar(str(file_info[parameter]).lower(), str(other_file_info[parameter]).lower())
-                                    else:
-                                        similarity_score = 0.0
-                                    if parameter == 'file':
-                                        similarity_score *= file_adjustment
-                                    elif parameter == 'title':
-                                        similarity_score *= title_adjustment
-                                total_similarity += similarity_score
-                            folder_similarity[parameter] = total_similarity / total_files if total_files > 0 else 0.0
-
-                        # Compare additional metadata
-                        additional_metadata_scores = self.compare_additional_metadata(files, other_folder_data['files'])
-                        folder_similarity['additional_metadata'] = additional_metadata_scores
-
-                        # Apply weights to individual scores
-                        weighted_score = sum(folder_similarity[param] * self.PARAMETER_WEIGHTS.get(param, 0) for param in self.PARAMETER_WEIGHTS)
-
-                        # Add additional metadata scores
-                        total_additional_weight = 0
-                        for meta_param, meta_score in additional_metadata_scores.items():
-                            weighted_score += meta_score * self.ADDITIONAL_METADATA_WEIGHT
-                            total_additional_weight += self.ADDITIONAL_METADATA_WEIGHT
-
-                        # Total possible weight
-                        max_possible_score = sum(self.PARAMETER_WEIGHTS.values()) + total_additional_weight
-
-                        # Normalize the final score to get a percentage
-                        folder_similarity['weighted_score'] = (weighted_score / max_possible_score) * 100
-
-                    if folder_similarity:
-                        similar_folders[(folder_path, other_folder_path)] = folder_similarity
-                        processed_pairs.add((folder_path, folder_path))
-                        processed_pairs.add((other_folder_path, other_folder_path))
-                        processed_pairs.add((folder_path, other_folder_path))
-                        processed_pairs.add((other_folder_path, folder_path))
+            # Compare additional metadata
+            additional_metadata_scores = self.compare_additional_metadata(files, other_folder_data['files'])
+            folder_similarity['additional_metadata'] = additional_metadata_scores
 
-        return similar_folders
+            # Apply weights to individual scores
+            weighted_score = sum(folder_similarity[param] * self.PARAMETER_WEIGHTS.get(param, 0) for param in self.PARAMETER_WEIGHTS)
+
+            # Add additional metadata scores
+            total_additional_weight = 0
+            for meta_param, meta_score in additional_metadata_scores.items():
+                weighted_score += meta_score * self.ADDITIONAL_METADATA_WEIGHT
+                total_additional_weight += self.ADDITIONAL_METADATA_WEIGHT
+
+            # Total possible weight
+            max_possible_score = sum(self.PARAMETER_WEIGHTS.values()) + total_additional_weight
+
+            # Normalize the final score to get a percentage
+            folder_similarity['weighted_score'] = (weighted_score / max_possible_score) * 100
+
+        return folder_similarity
 
     def compare_additional_metadata(self, files1, files2):
         """Compare additional metadata between two lists of files."""
-        total_files = len(files1)
+        total_files = max(len(files1), len(files2))
         metadata_match_counts = defaultdict(int)
 
         for file_info1, file_info2 in zip(files1, files2):
@@ -453,7 +622,7 @@ class FolderComparer:
             metadata2 = file_info2.get('metadata', {})
             keys1 = set(metadata1.keys())
             keys2 = set(metadata2.keys())
-            common_keys = keys1 & keys2 - {'artist', 'album', 'title', 'bitrate'}
+            common_keys = keys1 & keys2 - {'artist', 'album', 'title', 'bitrate', 'duration'}
 
             for key in common_keys:
                 value1 = metadata1.get(key)
@@ -514,6 +683,7 @@ class FolderComparer:
 class SelectQuality(FolderComparer):
     """Compare the quality between folders."""
 
+    @timed_stage('quality')
     def get_folders_quality(self):
         """
         Compare folders based on certain quality criteria and organize the information.
@@ -523,8 +693,7 @@ class SelectQuality(FolderComparer):
         folder_quality_details = {}  # To store the breakdown of quality parameters
 
         # First, compute quality scores for each folder
-        for folder_path, folder_data in self.folder_files.items():
-            quality_score, quality_breakdown = self.compute_folder_quality(folder_path, folder_data)
+        for folder_path, (quality_score, quality_breakdown) in self.compute_folders_quality(self.folder_files).items():
             folder_quality_scores[folder_path] = quality_score
             folder_quality_details[folder_path] = quality_breakdown
 
@@ -546,86 +715,40 @@ class SelectQuality(FolderComparer):
         """
         Compute the quality score for a folder based on specified parameters.
         """
-        # Initialize scores
-        hebrew_metadata_count = 0
-        metadata_complete_count = 0
-        total_files = len(folder_data['files'])
-        total_bitrate = 0
-        album_art_score = 1 if folder_data.get('album_art') else 0
-        repetitive_names_score = 1 - max(folder_data.get('title_similarity', 0), folder_data.get('file_similarity', 0))
-        lossless_format_count = 0
-        consistent_artist_count = 0
-        consistent_album_count = 0
-        lyrics_count = 0
-
-        artists = set()
-        albums = set()
-
-        for file_info in folder_data['files']:
-            metadata = file_info.get('metadata', {})
-            title = metadata.get('title')
-            artist = metadata.get('artist')
-            album = metadata.get('album')
-            bitrate = metadata.get('bitrate')
-            extension = file_info.get('extension')
-            has_lyrics = 'lyrics' in metadata
-
-            # Collect artists and albums
-            if artist:
-                artists.add(artist)
-            if album:
-                albums.add(album)
-
-            # Check for Hebrew metadata
-            hebrew_in_metadata = False
-            for field in [title, artist, album]:
-                if field and self.contains_hebrew(field):
-                    hebrew_in_metadata = True
-                    break
-            if hebrew_in_metadata:
-                hebrew_metadata_count += 1
-
-            # Check for metadata completeness (not empty or corrupted)
-            metadata_complete = True
-            for field in [title, artist, album]:
-                if not field or check_jibrish(field):
-                    metadata_complete = False
-                    break
-            if metadata_complete:
-                metadata_complete_count +=1
+        return self.compute_folders_quality({folder_path: folder_data})[folder_path]
 
-            # Collect bitrate
-            if bitrate:
-                total_bitrate += bitrate
-
-            # Check for lossless format
-            if extension in self.LOSSLESS_EXTENSIONS:
-                lossless_format_count +=1
+    def compute_folders_quality(self, folder_files):
+        """
+        Quality score and breakdown of every folder, {folder path: (score, breakdown)}.
+        The per-track parameters are columns of a FeatureTable, summed per folder in one pass.
+        """
+        table = FeatureTable.from_folder_files(folder_files, self.LOSSLESS_EXTENSIONS)
+        folders = list(folder_files.values())
+        total_files = table.counts()
+        has_files = total_files > 0
 
-            # Check for lyrics
-            if has_lyrics:
-                lyrics_count +=1
+        # Initialize scores
+        album_art_score = np.array([1 if folder_data.get('album_art') else 0 for folder_data in folders], dtype=np.float64)
+        repetitive_names_score = np.array([1 - max(folder_data.get('title_similarity', 0), folder_data.get('file_similarity', 0))
+                                           for folder_data in folders], dtype=np.float64)
 
         # Compute scores
-        hebrew_metadata_score = hebrew_metadata_count / total_files if total_files > 0 else 0
-        metadata_completeness_score = metadata_complete_count / total_files if total_files > 0 else 0
+        hebrew_metadata_score = table.ratio(table.hebrew)
+        metadata_completeness_score = table.ratio(table.complete)
 
         # Compute bitrate score
-        if total_files > 0:
-            average_bitrate = total_bitrate / total_files
-            bitrate_score = self.compute_bitrate_score(average_bitrate)
-        else:
-            bitrate_score = 0
+        average_bitrate = table.ratio(table.bitrate)
+        bitrate_score = np.where(has_files, self.compute_bitrate_score(average_bitrate), 0)
 
         # Consistency in artist and album
-        consistent_artist_score = 1 if len(artists) == 1 else 0
-        consistent_album_score = 1 if len(albums) == 1 else 0
+        consistent_artist_score = (table.distinct(table.artist_id) == 1).astype(np.float64)
+        consistent_album_score = (table.distinct(table.album_id) == 1).astype(np.float64)
 
         # Lossless format score
-        lossless_format_score = lossless_format_count / total_files if total_files > 0 else 0
+        lossless_format_score = table.ratio(table.lossless)
 
         # Lyrics availability score
-        lyrics_score = lyrics_count / total_files if total_files > 0 else 0
+        lyrics_score = table.ratio(table.lyrics)
 
         # Now, combine scores
         # We can assign weights to each parameter
@@ -655,7 +778,7 @@ class SelectQuality(FolderComparer):
         ) / total_weight
 
         # Prepare quality breakdown for transparency
-        quality_breakdown = {
+        breakdown_columns = {
             'Hebrew Metadata Score': hebrew_metadata_score * 100,
             'Metadata Completeness Score': metadata_completeness_score * 100,
             'Album Art Score': album_art_score * 100,
@@ -667,22 +790,27 @@ class SelectQuality(FolderComparer):
             'Lyrics Score': lyrics_score * 100,
         }
 
-        return total_score * 100, quality_breakdown  # Return as percentage
+        total_score = (total_score * 100).tolist()  # Return as percentage
+        breakdown_columns = {name: column.tolist() for name, column in breakdown_columns.items()}
+        return {
+            folder_path: (total_score[index], {name: column[index] for name, column in breakdown_columns.items()})
+            for index, folder_path in enumerate(table.folders)
+        }
 
     def contains_hebrew(self, text):
         """Check if the text contains Hebrew characters."""
-        return any('\u0590' <= c <= '\u05EA' for c in text)
+        return contains_hebrew(text)
 
     def compute_bitrate_score(self, average_bitrate):
-        """Compute the bitrate score according to user preference."""
+        """Compute the bitrate score according to user preference (a number or an array of them)."""
         if self.preferred_bitrate == 'high':
             # Assuming higher bitrate is better, and max bitrate is say 320 kbps
-            return min(average_bitrate / 320, 1.0)
+            return np.minimum(average_bitrate / 320, 1.0)
         elif self.preferred_bitrate == '128':
             # Compute how close the average bitrate is to 128 kbps
-            return max(1 - abs(average_bitrate - 128) / 192, 0)  # Max difference is 192 (320-128)
+            return np.maximum(1 - np.abs(average_bitrate - 128) / 192, 0)  # Max difference is 192 (320-128)
         else:
-            return 0
+            return np.zeros_like(average_bitrate, dtype=np.float64)
 
     def view_result(self):
         """
@@ -717,14 +845,25 @@ class SelectQuality(FolderComparer):
             print(f'  {param}: {score:.2f}%')
 
 class MergeFolders:
-    def __init__(self, organized_info, folder_files, preferred_bitrate, sorted_similar_folders):
+    def __init__(self, organized_info, folder_files, preferred_bitrate, sorted_similar_folders, tag_buffer=None, journal=None, metrics=None):
         self.organized_info = organized_info
         self.folder_files = folder_files
         self.preferred_bitrate = preferred_bitrate
         self.sorted_similar_folders = sorted_similar_folders
+        # TagBuffer אופציונלי - מטא-נתונים ממוזגים נשמרים בסוף הריצה, פעם אחת לכל קובץ
+        self.tag_buffer = tag_buffer
+        # MergeJournal אופציונלי - זוגות שמוזגו מדולגים בהרצה חוזרת, וניתן לבטל את הריצה
+        self.journal = journal
+        # RunMetrics - זמן המיזוג ומספר הזוגות שמוזגו
+        self.metrics = metrics or RunMetrics()
         # סף דמיון מינימלי למיזוג
         self.MINIMUM_SIMILARITY_SCORE_FOR_MERGE = 85.0
+        self._average_bitrates = None
+        # עם TagBuffer: מפתחות שנרשמו לכל קובץ, וזוגות שיסומנו כממוזגים רק אחרי flush_tags
+        self._staged_tags = {}
+        self._unflushed_pairs = []
 
+    @timed_stage('merge')
     def merge(self):
         # חזור על זוגות תיקיות
         for folder_pair, similarities in self.sorted_similar_folders:
@@ -747,7 +886,44 @@ class MergeFolders:
             preferred_folder, other_folder = self.decide_preferred_folder(folder1, folder2, quality1, quality2)
 
             # בצע מיזוג מתיקיה_אחרת לתיקיה מועדפת
-            self.merge_folders(preferred_folder, other_folder)
+            if self.tag_buffer is None:
+                merged = journaled(self.journal, 'merge-pair', lambda: self.merge_folders(preferred_folder, other_folder),
+                                   preferred=preferred_folder, other=other_folder)
+            elif self.journal is not None and self.journal.is_done('merge-pair', preferred=preferred_folder, other=other_folder):
+                merged = False
+            else:
+                # המטא-נתונים נכתבים רק ב-flush_tags, ורק אז הזוג נרשם כממוזג -
+                # ריצה שנקטעה לפני כן ממזגת את הזוג שוב
+                self.merge_folders(preferred_folder, other_folder)
+                self._unflushed_pairs.append((preferred_folder, other_folder))
+                merged = True
+            if merged:
+                self.metrics.count('pairs_merged')
+            else:
+                print(f"Already merged {other_folder} into {preferred_folder}, skipping.")
+
+    def flush_tags(self):
+        """
+        Write the staged tags (one journaled save per file) and mark the
+        pairs merged since the last flush as done. Returns the TagBuffer
+        report, or None without a TagBuffer.
+        """
+        if self.tag_buffer is None:
+            return None
+
+        def save(file_path, write):
+            keys = self._staged_tags.get(file_path)
+            if keys:
+                journaled(self.journal, 'tags', write, path=file_path, keys=sorted(keys))
+            else:
+                write()
+
+        report = self.tag_buffer.flush(wrap_save=save)
+        for preferred_folder, other_folder in self._unflushed_pairs:
+            journaled(self.journal, 'merge-pair', lambda: None, preferred=preferred_folder, other=other_folder)
+        self._staged_tags.clear()
+        self._unflushed_pairs = []
+        return report
 
     def decide_preferred_folder(self, folder1, folder2, quality1, quality2):
         # יישם את ההיגיון לפי חוקי המשתמש
@@ -755,11 +931,9 @@ class MergeFolders:
         # אם קצב הסיביות שונה, העדיפו את התיקיה עם קצב הסיביות הטוב יותר (לפי הגדרת המשתמש).
 
         # קבל קצב סיביות ממוצע של כל תיקיה
-        folder_data1 = self.folder_files[folder1]
-        folder_data2 = self.folder_files[folder2]
-
-        avg_bitrate1 = self.get_average_bitrate(folder_data1)
-        avg_bitrate2 = self.get_average_bitrate(folder_data2)
+        average_bitrates = self.average_bitrates()
+        avg_bitrate1 = average_bitrates[folder1]
+        avg_bitrate2 = average_bitrates[folder2]
 
         # כעת, השווה את קצבי הסיביות
         if avg_bitrate1 == avg_bitrate2:
@@ -800,17 +974,20 @@ class MergeFolders:
                     return folder2, folder1
 
     def get_average_bitrate(self, folder_data):
-        total_bitrate = 0
-        count = 0
+        # ממוצע ישיר של קצבי הסיביות הידועים, בלי לבנות FeatureTable לתיקייה אחת
+        bitrates = []
         for file_info in folder_data['files']:
-            bitrate = file_info.get('bitrate')
+            bitrate = file_info['bitrate'] if 'bitrate' in file_info else file_info.get('metadata', {}).get('bitrate')
             if bitrate:
-                total_bitrate += bitrate
-                count += 1
-        if count > 0:
-            return total_bitrate / count
-        else:
-            return 0
+                bitrates.append(bitrate)
+        return sum(bitrates) / len(bitrates) if bitrates else 0.0
+
+    def average_bitrates(self):
+        """Average bitrate of every folder, one group-by over a FeatureTable built on first use."""
+        if self._average_bitrates is None:
+            table = FeatureTable.from_folder_files(self.folder_files)
+            self._average_bitrates = dict(zip(table.folders, table.average_bitrate().tolist()))
+        return self._average_bitrates
 
     def merge_folders(self, preferred_folder, other_folder):
         # כעת, עלינו למזג נתונים מתיקיה_אחרת לתיקיה מועדפת
@@ -858,16 +1035,25 @@ class MergeFolders:
             return
         
         metadata_changed = False
+        changes = {}
         # עבור כל שדה מטא-נתונים, אם אין אותו ב-pref_audio ול-other_audio יש אותו, העתק אותו
         for key in other_audio.keys():
-            if key not in pref_audio or not pref_audio.get(key):
+            staged = self.tag_buffer.get(pref_file_path, key) if self.tag_buffer is not None else None
+            if (key not in pref_audio or not pref_audio.get(key)) and not staged:
                 pref_audio[key] = other_audio[key]
+                changes[key] = other_audio[key]
                 metadata_changed = True
                 
         # שמור את המטא נתונים המעודכנים בקובץ המועדף, רק אם היה שינוי
         if metadata_changed:
             try:
-                pref_audio.save()
+                if self.tag_buffer is not None:
+                    # נרשם ביומן רק כשהקובץ נשמר ב-flush_tags
+                    self.tag_buffer.stage(pref_file_path, changes)
+                    self._staged_tags.setdefault(pref_file_path, set()).update(changes)
+                else:
+                    journaled(self.journal, 'tags', lambda: pref_audio.save(padding=padding_policy),
+                              path=pref_file_path, keys=sorted(changes))
                 print(f"Updated metadata for file: {pref_file_path}")
             except Exception as e:
                 print(f"Error saving metadata for file {pref_file_path}: {e}")
@@ -887,7 +1073,7 @@ class MergeFolders:
                     src = os.path.join(other_folder, file)
                     dst = os.path.join(preferred_folder, file)
                     try:
-                        shutil.copy2(src, dst)
+                        journaled(self.journal, 'copy', lambda: shutil.copy2(src, dst), src=src, dst=dst)
                         print(f"Copied album art from {src} to {dst}")
                     except Exception as e:
                         print(f"Error copying album art from {src} to {dst}: {e}")
@@ -897,9 +1083,11 @@ class SelectAndThrow:
     """
     Choose and delete the redundant folders.
     """
-    def __init__(self, organized_info, preferred_bitrate):
+    def __init__(self, organized_info, preferred_bitrate, folder_files=None):
         self.organized_info = organized_info
         self.preferred_bitrate = preferred_bitrate
+        # נתוני הסריקה (file_hash לכל קובץ) - נדרשים למצב dedup
+        self.folder_files = folder_files or {}
 
     def view_result(self):
         """
@@ -929,6 +1117,38 @@ class SelectAndThrow:
             else:
                 print(f"Both folders '{folder1}' and '{folder2}' have the same quality. Please select the folder you want to delete!")
 
+    def dedup(self, manifest_path, mode='reflink'):
+        """
+        Replace byte-identical files (same file_hash) in the lower-quality
+        folder with reflinks to the copies in the better folder, or with
+        hardlinks when mode='hardlink'.
+        Both folders stay intact; undo with `python dedup_links.py undo <manifest>`.
+        Returns the number of bytes reclaimed.
+        """
+        entries = []
+        for folder_pair, quality_scores in self.organized_info.items():
+            folder1, folder2 = folder_pair
+            (quality1, _), (quality2, _) = quality_scores
+            keep_folder, dup_folder = (folder2, folder1) if quality1 < quality2 else (folder1, folder2)
+
+            keep_files = {fi.get('file_hash'): fi for fi in self.folder_files.get(keep_folder, {}).get('files', [])}
+            for dup_info in self.folder_files.get(dup_folder, {}).get('files', []):
+                file_hash = dup_info.get('file_hash')
+                keep_info = keep_files.get(file_hash)
+                if not file_hash or not keep_info:
+                    continue
+                entry = link_duplicate(os.path.join(keep_folder, keep_info['file']),
+                                       os.path.join(dup_folder, dup_info['file']), file_hash, mode)
+                if entry:
+                    entries.append(entry)
+                    print(f"Linked ({entry['mode']}): {entry['dup']}")
+
+        if entries:
+            save_manifest(manifest_path, entries)
+        saved = sum(entry['bytes_saved'] for entry in entries)
+        print(f"Dedup: {len(entries)} files linked, {saved / 1024 / 1024:.1f} MB reclaimed.")
+        return saved
+
 if __name__ == "__main__":
     print('הכנס נתיב לתיקיה')
     folder_path = input('>>>').strip()
@@ -951,7 +1171,11 @@ if __name__ == "__main__":
         preferred_bitrate = '128'
 
     # Step 1: Compare folder qualities
-    comparer = SelectQuality(folder_paths, preferred_bitrate)
+    # --trace <file>: קובץ Chrome trace עם span לכל תיקייה, קובץ וזוג
+    trace_path = sys.argv[sys.argv.index('--trace') + 1] if '--trace' in sys.argv[1:-1] else None
+    tracer = Tracer() if trace_path else None
+    metrics = RunMetrics(tracer)
+    comparer = SelectQuality(folder_paths, preferred_bitrate, metrics=metrics)
     comparer.main()
     organized_info = comparer.get_folders_quality()
     sorted_similar_folders = comparer.sorted_similar_folders
@@ -963,17 +1187,34 @@ if __name__ == "__main__":
     user_input = input("\nהאם ברצונך למזג את התיקיות? (y/n): ").strip().lower()
     if user_input == 'y':
         # Step 4: Merge folders
-        merger = MergeFolders(organized_info, comparer.folder_files, preferred_bitrate, sorted_similar_folders)
+        tag_buffer = TagBuffer()
+        # יומן המיזוג - ריצה שנקטעה ממשיכה מאותה נקודה, ואפשר לבטל עם merge_journal.py undo
+        journal = MergeJournal(os.path.join(folder_path, JOURNAL_NAME))
+        journal.start()
+        merger = MergeFolders(organized_info, comparer.folder_files, preferred_bitrate, sorted_similar_folders, tag_buffer, journal, metrics)
         merger.merge()
+        merger.flush_tags()
+        journal.finish()
 
         # Step 5: Choose and delete folders
-        user_input = input("\nהאם ברצונך למחוק את התיקיות המיותרות? (y/n): ").strip().lower()
+        user_input = input("\nהאם ברצונך למחוק את התיקיות המיותרות? (y/n/l - קישור קבצים זהים): ").strip().lower()
+        selecter = SelectAndThrow(organized_info, preferred_bitrate, comparer.folder_files)
         if user_input == 'y':
-            selecter = SelectAndThrow(organized_info, preferred_bitrate)
             selecter.delete()
             print("התיקיות נמחקו.")
+        elif user_input == 'l':
+            # קבצים זהים מוחלפים בקישורים - שתי התיקיות נשארות, המקום מתפנה
+            selecter.dedup(os.path.join(folder_path, MANIFEST_NAME))
         else:
             print("המחיקה בוטלה.")
     else:
         print("מיזוג התיקיות בוטל.")
         print("המחיקה בוטלה.")
+
+    # דוח הריצה: זמן לכל שלב, קבצים ובתים לשנייה, פגיעות במטמון וזוגות שסוננו
+    report_path = os.path.join(folder_path, REPORT_NAME)
+    metrics.save_json(report_path)
+    print(f"Run report saved to {report_path}.")
+    if tracer is not None:
+        tracer.save(trace_path)
+        print(f"Trace saved to {trace_path}.")
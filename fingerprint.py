@@ -0,0 +1,220 @@
+"""
+טביעת אצבע אקוסטית - זיהוי שירים כפולים גם אחרי קידוד מחדש.
+
+detect_duplicate_songs_by_audio used to decode whole tracks with pydub
+and MD5 the PCM: hundreds of MB per file, and only bit-identical decodes
+matched. Here:
+
+- decode_stream() decodes in chunks (ffmpeg pipe, or the wave module for
+  .wav without ffmpeg), downmixed to mono at SAMPLE_RATE,
+- the fingerprint is a set of spectral-peak landmarks: the strongest
+  bin in each frequency band per frame, paired with peaks a few frames
+  later -> 23-bit hash (f1, f2, dt) plus the anchor time,
+- FingerprintIndex is an inverted index hash -> (track, time). A query
+  only touches tracks that share hashes and votes on a consistent time
+  offset, so a 128 kbps MP3 matches its 320 kbps or FLAC copy.
+"""
+
+import os
+import wave
+import pickle
+import shutil
+import subprocess
+from collections import Counter, defaultdict
+
+from lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+SAMPLE_RATE = 11025
+N_FFT = 1024
+HOP = 512
+CHUNK_SAMPLES = SAMPLE_RATE * 10  # עשר שניות בכל פעם
+# פסי תדר (בינים) - שיא אחד לכל פס בכל מסגרת
+BANDS = [(8, 16), (16, 32), (32, 64), (64, 128), (128, 256), (256, 400)]
+PEAK_THRESHOLD = 1.5  # שיא חייב להיות פי כך מעל ממוצע המסגרת
+FAN_OUT = 5  # זוגות לכל עוגן
+FAN_WINDOW = 31  # מסגרות קדימה (5 ביטים)
+TIME_SPAN = 1 << 24  # מסגרות לרצועה באינדקס (~9 ימים)
+MIN_MATCHES = 15
+MIN_MATCH_RATIO = 0.05
+MAX_POSTINGS = 5000  # גיבוב נפוץ מדי (שקט, רעש) לא מצביע
+
+
+def _ffmpeg_chunks(file_path, chunk_samples):
+    process = subprocess.Popen(
+        ['ffmpeg', '-v', 'quiet', '-i', file_path, '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-'],
+        stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(chunk_samples * 2)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2').astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def _wave_chunks(file_path, chunk_samples):
+    """PCM WAV without ffmpeg: downmix, low-pass (box filter) and resample chunk by chunk."""
+    with wave.open(file_path, 'rb') as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"unsupported sample width: {width}")
+        dtype = {1: np.uint8, 2: '<i2', 4: '<i4'}[width]
+        scale = float(1 << (8 * width - 1))
+        step = rate / SAMPLE_RATE
+        box = max(int(round(step)), 1)
+        tail = np.zeros(0, dtype=np.float32)  # דגימות מהמנה הקודמת, לסינון ולאינטרפולציה
+        tail_start = 0  # מיקום הדגימה הראשונה של tail בקובץ
+        next_pos = 0.0  # מיקום דגימת הפלט הבאה, ביחידות קלט
+        read_frames = int(chunk_samples * step)
+
+        while True:
+            data = wav.readframes(read_frames)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+            if width == 1:
+                samples -= 128.0
+            samples = samples.reshape(-1, channels).mean(axis=1) / scale
+
+            block = np.concatenate([tail, samples])
+            if box > 1:
+                filtered = np.convolve(block, np.ones(box, dtype=np.float32) / box, mode='same')
+            else:
+                filtered = block
+            # הדגימות האחרונות עוד תלויות במנה הבאה
+            usable = len(block) - box
+            positions = np.arange(next_pos, tail_start + usable, step)
+            if len(positions):
+                yield np.interp(positions - tail_start, np.arange(len(block)), filtered).astype(np.float32)
+                next_pos = positions[-1] + step
+            keep = max(len(block) - 2 * box - int(step) - 1, 0)
+            tail = block[keep:]
+            tail_start += keep
+
+
+def decode_stream(file_path, chunk_samples=CHUNK_SAMPLES):
+    """Yield mono float32 chunks at SAMPLE_RATE. Memory stays bounded by the chunk size."""
+    if shutil.which('ffmpeg'):
+        return _ffmpeg_chunks(file_path, chunk_samples)
+    if os.path.splitext(file_path)[1].lower() == '.wav':
+        return _wave_chunks(file_path, chunk_samples)
+    raise RuntimeError("ffmpeg is needed to decode " + os.path.splitext(file_path)[1])
+
+
+def spectral_peaks(chunks):
+    """(frame, bin) peaks of a stream of sample chunks, frame by frame."""
+    window = np.hanning(N_FFT).astype(np.float32)
+    buffer = np.zeros(0, dtype=np.float32)
+    frame_index = 0
+    peaks = []
+    for chunk in chunks:
+        buffer = np.concatenate([buffer, chunk])
+        if len(buffer) < N_FFT:
+            continue
+        n_frames = 1 + (len(buffer) - N_FFT) // HOP
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, N_FFT)[::HOP][:n_frames]
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1))
+        mean = spectrum[:, BANDS[0][0]:BANDS[-1][1]].mean(axis=1) + 1e-9
+        rows = np.arange(n_frames)
+        for low, high in BANDS:
+            bins = spectrum[:, low:high].argmax(axis=1) + low
+            strong = spectrum[rows, bins] > mean * PEAK_THRESHOLD
+            peaks.extend(zip((rows[strong] + frame_index).tolist(), bins[strong].tolist()))
+        frame_index += n_frames
+        buffer = buffer[n_frames * HOP:]
+    peaks.sort()
+    return peaks
+
+
+def landmarks(peaks):
+    """Pair each peak with up to FAN_OUT later peaks -> (hashes, anchor times) arrays."""
+    hashes = []
+    times = []
+    count = len(peaks)
+    for i, (t1, f1) in enumerate(peaks):
+        paired = 0
+        j = i + 1
+        while j < count and paired < FAN_OUT:
+            t2, f2 = peaks[j]
+            dt = t2 - t1
+            if dt > FAN_WINDOW:
+                break
+            if dt > 0:
+                hashes.append((f1 << 14) | (f2 << 5) | dt)
+                times.append(t1)
+                paired += 1
+            j += 1
+    return np.array(hashes, dtype=np.uint32), np.array(times, dtype=np.uint32)
+
+
+def fingerprint_file(file_path):
+    """Fingerprint of an audio file as (hashes, times) arrays."""
+    return landmarks(spectral_peaks(decode_stream(file_path)))
+
+
+class FingerprintIndex:
+    def __init__(self):
+        # hash -> [track_id * TIME_SPAN + time]
+        self.postings = defaultdict(list)
+        self.tracks = []
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def add(self, track, fingerprint):
+        """Index a track's (hashes, times). track is any label (e.g. the file path)."""
+        track_id = len(self.tracks)
+        self.tracks.append(track)
+        base = track_id * TIME_SPAN
+        for h, t in zip(fingerprint[0].tolist(), fingerprint[1].tolist()):
+            self.postings[h].append(base + t)
+        return track_id
+
+    def match(self, fingerprint, min_matches=MIN_MATCHES, min_ratio=MIN_MATCH_RATIO):
+        """
+        Tracks that share time-aligned landmarks with the fingerprint, as
+        (score, track) tuples, best first. score = aligned hashes / query hashes.
+        """
+        hashes, times = fingerprint
+        if not len(hashes):
+            return []
+        offsets = Counter()
+        for h, t in zip(hashes.tolist(), times.tolist()):
+            entries = self.postings.get(h)
+            if not entries or len(entries) > MAX_POSTINGS:
+                continue
+            for entry in entries:
+                track_id, t_db = divmod(entry, TIME_SPAN)
+                offsets[(track_id, t_db - t)] += 1
+
+        best = {}
+        for (track_id, offset), count in offsets.items():
+            # היסט של מסגרת אחת לכל כיוון נספר יחד
+            aligned = count + offsets.get((track_id, offset - 1), 0) + offsets.get((track_id, offset + 1), 0)
+            if aligned > best.get(track_id, 0):
+                best[track_id] = aligned
+
+        results = []
+        for track_id, aligned in best.items():
+            score = min(aligned / len(hashes), 1.0)
+            if aligned >= min_matches and score >= min_ratio:
+                results.append((score, self.tracks[track_id]))
+        results.sort(key=lambda item: -item[0])
+        return results
+
+    def save(self, index_file):
+        with open(index_file, 'wb') as f:
+            pickle.dump({'tracks': self.tracks, 'postings': dict(self.postings)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, index_file):
+        with open(index_file, 'rb') as f:
+            data = pickle.load(f)
+        index = cls()
+        index.tracks = data['tracks']
+        index.postings.update(data['postings'])
+        return index
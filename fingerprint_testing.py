@@ -0,0 +1,134 @@
+# test_fingerprint.py
+import os
+import sys
+import wave
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from fingerprint import FingerprintIndex, fingerprint_file, spectral_peaks, decode_stream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'o1_project'))
+from ma_o1 import MusicOrganizer
+
+
+def make_song(seed, rate, seconds=20):
+    """Synthetic "song": a new three-note chord every quarter second."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = np.zeros_like(t)
+    for i in range(seconds * 4):
+        mask = (t >= i / 4) & (t < (i + 1) / 4)
+        for freq in rng.uniform(150, 3000, 3):
+            signal[mask] += np.sin(2 * np.pi * freq * t[mask])
+    return signal / 4
+
+
+def write_wav(path, signal, rate, channels=1, gain=1.0, noise=0.0):
+    samples = signal * gain + np.random.default_rng(0).normal(0, noise, len(signal))
+    data = np.clip(samples * 32767, -32768, 32767).astype('<i2')
+    if channels == 2:
+        data = np.repeat(data, 2)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(data.tobytes())
+
+
+class TestFingerprint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        cls.paths = {}
+        # אותו שיר: סטריאו 44.1kHz, ומונו 22kHz שקט יותר עם רעש (כמו קידוד מחדש)
+        for name, seed, rate, kwargs in [('song', 1, 44100, {'channels': 2}),
+                                         ('reencoded', 1, 22050, {'gain': 0.5, 'noise': 0.05}),
+                                         ('other', 2, 44100, {}),
+                                         ('third', 3, 44100, {})]:
+            cls.paths[name] = os.path.join(cls.root, name + '.wav')
+            write_wav(cls.paths[name], make_song(seed, rate), rate, **kwargs)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def test_reencoded_copy_matches(self):
+        index = FingerprintIndex()
+        index.add('song', fingerprint_file(self.paths['song']))
+        index.add('other', fingerprint_file(self.paths['other']))
+        matches = index.match(fingerprint_file(self.paths['reencoded']))
+        self.assertEqual([track for score, track in matches], ['song'])
+
+    def test_different_song_does_not_match(self):
+        index = FingerprintIndex()
+        index.add('song', fingerprint_file(self.paths['song']))
+        index.add('other', fingerprint_file(self.paths['other']))
+        self.assertEqual(index.match(fingerprint_file(self.paths['third'])), [])
+
+    def test_chunk_size_does_not_change_peaks(self):
+        whole = spectral_peaks(decode_stream(self.paths['song']))
+        chunked = spectral_peaks(decode_stream(self.paths['song'], chunk_samples=3000))
+        self.assertEqual(whole, chunked)
+
+    def test_save_and_load(self):
+        index = FingerprintIndex()
+        index.add('song', fingerprint_file(self.paths['song']))
+        index_file = os.path.join(self.root, 'index.pkl')
+        index.save(index_file)
+        loaded = FingerprintIndex.load(index_file)
+        self.assertEqual(loaded.match(fingerprint_file(self.paths['reencoded']))[0][1], 'song')
+
+
+class TestDuplicateSongsByAudio(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.music_dir = os.path.join(self.root, 'music')
+        self.backup_dir = os.path.join(self.root, 'backup')
+        os.makedirs(os.path.join(self.music_dir, 'a'))
+        os.makedirs(os.path.join(self.music_dir, 'b'))
+        os.makedirs(self.backup_dir)
+        # העותק באיכות נמוכה (מונו 22kHz) נסרק ראשון
+        self.low = os.path.join(self.music_dir, 'a', 'song.wav')
+        self.high = os.path.join(self.music_dir, 'b', 'song.wav')
+        write_wav(self.low, make_song(1, 22050), 22050, gain=0.5, noise=0.05)
+        write_wav(self.high, make_song(1, 44100), 44100, channels=2)
+        write_wav(os.path.join(self.music_dir, 'b', 'other.wav'), make_song(2, 44100), 44100)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_keeps_the_better_copy_and_reuses_the_index(self):
+        index = FingerprintIndex()
+        organizer = MusicOrganizer(self.music_dir, self.backup_dir, fingerprint_index=index)
+        self.assertIs(organizer.fingerprint_index, index)
+        # קובץ באותו שם כבר בסל המיחזור - לא נדרס
+        with open(os.path.join(self.backup_dir, 'song.wav'), 'wb') as f:
+            f.write(b'older')
+        organizer.detect_duplicate_songs_by_audio()
+        self.assertEqual(sorted(os.listdir(self.backup_dir)), ['song (2).wav', 'song.wav'])
+        self.assertFalse(os.path.exists(self.low))
+        self.assertTrue(os.path.exists(self.high))
+        self.assertEqual(organizer.duplicates, [(self.low, self.high)])
+
+        # ריצה שנייה עם אותו אינדקס - אף קובץ לא מתאים לעצמו
+        again = MusicOrganizer(self.music_dir, self.backup_dir, fingerprint_index=index)
+        again.detect_duplicate_songs_by_audio()
+        self.assertEqual(again.duplicates, [])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.music_dir, 'b'))), ['other.wav', 'song.wav'])
+
+    def test_failed_move_is_not_reported(self):
+        organizer = MusicOrganizer(self.music_dir, self.backup_dir)
+        with patch.object(organizer.move_engine, 'move', return_value=False):
+            organizer.detect_duplicate_songs_by_audio()
+        self.assertEqual(organizer.duplicates, [])
+        self.assertTrue(os.path.exists(self.low))
+
+
+if __name__ == '__main__':
+    unittest.main()
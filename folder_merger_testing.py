@@ -0,0 +1,107 @@
+# test_folder_merger.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from Folder_Merger import SingerMerger
+
+
+class TestSimilarityClusters(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.root, 'singers.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write('')
+        self.library = os.path.join(self.root, 'library')
+        for folder in ['Yossi Berg', 'Yossi Green', 'Yossi Greenberg']:
+            os.makedirs(os.path.join(self.library, folder))
+            with open(os.path.join(self.library, folder, f'{folder}.mp3'), 'w') as f:
+                f.write(folder)
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def test_default_merges_only_names_similar_to_the_target(self):
+        merger = SingerMerger(self.library, self.csv_path)
+        # Berg דומה ל-Greenberg ו-Greenberg ל-Green, אבל Berg לא דומה ל-Green
+        self.assertEqual(merger.find_similarity_clusters(), [['Yossi Berg', 'Yossi Green', 'Yossi Greenberg']])
+        with patch('builtins.input', return_value='2'), patch('builtins.print'):
+            merger.create_similarity_clusters()
+        self.assertEqual(sorted(os.listdir(self.library)), ['Yossi Berg', 'Yossi Green'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.library, 'Yossi Green'))),
+                         ['Yossi Green.mp3', 'Yossi Greenberg.mp3'])
+
+
+class TestMoveFolder(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.root, 'singers.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write('')
+        self.library = os.path.join(self.root, 'library')
+        for folder, files in {'Singer A': ['1.mp3', '2.mp3'], 'Singer B': ['2.mp3']}.items():
+            os.makedirs(os.path.join(self.library, folder))
+            for name in files:
+                with open(os.path.join(self.library, folder, name), 'w') as f:
+                    f.write(folder + name)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self, folder, name):
+        with open(os.path.join(self.library, folder, name)) as f:
+            return f.read()
+
+    def test_files_that_were_not_moved_are_kept(self):
+        with patch('builtins.print'):
+            SingerMerger(self.library, self.csv_path).merge_folders('Singer A', 'Singer B')
+        # 2.mp3 תפוס ביעד - נשאר במקור, והתיקיה לא נמחקת
+        self.assertEqual(os.listdir(os.path.join(self.library, 'Singer A')), ['2.mp3'])
+        self.assertEqual(self.read('Singer A', '2.mp3'), 'Singer A2.mp3')
+        self.assertEqual(self.read('Singer B', '2.mp3'), 'Singer B2.mp3')
+        self.assertEqual(self.read('Singer B', '1.mp3'), 'Singer A1.mp3')
+
+
+class TestMergeByCsv(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.root, 'singers.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write('אברהם פריד,אברהם פריד\nא. פריד,אברהם פריד\nMBD,מרדכי בן דוד\n')
+        self.library = os.path.join(self.root, 'library')
+        for folder in ['אברהם-פריד', 'אברהם פריד', 'א. פריד', 'MBD', 'מרדכי בן-דוד']:
+            os.makedirs(os.path.join(self.library, folder))
+            with open(os.path.join(self.library, folder, f'{folder}.mp3'), 'w') as f:
+                f.write(folder)
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def test_variants_merge_into_the_canonical_folder(self):
+        # סדר הרשימה של os.listdir לא משנה את כיוון המיזוג
+        for listing in (sorted, lambda names: sorted(names, reverse=True)):
+            merger = SingerMerger(self.library, self.csv_path)
+            merger.dir_listing = listing(merger.dir_listing)
+            self.assertEqual(sorted(merger.csv_merge_plan()), [
+                ('MBD', 'מרדכי בן-דוד'),
+                ('א. פריד', 'אברהם פריד'),
+                ('אברהם-פריד', 'אברהם פריד'),
+            ])
+        with patch('builtins.print'):
+            merger.merge_folders_by_csv()
+        self.assertEqual(sorted(os.listdir(self.library)), ['אברהם פריד', 'מרדכי בן-דוד'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.library, 'אברהם פריד'))),
+                         ['א. פריד.mp3', 'אברהם פריד.mp3', 'אברהם-פריד.mp3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,84 @@
+import bisect
+from collections import Counter
 from difflib import SequenceMatcher
 # יבוא פונקציה לקריאת עץ תיקיות
 from os.path import join, getsize
 
+class SimilarityCorpus:
+    """
+אוסף מחרוזות מוכן לחיפוש דמיון חוזר
+
+    Built once and queried many times. Every item keeps its character
+    counts and a SequenceMatcher with the item as the second sequence, so
+    each query only sets the first sequence. top_k() skips candidates
+    with a cascade of upper bounds before the full ratio():
+    length (real_quick_ratio), then shared characters (quick_ratio).
+    Scores are exactly SequenceMatcher(None, text, item).ratio().
+    """
+
+    def __init__(self, text_list):
+        self.items = list(text_list)
+        self._counts = [Counter(item) for item in self.items]
+        self._matchers = [None] * len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _matcher(self, index):
+        matcher = self._matchers[index]
+        if matcher is None:
+            matcher = self._matchers[index] = SequenceMatcher(None, '', self.items[index])
+        return matcher
+
+    def top_k(self, text, k=5, min_score=0.0, skip_exact=True):
+        """
+        The k most similar items as (score, item, index) tuples, best first.
+        Ties keep the list order. skip_exact leaves out items identical to text.
+        """
+        if k <= 0:
+            return []
+        text_len = len(text)
+        text_counts = Counter(text)
+        # הטובים ביותר עד כה: (-ציון, אינדקס), ממוינים
+        best = []
+
+        for index, item in enumerate(self.items):
+            if skip_exact and item == text:
+                continue
+            total = text_len + len(item)
+            if not total:
+                continue
+            # רשימה מלאה - פריט מאוחר יותר נכנס רק עם ציון גבוה ממש מהגרוע ביותר
+            full = len(best) >= k
+            floor = -best[-1][0] if full else min_score
+
+            bound = 2.0 * min(text_len, len(item)) / total
+            if bound < floor or (full and bound == floor):
+                continue
+            counts = self._counts[index]
+            shared = sum(min(count, counts[char]) for char, count in text_counts.items() if char in counts)
+            bound = 2.0 * shared / total
+            if bound < floor or (full and bound == floor):
+                continue
+
+            matcher = self._matcher(index)
+            matcher.set_seq1(text)
+            score = matcher.ratio()
+            if score < floor or (full and score == floor):
+                continue
+            bisect.insort(best, (-score, index))
+            del best[k:]
+
+        return [(-neg_score, self.items[index], index) for neg_score, index in best]
+
+
 def find_text_similarity(text, text_list):
     """
 בדיקת דמיון בין מחרוזת מסויימת לרשימת מחרוזות
     
 פרמטרים:
     פרמטר 1 = מחרוזת טקסט
-    פרמטר 2 = רשימת מחרוזות טקסט
+    פרמטר 2 = רשימת מחרוזות טקסט, או SimilarityCorpus מוכן מראש
 
 תוצאה:
     טאפל עם 3 משתנים:
@@ -16,36 +86,31 @@ def find_text_similarity(text, text_list):
     אייטם 2 - מספר המייצג את רמת הדמיון
     אייטם 3 - כרגע מחזיר "None"
     """
-    # יצירת רשימת דמיונים
-    similarity_list = []
-    for item in text_list:
-        # יצירת אובייקט שמשמש לזיהוי דמיון בין המחרוזות
-        sequence_matcher = SequenceMatcher(None, text, item)
-        # חישוב אחוז הדמיון בין המחרוזות
-        similarity = sequence_matcher.ratio()
-        # הוספת הדמיון לרשימת הדמיונים
-        similarity_list.append(similarity)
-
-    # יצירת רשימה עם המחרוזות ורמת הדמיון שלהם
-    num = 0
-    sum_list = []
-    for item in text_list:
-        name_num = (similarity_list[num], item)
-        sum_list.append(name_num)
-        num += 1
-    sum_list.sort(reverse=True)
-        
-    # מציאת הדמיון המקסימלי ודילוג על זיהוי מלא
-    max_similarity = max(similarity_list)
-    if  max_similarity == 1.0:
-        max_similarity = sorted(set(similarity_list))[-2]
-    
-    # מציאת המחרוזת הדומה ביותר ודילוג על מחרוזת זהה לחלוטין
-    most_similar_string = text_list[similarity_list.index(max_similarity)]
+    corpus = text_list if isinstance(text_list, SimilarityCorpus) else SimilarityCorpus(text_list)
+
+    # המחרוזת הדומה ביותר, בדילוג על מחרוזת זהה לחלוטין
+    found = corpus.top_k(text, k=1)
+    if not found:
+        return None, 0.0, None
+    max_similarity, most_similar_string, index = found[0]
 
     return most_similar_string, max_similarity, None
 
 
+def required_similarity(text, Similarity_sure=True):
+    """
+רמת הדמיון הנדרשת למחרוזת, לפי אורכה ללא רווחים
+ככל שהמחרוזת ארוכה יותר, הסף נמוך יותר
+    """
+    # ניתוח ערכי המשתנים בהתאם לאורך המחרוזת
+    str_len = len(text.replace(" ", ""))
+
+    # הגדרת רמת ההתאמה הנדרשת בתרגיל חשבוני בהתאם לפרמטר שהוכנס לפונקציה
+    if Similarity_sure == False:
+        return 1.0 - (str_len * 0.02)
+    return 1.0 - (str_len * 0.01)
+
+
 # הפונקציה מקבלת ערכי מספרים מפונקציית "find_text_similarity"
 # הפונקציה מחזירה אמת אם המחרוזות מתאימות
 def similarity_sure(text, text_list, Similarity_sure=True):
@@ -56,28 +121,23 @@ def similarity_sure(text, text_list, Similarity_sure=True):
 
 פרמטרים:
     פרמטר 1 = מחרוזת טקסט
-    פרמטר 2 = רשימת מחרוזות טקסט
+    פרמטר 2 = רשימת מחרוזות טקסט, או SimilarityCorpus מוכן מראש
     פרמטר 3 = אופציונלי - הגדרת התאמה גבוהה או בינונית.
 ניתן להכניס אמת או שקר. ברירת המחדל היא אמת.
     
 תוצאה:
     "True" + שם המחרוזת הדומה ביותר' או "False" + "None"
     """
-    # הפעלת הפונקציה לזיהוי דמיון בין מחרוזות וקבלת ערכי משתנים
-    most_similar_string, max_similarity, sum_list = find_text_similarity(text, text_list)
-    
-    # ניתוח ערכי המשתנים בהתאם לאורך המחרוזת
-    str_len = len(text.replace(" ", ""))
+    corpus = text_list if isinstance(text_list, SimilarityCorpus) else SimilarityCorpus(text_list)
+
+    Required_level_similarity = required_similarity(text, Similarity_sure)
+
+    # חיפוש רק מעל הסף - מחרוזות שלא יכולות לעבור אותו נפסלות כבר בחסמים
+    found = corpus.top_k(text, k=1, min_score=Required_level_similarity)
 
-    # הגדרת רמת ההתאמה הנדרשת בתרגיל חשבוני בהתאם לפרמטר שהוכנס לפונקציה
-    if Similarity_sure == False:
-        Required_level_similarity = 1.0 - (str_len * 0.02)
-    elif Similarity_sure == True:
-        Required_level_similarity = 1.0 - (str_len * 0.01)
-    
     # אם רמת הדמיון מספקת, החזר אמת, אם לא החזר שקר
-    if max_similarity >= Required_level_similarity:
-        return True, most_similar_string
+    if found:
+        return True, found[0][1]
     else:
         return False, None
 
@@ -85,8 +145,10 @@ def similarity_sure(text, text_list, Similarity_sure=True):
 def main():
     import os
     text_list = os.listdir()
+    # האינדקס נבנה פעם אחת לכל השאילתות
+    corpus = SimilarityCorpus(text_list)
     for text in text_list:
-        most_similar_string, max_similarity, sum_list = find_text_similarity(text, text_list)
+        most_similar_string, max_similarity, sum_list = find_text_similarity(text, corpus)
         print(text)
         print(f'השם הדומה ביותר למחרוזת הראשונה הוא "{most_similar_string}" עם דמיון של {max_similarity:.2f}')
         print("-" * 70)
@@ -0,0 +1,36 @@
+# test_identify_similarities.py
+import random
+import unittest
+from difflib import SequenceMatcher
+
+from identify_similarities import SimilarityCorpus, find_text_similarity, similarity_sure
+
+
+class TestSimilarityCorpus(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(7)
+        alphabet = 'אבגדהוזח '
+        self.lists = [[''.join(random.choice(alphabet) for _ in range(random.randint(1, 12)))
+                       for _ in range(random.randint(2, 25))] for _ in range(200)]
+
+    def test_top_k_matches_full_sort(self):
+        for text_list in self.lists:
+            corpus = SimilarityCorpus(text_list)
+            query = text_list[0]
+            expected = sorted(((SequenceMatcher(None, query, item).ratio(), item, i)
+                               for i, item in enumerate(text_list) if item != query),
+                              key=lambda entry: (-entry[0], entry[2]))
+            self.assertEqual(corpus.top_k(query, k=3), expected[:3])
+            self.assertEqual(corpus.top_k(query, k=3, min_score=0.6), [e for e in expected[:3] if e[0] >= 0.6])
+
+    def test_find_text_similarity_skips_exact_match(self):
+        text_list = ['אברהם פריד', 'אברם פריד', 'אברהם פריד', 'מרדכי בן דוד']
+        self.assertEqual(find_text_similarity('אברהם פריד', text_list)[0], 'אברם פריד')
+        corpus = SimilarityCorpus(text_list)
+        self.assertEqual(similarity_sure('אברהם פריד', corpus, False), (True, 'אברם פריד'))
+        self.assertEqual(similarity_sure('ישי ריבו', corpus), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+השוואת תיקיות ברקע - QThread עם התקדמות, ביטול ותוצאות בזרימה.
+
+The worker runs FolderComparer.iter_file_lists() and
+iter_similar_folders() off the GUI thread. Progress snapshots
+(ScanProgress) and batches of found pairs reach the window through
+queued signals, and cancel() stops the scan at the next folder or pair.
+"""
+
+import os
+import sys
+import time
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+# מודולים משותפים מתיקיית הפרויקט הראשית
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from find_duplic_albums import FolderComparer
+from scan_progress import ScanProgress, ScanCancelled
+
+BATCH_INTERVAL = 0.2  # שניות בין שליחות של זוגות שנמצאו
+
+
+class ComparisonWorker(QObject):
+    progress = pyqtSignal(dict)  # ScanProgress.snapshot()
+    pairs_found = pyqtSignal(list)  # [((folder, other folder), similarity)]
+    finished = pyqtSignal(int)  # מספר הזוגות שחושבו
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder_paths, preferred_bitrate):
+        super().__init__()
+        self.scan_progress = ScanProgress(self.progress.emit)
+        self.comparer = FolderComparer(folder_paths, preferred_bitrate, progress=self.scan_progress)
+
+    def run(self):
+        try:
+            for _ in self.comparer.iter_file_lists():
+                pass
+
+            # כל הזוגות נשלחים - הסינון לפי סף נעשה במודל
+            pairs_scored = 0
+            batch = []
+            last_sent = time.perf_counter()
+            for folder_pair, similarity in self.comparer.iter_similar_folders():
+                pairs_scored += 1
+                batch.append((folder_pair, similarity))
+                if time.perf_counter() - last_sent >= BATCH_INTERVAL:
+                    self.pairs_found.emit(batch)
+                    batch = []
+                    last_sent = time.perf_counter()
+            if batch:
+                self.pairs_found.emit(batch)
+            self.finished.emit(pairs_scored)
+        except ScanCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def cancel(self):
+        """Thread safe: the scan stops at the next folder or pair."""
+        self.scan_progress.cancel()
+
+
+def start_worker(worker):
+    """Move the worker to a new QThread and start it. The thread quits when the worker is done."""
+    thread = QThread()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for signal in (worker.finished, worker.cancelled, worker.failed):
+        signal.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
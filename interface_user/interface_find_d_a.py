@@ -1,9 +1,15 @@
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton,
     QLabel, QFileDialog, QTextEdit, QWidget, QHBoxLayout,
-    QListWidget, QListWidgetItem, QMessageBox
+    QTableView, QHeaderView, QMessageBox, QComboBox, QProgressBar, QDoubleSpinBox
 )
-from find_duplic_albums import FolderComparer
+from PyQt6.QtCore import Qt
+from comparison_worker import ComparisonWorker, start_worker
+from results_model import SimilarFoldersModel, SCORE_COLUMN
+
+DEFAULT_THRESHOLD = 30.0  # FolderComparer.MINIMAL_SIMILARITY
+
+STAGE_NAMES = {'folders': "Scanning folders", 'pairs': "Scoring folder pairs"}
 
 
 class MainWindow(QMainWindow):
@@ -11,6 +17,8 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("Folder Comparison Tool")
         self.folder_paths = []
+        self.worker = None
+        self.thread = None
 
         main_widget = QWidget()
         layout = QVBoxLayout()
@@ -30,14 +38,44 @@ class MainWindow(QMainWindow):
         self.select_button.clicked.connect(self.select_folder)
         button_layout.addWidget(self.select_button)
 
+        self.bitrate_combo = QComboBox()
+        self.bitrate_combo.addItem("Default quality (128 kbps)", '128')
+        self.bitrate_combo.addItem("Highest quality", 'high')
+        button_layout.addWidget(self.bitrate_combo)
+
         self.execute_button = QPushButton("Execute Comparison")
         self.execute_button.clicked.connect(self.execute_comparison)
         button_layout.addWidget(self.execute_button)
 
-        self.similar_folders_list = QListWidget()
-        layout.addWidget(self.similar_folders_list)
-
-        self.similar_folders = {}
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_comparison)
+        button_layout.addWidget(self.cancel_button)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.progress_label = QLabel("")
+        layout.addWidget(self.progress_label)
+
+        threshold_layout = QHBoxLayout()
+        layout.addLayout(threshold_layout)
+        threshold_layout.addWidget(QLabel("Minimum similarity (%):"))
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(0.0, 100.0)
+        self.threshold_spin.setValue(DEFAULT_THRESHOLD)
+        threshold_layout.addWidget(self.threshold_spin)
+
+        # מודל וירטואלי - שורות נקראות מהמאגר רק כשהן מוצגות
+        self.similar_folders_model = SimilarFoldersModel(DEFAULT_THRESHOLD)
+        self.threshold_spin.valueChanged.connect(self.similar_folders_model.set_threshold)
+        self.similar_folders_view = QTableView()
+        self.similar_folders_view.setModel(self.similar_folders_model)
+        self.similar_folders_view.setSortingEnabled(True)
+        self.similar_folders_view.sortByColumn(SCORE_COLUMN, Qt.SortOrder.DescendingOrder)
+        self.similar_folders_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.similar_folders_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.similar_folders_view.clicked.connect(self.show_similarity_details)
+        layout.addWidget(self.similar_folders_view)
 
     def select_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Folder")
@@ -50,29 +88,66 @@ class MainWindow(QMainWindow):
             self.output_text.append("No folder selected!")
             return
 
+        if self.thread is not None:
+            return
+
         self.output_text.append("Executing comparison...")
-        comparer = FolderComparer(self.folder_paths)
-        folder_files = comparer.get_file_lists()  # Get file lists first
-        self.similar_folders = comparer.find_similar_folders(folder_files)  # Pass file lists to find similar folders
-        self.update_similar_folders_list()
-
-    def update_similar_folders_list(self):
-        self.similar_folders_list.clear()
-        for folder_pair, similarities in self.similar_folders.items():
-            folder_path, other_folder_path = folder_pair
-            item = QListWidgetItem(f"Similar folders: {folder_path} and {other_folder_path}")
-            item.setData(1, folder_pair)  # Storing folder pair data
-            self.similar_folders_list.addItem(item)
-        
-        self.similar_folders_list.itemClicked.connect(self.show_similarity_details)
-
-    def show_similarity_details(self, item):
-        folder_pair = item.data(1)
-        similarities = self.similar_folders[folder_pair]
+        self.similar_folders_model.clear()
+        # הסריקה רצה ב-QThread - החלון ממשיך להגיב, והתוצאות מגיעות בזרימה
+        self.worker = ComparisonWorker(self.folder_paths, self.bitrate_combo.currentData())
+        self.worker.progress.connect(self.update_progress)
+        self.worker.pairs_found.connect(self.similar_folders_model.add_results)
+        self.worker.finished.connect(self.comparison_finished)
+        self.worker.cancelled.connect(self.comparison_cancelled)
+        self.worker.failed.connect(self.comparison_failed)
+        self.thread = start_worker(self.worker)
+        self.execute_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+
+    def cancel_comparison(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def update_progress(self, snapshot):
+        self.progress_bar.setMaximum(max(snapshot['total'], 1))
+        self.progress_bar.setValue(snapshot['done'])
+        text = f"{STAGE_NAMES.get(snapshot['stage'], snapshot['stage'])}: {snapshot['done']}/{snapshot['total']}"
+        if snapshot['eta'] is not None:
+            text += f" (about {snapshot['eta']:.0f} s left)"
+        self.progress_label.setText(text)
+
+    def comparison_finished(self, pairs_scored):
+        self.comparison_stopped(f"Comparison finished: {pairs_scored} folder pairs scored, "
+                                f"{self.similar_folders_model.visible_count()} above the threshold.")
+
+    def comparison_cancelled(self):
+        self.comparison_stopped("Comparison cancelled.")
+
+    def comparison_failed(self, error):
+        self.comparison_stopped(f"Comparison failed: {error}")
+
+    def comparison_stopped(self, message):
+        self.output_text.append(message)
+        self.worker = None
+        self.thread = None
+        self.execute_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        # לא סוגרים חלון כשהשרשור עוד רץ
+        if self.thread is not None:
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait()
+        super().closeEvent(event)
+
+    def show_similarity_details(self, index):
+        folder_pair, details = self.similar_folders_model.details(index)
         details_dialog = QMessageBox()
         details_dialog.setWindowTitle("Similarity Details")
         details_dialog.setText(f"Similar folders: {folder_pair[0]} and {folder_pair[1]}\nSimilarity scores:")
-        details_dialog.setDetailedText("\n".join([f"{param.capitalize()}: {score}" for param, score in similarities.items()]))
+        details_dialog.setDetailedText(details)
         details_dialog.exec()
 
 
@@ -0,0 +1,103 @@
+"""
+מודל תוצאות וירטואלי - QTableView על גבי ResultStore.
+
+Rows are not items: data() reads the row from the store when the view
+paints it. Rows are exposed in FETCH_BATCH steps (canFetchMore /
+fetchMore) as the user scrolls, sorting by score and changing the
+threshold only reset the row count, and the details text is built when
+a row is opened.
+"""
+
+import os
+import sys
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# מודולים משותפים מתיקיית הפרויקט הראשית
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from result_store import ResultStore, pair_score, similarity_details
+
+FETCH_BATCH = 256
+SCORE_COLUMN = 0
+
+
+class SimilarFoldersModel(QAbstractTableModel):
+    COLUMNS = ("Score", "Folder", "Similar folder")
+
+    def __init__(self, threshold=0.0, store=None):
+        super().__init__()
+        self.store = store if store is not None else ResultStore()
+        self.threshold = threshold
+        self.ascending = False
+        self._loaded = 0
+
+    def visible_count(self):
+        return self.store.count_above(self.threshold)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        folder_pair, similarity = self.store.entry(index.row(), self.threshold, self.ascending)
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == SCORE_COLUMN:
+                return f"{pair_score(similarity):.1f}%"
+            return folder_pair[index.column() - 1]
+        if role == Qt.ItemDataRole.UserRole:
+            return folder_pair
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self.visible_count()
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BATCH, self.visible_count() - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.DescendingOrder):
+        """Only the score column sorts; the store is already ordered by it."""
+        if column != SCORE_COLUMN:
+            return
+        self.beginResetModel()
+        self.ascending = order == Qt.SortOrder.AscendingOrder
+        self._loaded = min(self._loaded or FETCH_BATCH, self.visible_count())
+        self.endResetModel()
+
+    def set_threshold(self, threshold):
+        self.beginResetModel()
+        self.threshold = threshold
+        self._loaded = min(FETCH_BATCH, self.visible_count())
+        self.endResetModel()
+
+    def add_results(self, results):
+        """Add streamed (folder pair, similarity) results. Loaded rows may shift to keep the order."""
+        self.layoutAboutToBeChanged.emit()
+        self.store.add_many(results)
+        self.layoutChanged.emit()
+        # הדף הראשון מוצג מיד, השאר לפי גלילה
+        if self._loaded < FETCH_BATCH and self.canFetchMore():
+            self.fetchMore()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self._loaded = 0
+        self.endResetModel()
+
+    def details(self, index):
+        folder_pair, similarity = self.store.entry(index.row(), self.threshold, self.ascending)
+        return folder_pair, similarity_details(folder_pair, similarity)
@@ -0,0 +1,71 @@
+"""
+ייבוא עצל - מודולים כבדים נטענים רק כשמשתמשים בהם.
+
+numpy, PIL and mutagen take most of the startup time of the entry
+points, while a run often needs only some of them (a CLI subcommand, a
+worker process, `--help`). lazy_module() returns a stand-in module that
+imports the real one on first attribute access and forwards every
+attribute to it, so patching the real module is seen through the
+stand-in too.
+lazy_callable() does the same for a single function or class that is
+only called (from mutagen import File), which keeps module-level names
+that tests patch (find_duplic_albums.File).
+
+Imports go through importlib.import_module and its import lock, so the
+first access may come from any thread.
+"""
+
+import sys
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = self.__dict__['_lazy_module'] = importlib.import_module(self._lazy_name)
+        return module
+
+    # כל גישה עוברת למודול האמיתי - כך patch('PIL.Image.open') משפיע גם דרך המודול העצל
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        loaded = self.__dict__['_lazy_module'] is not None
+        return f"<lazy module '{self._lazy_name}'{'' if loaded else ' (not loaded)'}>"
+
+
+def lazy_module(name):
+    """The module if it is already imported, else a LazyModule for it."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def lazy_callable(module_name, attr):
+    """A function that imports module_name on its first call and calls module_name.attr."""
+    target = None
+
+    def call(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), attr)
+        return target(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = attr
+    call.__doc__ = f"Lazy {module_name}.{attr}."
+    return call
@@ -0,0 +1,79 @@
+# test_lazy_import.py
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+from unittest.mock import patch
+
+from lazy_import import LazyModule, lazy_module, lazy_callable
+from find_duplic_albums import FolderComparer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_module_loads_on_first_access(self):
+        module = LazyModule('colorsys')
+        self.assertIn('not loaded', repr(module))
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0.0))
+        self.assertNotIn('not loaded', repr(module))
+        self.assertIs(lazy_module('os'), os)
+
+    def test_patches_are_seen_through_the_stand_in(self):
+        module = LazyModule('json')
+        with patch('json.dumps', return_value='patched'):
+            self.assertEqual(module.dumps({}), 'patched')
+        self.assertEqual(module.dumps({}), '{}')
+
+    def test_lazy_callable(self):
+        dumps = lazy_callable('json', 'dumps')
+        self.assertEqual(dumps.__name__, 'dumps')
+        self.assertEqual(dumps([1]), '[1]')
+
+    def test_entry_points_import_without_heavy_modules_or_input(self):
+        heavy = ('numpy', 'PIL.Image', 'mutagen', 'jibrish_to_hebrew', 'sklearn', 'tkinter', 'requests', 'bs4')
+        code = (f"import sys; sys.path.insert(0, 'o1_project'); "
+                f"import find_duplic_albums, main, Folder_Merger, fda_o1; "
+                f"print(','.join(name for name in {heavy!r} if name in sys.modules))")
+        # stdin סגור - קריאה ל-input() בזמן ייבוא הייתה נכשלת
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+        result = subprocess.run([sys.executable, '-c', "import sys; sys.path.insert(0, 'o1_project'); import ma_o1_b"],
+                                cwd=ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class TestLazyCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.temp_dir, 'music_data.json')
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({'/a': {'files': []}}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_catalog_is_read_on_first_access(self):
+        with patch.object(FolderComparer, 'load_artists_from_csv', return_value={'x': 'y'}) as load_csv:
+            comparer = FolderComparer([self.temp_dir], 'high')
+            comparer.DATA_FILE = self.data_file
+            load_csv.assert_not_called()
+            self.assertEqual(comparer.artists_map, {'x': 'y'})
+            self.assertEqual(comparer.artists_map, {'x': 'y'})
+            load_csv.assert_called_once()
+        self.assertEqual(comparer.music_data, {'/a': {'files': []}})
+
+        comparer.music_data = {}
+        self.assertEqual(comparer.music_data, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+"""
+מחולל ספריית מוזיקה סינתטית לבדיקות ולמדידות ביצועים.
+
+Builds a reproducible fake library (same seed -> same files):
+
+    <root>/<singer>/<album>/<NN> - <title>.mp3|.flac
+
+- audio is a few real MPEG frames (or a bare FLAC STREAMINFO), so
+  mutagen and tag_reader parse it; with payload='sparse' the file is
+  extended with a hole to the size of a real track, giving realistic
+  durations without using disk space,
+- duplicate_rate of the albums get a second copy elsewhere in the
+  library; retagged_rate of those copies have edited tags and the
+  other bitrate (a different hash, same album),
+- jibrish_rate of the albums have their tags stored as cp1255 bytes
+  read as latin-1, the way old Windows taggers wrote Hebrew,
+- cover_rate of the albums get a small cover.jpg.
+
+Used by the unit tests (as fixtures) and by the benchmarks/ scripts.
+
+    python library_generator.py <root> [folders] [tracks]
+"""
+
+import os
+import sys
+import random
+
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, TRCK, TCON
+from mutagen.flac import FLAC
+from PIL import Image
+
+# MPEG1 Layer III, 44.1 kHz: אינדקס קצב הסיביות בכותרת המסגרת
+MP3_BITRATE_INDEX = {128: 9, 320: 14}
+SAMPLE_RATE = 44100
+TINY_FRAMES = 40
+
+SINGERS = ['אברהם פריד', 'מרדכי בן דוד', 'יעקב שוואקי', 'ישי ריבו', 'מוטי שטיינמץ', 'בני פרידמן',
+           'חיים ישראל', 'אהרן רזאל', 'שלומי שבת', 'דודו פישר', 'Lipa Schmeltzer', 'Avraham Fried']
+WORDS = ['שיר', 'אהבה', 'לב', 'אור', 'שמחה', 'תפילה', 'ירושלים', 'נשמה', 'חלום', 'דרך', 'בית',
+         'שלום', 'אמונה', 'ניגון', 'גאולה', 'Night', 'Light', 'Heart', 'Home', 'Song']
+GENRES = ['Pop', 'חסידי', 'מזרחי', 'Rock']
+
+
+def jibrish(text):
+    """Hebrew as an old tagger stored it: cp1255 bytes shown as latin-1."""
+    try:
+        return text.encode('cp1255').decode('latin-1')
+    except UnicodeEncodeError:
+        return text
+
+
+def mp3_frame(kbps):
+    header = bytes([0xff, 0xfb, MP3_BITRATE_INDEX[kbps] << 4, 0])
+    return header.ljust(144000 * kbps // SAMPLE_RATE, b'\x00')
+
+
+def write_mp3(path, tags, kbps=128, seconds=200, payload='tiny'):
+    # התגית נכתבת ראשונה - שמירה אחרי האודיו הייתה מעתיקה את הקובץ וממלאת את החור
+    open(path, 'wb').close()
+    id3 = ID3()
+    id3.add(TIT2(encoding=tags['encoding'], text=tags['title']))
+    id3.add(TPE1(encoding=tags['encoding'], text=tags['artist']))
+    id3.add(TALB(encoding=tags['encoding'], text=tags['album']))
+    id3.add(TRCK(encoding=0, text=tags['tracknumber']))
+    id3.add(TCON(encoding=3, text=tags['genre']))
+    id3.save(path)
+
+    frame = mp3_frame(kbps)
+    with open(path, 'ab') as f:
+        if payload == 'sparse':
+            # כמה מסגרות ואז חור עד לגודל של שיר אמיתי - mutagen מחשב משך מהגודל
+            f.write(frame * 4)
+            f.truncate(f.tell() - len(frame) * 4 + int(seconds * kbps * 1000 / 8))
+        else:
+            f.write(frame * (TINY_FRAMES + int(seconds) % 40))
+
+
+def write_flac(path, tags, seconds=200, payload='tiny'):
+    total_samples = int(seconds * SAMPLE_RATE)
+    streaminfo = (
+        b'fLaC' + b'\x80\x00\x00\x22' +
+        b'\x10\x00\x10\x00\x00\x00\x00\x00\x00\x00' +
+        (SAMPLE_RATE << 44 | 1 << 41 | 15 << 36 | total_samples).to_bytes(8, 'big') +
+        b'\x00' * 16
+    )
+    with open(path, 'wb') as f:
+        f.write(streaminfo + b'\x00' * 64)
+    audio = FLAC(path)
+    for key in ('title', 'artist', 'album', 'tracknumber', 'genre'):
+        audio[key] = tags[key]
+    audio.save()
+    if payload == 'sparse':
+        # כ-900 kbps, כמו FLAC אמיתי
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) + int(seconds * 900 * 1000 / 8))
+
+
+def write_cover(path, rng, size=300):
+    color = tuple(rng.randrange(256) for _ in range(3))
+    img = Image.new('RGB', (size, size), color)
+    # פס בצבע אחר - שלא כל העטיפות יהיו צבע אחיד
+    img.paste(tuple(255 - c for c in color), (0, size // 3, size, size // 2))
+    img.save(path, quality=85)
+
+
+def _title(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def plan_library(folders=50, tracks=10, duplicate_rate=0.2, retagged_rate=0.5, jibrish_rate=0.05,
+                 cover_rate=0.5, flac_rate=0.2, seed=0):
+    """The albums to write, as dicts. Copies refer to their original by index."""
+    rng = random.Random(seed)
+    albums = []
+    originals = max(1, int(round(folders / (1 + duplicate_rate))))
+    for index in range(originals):
+        singer = rng.choice(SINGERS)
+        name = f"{_title(rng)} {index}"
+        track_count = max(3, tracks + rng.randint(-2, 2))
+        albums.append({
+            'singer': singer,
+            'folder': name,
+            'album': name,
+            'tracks': [{'title': _title(rng), 'seconds': rng.uniform(120, 420)} for _ in range(track_count)],
+            'genre': rng.choice(GENRES),
+            'format': 'flac' if rng.random() < flac_rate else 'mp3',
+            'kbps': rng.choice([128, 320]),
+            'jibrish': rng.random() < jibrish_rate,
+            'cover': rng.random() < cover_rate,
+            'copy_of': None,
+            'retagged': False,
+        })
+
+    for index in range(folders - originals):
+        original_index = rng.randrange(originals)
+        original = albums[original_index]
+        retagged = rng.random() < retagged_rate
+        copy = dict(original, copy_of=original_index, retagged=retagged)
+        # עותק בתיקיית זמר אחר או תחת שם תיקייה אחר
+        if rng.random() < 0.5:
+            copy['singer'] = rng.choice(SINGERS)
+            copy['folder'] = original['folder']
+        else:
+            copy['folder'] = f"{original['folder']} ({rng.choice(['copy', 'עותק', '2', 'FLAC'])})"
+        if retagged:
+            copy['kbps'] = 128 if original['kbps'] == 320 else 320
+            copy['tracks'] = [dict(track, title=track['title'] + rng.choice(['', ' ', '!', ' (רמיקס)']))
+                              for track in original['tracks']]
+            copy['album'] = original['album'] + rng.choice(['', ' - Deluxe', ' (מהדורה מחודשת)'])
+            copy['jibrish'] = rng.random() < jibrish_rate
+        albums.append(copy)
+    return albums
+
+
+def generate_library(root, folders=50, tracks=10, duplicate_rate=0.2, retagged_rate=0.5, jibrish_rate=0.05,
+                     cover_rate=0.5, flac_rate=0.2, payload='tiny', seed=0):
+    """
+    Write a library under root. Returns {'folders': [paths], 'duplicates':
+    [(original path, copy path)], 'files': number of audio files}.
+    """
+    albums = plan_library(folders, tracks, duplicate_rate, retagged_rate, jibrish_rate, cover_rate, flac_rate, seed)
+    summary = {'folders': [], 'duplicates': [], 'files': 0}
+    for position, album in enumerate(albums):
+        folder = os.path.join(root, album['singer'], album['folder'])
+        while folder in summary['folders']:
+            folder += '_'
+        os.makedirs(folder, exist_ok=True)
+        summary['folders'].append(folder)
+        if album['copy_of'] is not None:
+            summary['duplicates'].append((summary['folders'][album['copy_of']], folder))
+
+        encode = jibrish if album['jibrish'] else (lambda text: text)
+        for number, track in enumerate(album['tracks'], 1):
+            tags = {
+                'title': encode(track['title']),
+                'artist': encode(album['singer']),
+                'album': encode(album['album']),
+                'tracknumber': str(number),
+                'genre': album['genre'],
+                # ג'יבריש נשמר כ-latin-1, כמו שתוכנות ישנות כתבו
+                'encoding': 0 if album['jibrish'] else 3,
+            }
+            file_name = f"{number:02d} - {track['title']}.{album['format']}"
+            path = os.path.join(folder, file_name)
+            if album['format'] == 'flac':
+                write_flac(path, tags, track['seconds'], payload)
+            else:
+                write_mp3(path, tags, album['kbps'], track['seconds'], payload)
+            summary['files'] += 1
+
+        if album['cover']:
+            original = album['copy_of']
+            # לעותק אותה עטיפה כמו למקור
+            cover_rng = random.Random(seed * 1000003 + (original if original is not None else position))
+            write_cover(os.path.join(folder, 'cover.jpg'), cover_rng, 300 if not album['retagged'] else 200)
+    return summary
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    root = sys.argv[1]
+    folders = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    tracks = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    if os.path.exists(root) and os.listdir(root):
+        print(f"{root} is not empty.")
+        sys.exit(1)
+    summary = generate_library(root, folders, tracks, payload='sparse')
+    print(f"{len(summary['folders'])} folders, {summary['files']} files, "
+          f"{len(summary['duplicates'])} duplicate albums under {root}")
+
+
+if __name__ == '__main__':
+    main()
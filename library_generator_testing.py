@@ -0,0 +1,62 @@
+# test_library_generator.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen import File
+
+from library_generator import generate_library, jibrish, SINGERS
+from tag_reader import read_tags
+
+
+def library_tags(root):
+    tags = {}
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            tags[os.path.relpath(path, root)] = None if name == 'cover.jpg' else read_tags(path)
+    return tags
+
+
+class TestLibraryGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_same_seed_same_library(self):
+        first = generate_library(os.path.join(self.test_dir, 'a'), folders=12, tracks=4, seed=3)
+        second = generate_library(os.path.join(self.test_dir, 'b'), folders=12, tracks=4, seed=3)
+        self.assertEqual(len(first['folders']), 12)
+        self.assertEqual(first['files'], second['files'])
+        self.assertEqual(library_tags(os.path.join(self.test_dir, 'a')), library_tags(os.path.join(self.test_dir, 'b')))
+
+    def test_duplicates_and_jibrish(self):
+        summary = generate_library(self.test_dir, folders=12, tracks=4, duplicate_rate=0.5, jibrish_rate=1.0, seed=1)
+        self.assertEqual(len(summary['duplicates']), 12 - round(12 / 1.5))
+        for original, copy in summary['duplicates']:
+            self.assertTrue(os.path.isdir(original))
+            self.assertTrue(os.path.isdir(copy))
+
+        path = os.path.join(summary['folders'][0], sorted(os.listdir(summary['folders'][0]))[0])
+        artist = File(path, easy=True)['artist'][0]
+        # התגית נשמרה כ-latin-1 ומתפענחת חזרה לעברית
+        self.assertIn(artist.encode('latin-1').decode('cp1255'), SINGERS)
+        self.assertEqual(jibrish(artist.encode('latin-1').decode('cp1255')), artist)
+
+    def test_sparse_payload_has_real_duration(self):
+        summary = generate_library(self.test_dir, folders=2, tracks=3, duplicate_rate=0.0, flac_rate=0.0,
+                                   payload='sparse', seed=2)
+        folder = summary['folders'][0]
+        for name in os.listdir(folder):
+            if name.endswith('.mp3'):
+                duration = read_tags(os.path.join(folder, name))['duration']
+                self.assertGreaterEqual(duration, 119)
+                self.assertLessEqual(duration, 421)
+
+
+if __name__ == '__main__':
+    unittest.main()
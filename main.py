@@ -1,12 +1,22 @@
 import os
-from jibrish_to_hebrew import fix_jibrish, check_jibrish
-from mutagen import File
-from mutagen.easyid3 import EasyID3
+from lazy_import import lazy_callable
+from tag_padding import padding_policy
+from rename_planner import RenamePlanner
+from tag_buffer import TagBuffer
+
+fix_jibrish = lazy_callable('jibrish_to_hebrew', 'fix_jibrish')
+check_jibrish = lazy_callable('jibrish_to_hebrew', 'check_jibrish')
+File = lazy_callable('mutagen', 'File')
+EasyID3 = lazy_callable('mutagen.easyid3', 'EasyID3')
 
 # הפעלה ראשונית ופעולות בסיס
 class FileManager:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, tag_buffer=None, rename_planner=None):
         self.root_dir = root_dir
+        # TagBuffer אופציונלי - שינויי תגיות נשמרים פעם אחת לכל קובץ בסוף הריצה
+        self.tag_buffer = tag_buffer
+        # RenamePlanner משותף - אם הוגדר, שינויי השמות מבוצעים ע"י מי שיצר אותו
+        self.rename_planner = rename_planner
 
     def perform_action(self, action):
         if action == 1:
@@ -39,6 +49,29 @@ class FileManager:
         else:    
             return (f'Num. of {description}: {self.counting}')
 
+    def save_tags(self, file_path, audiofile, changes):
+        """שמירת שינויי תגיות - ישירות לקובץ או דרך ה-TagBuffer"""
+        if self.tag_buffer is not None:
+            self.tag_buffer.stage(file_path, changes)
+        else:
+            audiofile.save(padding=padding_policy)
+
+    def current_tag(self, file_path, audiofile, key):
+        """ערך תגית כולל שינויים שממתינים ב-TagBuffer"""
+        value = audiofile.get(key)
+        if self.tag_buffer is not None:
+            value = self.tag_buffer.get(file_path, key, value)
+        return value
+
+    def execute_renames(self, planner):
+        """ביצוע שינויי השמות שנאספו, אצווה אחת לכל תיקיה"""
+        return planner.execute(tag_buffer=self.tag_buffer)
+
+    def flush_tags(self):
+        """כתיבת כל שינויי התגיות שהצטברו"""
+        if self.tag_buffer is not None:
+            return self.tag_buffer.flush()
+
     def run_func(self, func_name):
         '''רצף פעולות קבוע שמפעיל פונקציה רצויה על מערכת הקבצים'''
 
@@ -106,6 +139,9 @@ class FixNames(FileManager):
     def fix_track_names(self):
         '''Replace "track" with "רצועה" in file names and titles'''
         
+        # שינויי השמות נאספים ומבוצעים אחרי הסריקה, לא בתוך os.walk
+        planner = self.rename_planner if self.rename_planner is not None else RenamePlanner()
+
         for file_path in self.list_generator:
             file_name = os.path.basename(file_path)
             file_name, file_extension = os.path.splitext(file_name)
@@ -117,14 +153,15 @@ class FixNames(FileManager):
             changed = False
 
             # Check if "track" exists in the title
-            if audiofile.get('title') and "track" in audiofile.get('title')[0].lower():
+            title = self.current_tag(file_path, audiofile, 'title')
+            if title and "track" in title[0].lower():
                 # Replace "track" with "רצועה" in the title
                 try:
-                    new_title = audiofile.get('title')[0].lower().replace("track", "רצועה")
+                    new_title = title[0].lower().replace("track", "רצועה")
                     audiofile['title'] = new_title
                     print(f"Updated Title: {new_title}")
                     changed = True
-                    audiofile.save()
+                    self.save_tags(file_path, audiofile, {'title': new_title})
                 except:
                     pass
  
@@ -133,14 +170,17 @@ class FixNames(FileManager):
                 # Replace "track" with "רצועה" in the file name
                 new_file_name = file_name.lower().replace("track", "רצועה") + file_extension
                 new_file_path = os.path.join(os.path.dirname(file_path), new_file_name)
-                os.rename(file_path, new_file_path)
-                print(f"Updated File Name: {new_file_path}")
+                planner.propose(file_path, new_file_path, 'track-word')
+                print(f"Planned File Name: {new_file_path}")
                 changed = True
 
             # Save changes to the MP3 file if changes were made
             if changed:
                 self.files_procces.add(file_path)
 
+        if self.rename_planner is None:
+            self.execute_renames(planner)
+
         return self.files_procces, 'Track names fixed'
 
 
@@ -157,12 +197,15 @@ class FixNames(FileManager):
             
             # Define the fields to check and update
             fields_to_check = ['album', 'title', 'artist', 'albumartist', 'genre']
+            changes = {}
             
             for field in fields_to_check:
                 try:
-                    if field in audiofile and check_jibrish(audiofile[field][0]):
-                        new_value = fix_jibrish(audiofile[field][0])
+                    value = self.current_tag(file_path, audiofile, field)
+                    if value and check_jibrish(value[0]):
+                        new_value = fix_jibrish(value[0])
                         audiofile[field] = new_value
+                        changes[field] = new_value
                         print(f"Updated {field.capitalize()}: {new_value}")
                         changed = True
                 except:
@@ -170,7 +213,7 @@ class FixNames(FileManager):
                 
             # Save changes to the MP3 file if changes were made
             if changed:
-                audiofile.save()
+                self.save_tags(file_path, audiofile, changes)
                 self.files_procces.add(file_path)
                         
         return self.files_procces, 'Damaged files repaired'
@@ -189,7 +232,8 @@ if __name__ == "__main__":
             print("The entered path does not exist. Please enter a valid path.")
 
 
-    file_manager = FileManager(root_directory)
+    # שינויי התגיות נשמרים פעם אחת לכל קובץ בסוף הפעולה
+    file_manager = FileManager(root_directory, TagBuffer())
 
     while True: 
         action = input('''
@@ -207,3 +251,4 @@ Choose action:
             print('Please enter a valid number to continue!')
 
     file_manager.perform_action(int(action))
+    file_manager.flush_tags()
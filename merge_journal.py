@@ -0,0 +1,310 @@
+"""
+יומן מיזוג - רישום פעולות, המשך אחרי קריסה וביטול.
+
+MergeFolders.merge and SingerMerger.merge_folders change the library in
+place (tag saves, cover copies, moves, folder removal). Every operation
+is written to an append-only JSON Lines journal before it runs
+(state "planned") and after it finishes (state "done"):
+
+- fsync is batched: the file is synced every SYNC_EVERY records and
+  always before an operation that can't be undone.
+- start() resumes the last run if it never finished; operations that
+  are already done are skipped.
+- undo() rolls a run back, newest operation first. Every reversed
+  operation is recorded, and the run is marked undone only when all of
+  them were reversed, so a failed undo can be run again.
+
+    python merge_journal.py show <journal>
+    python merge_journal.py undo <journal> [--run RUN_ID]
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+import threading
+
+from lazy_import import lazy_callable
+from tag_padding import padding_policy
+
+File = lazy_callable('mutagen', 'File')
+
+JOURNAL_NAME = '.merge_journal.jsonl'
+SYNC_EVERY = 32  # רשומות בין סנכרון לדיסק
+IRREVERSIBLE_OPS = {'rmtree'}
+
+
+def _op_key(op, args):
+    return op, json.dumps(args, sort_keys=True, ensure_ascii=False)
+
+
+class MergeJournal:
+    def __init__(self, journal_path, sync_every=SYNC_EVERY):
+        self.journal_path = journal_path
+        self.sync_every = sync_every
+        self.run_id = None
+        self._file = None
+        self._unsynced = 0
+        self._seq = 0
+        # MoveEngine מריץ פעולות במקביל
+        self._lock = threading.Lock()
+        # (op, args) -> state, for the current (possibly resumed) run
+        self._states = {}
+
+    # --------------------------- Reading --------------------------- #
+
+    @staticmethod
+    def load(journal_path):
+        """All records of a journal. A torn last line (crash mid-write) is ignored."""
+        records = []
+        if not os.path.exists(journal_path):
+            return records
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def _repair(self):
+        """Cut a torn last line, so new records start on a line of their own."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                f.seek(0)
+                f.truncate(f.read().rfind(b'\n') + 1)
+
+    @staticmethod
+    def runs(records):
+        """run id -> {'started', 'finished', 'undone', 'ops', 'reversed'} in journal order."""
+        runs = {}
+        for record in records:
+            run = runs.setdefault(record['run'], {'started': None, 'finished': False, 'undone': False, 'ops': [],
+                                                  'reversed': set()})
+            kind = record.get('type')
+            if kind == 'reversed':
+                run['reversed'].add(_op_key(record['op'], record['args']))
+            elif kind == 'start':
+                run['started'] = record.get('time')
+            elif kind == 'end':
+                run['finished'] = True
+            elif kind == 'undo':
+                run['undone'] = True
+            else:
+                run['ops'].append(record)
+        return runs
+
+    # --------------------------- Writing --------------------------- #
+
+    def _write(self, record, sync=False):
+        record['run'] = self.run_id
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= self.sync_every:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def start(self, resume=True):
+        """
+        Open the journal for a run. If resume is set and the last run never
+        finished, continue it: its completed operations will be skipped.
+        Returns the run id.
+        """
+        self._repair()
+        runs = self.runs(self.load(self.journal_path))
+        unfinished = [run_id for run_id, run in runs.items() if not run['finished'] and not run['undone']]
+
+        if resume and unfinished:
+            self.run_id = unfinished[-1]
+            for record in runs[self.run_id]['ops']:
+                self._states[_op_key(record['op'], record['args'])] = record['state']
+                self._seq = max(self._seq, record.get('seq', 0))
+            done = sum(1 for state in self._states.values() if state == 'done')
+            print(f"Resuming merge run {self.run_id} ({done} operations already done).")
+        else:
+            self.run_id = uuid.uuid4().hex[:12]
+
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        if self.run_id not in runs:
+            self._write({'type': 'start', 'time': time.time()}, sync=True)
+        return self.run_id
+
+    def perform(self, op, action, **args):
+        """
+        Journal and run one operation. action is called with no arguments.
+        Returns False if the operation was already done in the resumed run.
+        """
+        key = _op_key(op, args)
+        state = self._states.get(key)
+        if state == 'done':
+            return False
+        if state == 'planned' and _already_applied(op, args):
+            # הקריסה הייתה אחרי הפעולה ולפני רישום הסיום
+            self._done(key, op, args)
+            return False
+
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        self._write({'seq': seq, 'op': op, 'state': 'planned', 'args': args}, sync=op in IRREVERSIBLE_OPS)
+        self._states[key] = 'planned'
+        try:
+            action()
+        except Exception as e:
+            self._write({'seq': seq, 'op': op, 'state': 'failed', 'args': args, 'error': str(e)})
+            self._states[key] = 'failed'
+            raise
+        self._done(key, op, args, seq)
+        return True
+
+    def is_done(self, op, **args):
+        """True if the operation was already done in the current (resumed) run."""
+        return self._states.get(_op_key(op, args)) == 'done'
+
+    def _done(self, key, op, args, seq=None):
+        self._write({'seq': seq, 'op': op, 'state': 'done', 'args': args})
+        self._states[key] = 'done'
+
+    def finish(self):
+        """Mark the run complete, so the next start() begins a new run."""
+        self._write({'type': 'end', 'time': time.time()}, sync=True)
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    # --------------------------- Undo --------------------------- #
+
+    def undo(self, run_id=None):
+        """
+        Roll back a run (default: the newest one that wasn't undone).
+        Returns the number of operations reversed.
+        """
+        runs = self.runs(self.load(self.journal_path))
+        candidates = [r for r, run in runs.items() if not run['undone']]
+        if run_id is None:
+            if not candidates:
+                print("Nothing to undo.")
+                return 0
+            run_id = candidates[-1]
+        elif run_id not in candidates:
+            print(f"Run {run_id} not found or already undone.")
+            return 0
+
+        run = runs[run_id]
+        # פעולות שכבר בוטלו בניסיון קודם מדולגות
+        done = [record for record in run['ops'] if record['state'] == 'done'
+                and _op_key(record['op'], record['args']) not in run['reversed']]
+        self.run_id = run_id
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        reversed_count = 0
+        failed = 0
+        for record in reversed(done):
+            try:
+                if _undo_op(record['op'], record['args']):
+                    reversed_count += 1
+            except Exception as e:
+                print(f"Error undoing {record['op']} {record['args']}: {e}")
+                failed += 1
+                continue
+            self._write({'type': 'reversed', 'op': record['op'], 'args': record['args']})
+
+        if failed:
+            print(f"{failed} operations of run {run_id} could not be undone; run undo again to retry.")
+        else:
+            self._write({'type': 'undo', 'time': time.time()}, sync=True)
+        self.close()
+        print(f"Undid {reversed_count} of {len(done)} operations of run {run_id}.")
+        return reversed_count
+
+
+def journaled(journal, op, action, **args):
+    """Run action through the journal, or directly when there is no journal."""
+    if journal is None:
+        action()
+        return True
+    return journal.perform(op, action, **args)
+
+
+def _already_applied(op, args):
+    """Check the disk for a planned operation whose 'done' record was lost."""
+    if op in ('move', 'rename'):
+        return not os.path.exists(args['src']) and os.path.exists(args['dst'])
+    if op == 'copy':
+        return os.path.exists(args['dst']) and os.path.getsize(args['dst']) == os.path.getsize(args['src'])
+    if op in ('rmdir', 'rmtree'):
+        return not os.path.exists(args['path'])
+    return False
+
+
+def _undo_op(op, args):
+    """Reverse one completed operation. Returns True if something was undone."""
+    if op in ('move', 'rename'):
+        if os.path.exists(args['src']) and not os.path.exists(args['dst']):
+            # כבר הוחזר
+            return False
+        if os.path.exists(args['src']) or not os.path.exists(args['dst']):
+            raise OSError(f"Cannot move back {args['dst']} -> {args['src']}")
+        os.makedirs(os.path.dirname(args['src']), exist_ok=True)
+        shutil.move(args['dst'], args['src'])
+        return True
+    if op == 'copy':
+        if os.path.exists(args['dst']):
+            os.remove(args['dst'])
+            return True
+        return False
+    if op == 'rmdir':
+        os.makedirs(args['path'], exist_ok=True)
+        return True
+    if op == 'tags':
+        # המיזוג רק ממלא שדות ריקים - הביטול מוחק אותם
+        audio = File(args['path'], easy=True)
+        if audio is None or audio.tags is None:
+            return False
+        removed = [key for key in args['keys'] if key in audio]
+        for key in removed:
+            del audio[key]
+        if removed:
+            audio.save(padding=padding_policy)
+        return bool(removed)
+    if op == 'rmtree':
+        print(f"Cannot restore removed folder {args['path']}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or roll back merge runs")
+    parser.add_argument('command', choices=['show', 'undo'])
+    parser.add_argument('journal', help="journal file")
+    parser.add_argument('--run', help="run id (default: the last run)")
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for run_id, run in MergeJournal.runs(MergeJournal.load(args.journal)).items():
+            status = 'undone' if run['undone'] else 'finished' if run['finished'] else 'unfinished'
+            done = sum(1 for record in run['ops'] if record['state'] == 'done')
+            print(f"{run_id}  {time.ctime(run['started'] or 0)}  {status}  {done} operations")
+    else:
+        MergeJournal(args.journal).undo(args.run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# test_merge_journal.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen.easyid3 import EasyID3
+
+from merge_journal import MergeJournal
+from Folder_Merger import SingerMerger
+from find_duplic_albums import MergeFolders
+from tag_buffer import TagBuffer
+
+
+def make_mp3(path, **tags):
+    # MPEG1 Layer III 128kbps, 44.1 kHz
+    with open(path, 'wb') as f:
+        f.write(bytes([0xff, 0xfb, 0x90, 0]).ljust(417, b'\x00') * 40)
+    audio = EasyID3()
+    audio.update(tags)
+    audio.save(path)
+
+
+class TestMergeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.root, 'journal.jsonl')
+        self.csv_path = os.path.join(self.root, 'singers.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write('')
+        self.library = os.path.join(self.root, 'library')
+        for folder, files in {'Singer A': ['1.mp3', '2.mp3'], 'Singer B': ['3.mp3']}.items():
+            os.makedirs(os.path.join(self.library, folder))
+            for name in files:
+                with open(os.path.join(self.library, folder, name), 'w') as f:
+                    f.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def listing(self):
+        return {folder: sorted(os.listdir(os.path.join(self.library, folder)))
+                for folder in sorted(os.listdir(self.library))}
+
+    def test_merge_and_undo(self):
+        before = self.listing()
+        journal = MergeJournal(self.journal_path)
+        journal.start()
+        SingerMerger(self.library, self.csv_path, journal).merge_folders('Singer A', 'Singer B')
+        journal.finish()
+        self.assertEqual(self.listing(), {'Singer B': ['1.mp3', '2.mp3', '3.mp3']})
+
+        self.assertEqual(MergeJournal(self.journal_path).undo(), 3)
+        self.assertEqual(self.listing(), before)
+        # ריצה שבוטלה לא מבוטלת פעמיים
+        self.assertEqual(MergeJournal(self.journal_path).undo(), 0)
+
+    def test_failed_undo_can_be_retried(self):
+        before = self.listing()
+        journal = MergeJournal(self.journal_path)
+        journal.start()
+        SingerMerger(self.library, self.csv_path, journal).merge_folders('Singer A', 'Singer B')
+        journal.finish()
+
+        # קובץ שהועבר חסר - הביטול שלו נכשל והריצה לא מסומנת כמבוטלת
+        moved = os.path.join(self.library, 'Singer B', '1.mp3')
+        os.rename(moved, os.path.join(self.root, 'aside.mp3'))
+        self.assertEqual(MergeJournal(self.journal_path).undo(), 2)
+        (run,) = MergeJournal.runs(MergeJournal.load(self.journal_path)).values()
+        self.assertFalse(run['undone'])
+
+        os.rename(os.path.join(self.root, 'aside.mp3'), moved)
+        self.assertEqual(MergeJournal(self.journal_path).undo(), 1)
+        self.assertEqual(self.listing(), before)
+        (run,) = MergeJournal.runs(MergeJournal.load(self.journal_path)).values()
+        self.assertTrue(run['undone'])
+
+    def test_resume_skips_done_operations(self):
+        journal = MergeJournal(self.journal_path)
+        run_id = journal.start()
+        src = os.path.join(self.library, 'Singer A', '1.mp3')
+        dst = os.path.join(self.library, 'Singer B', '1.mp3')
+        journal.perform('move', lambda: shutil.move(src, dst), src=src, dst=dst)
+        # קריסה: הפעולה הבאה בוצעה אבל רישום הסיום לא נכתב, והשורה האחרונה נקטעה
+        src2 = os.path.join(self.library, 'Singer A', '2.mp3')
+        dst2 = os.path.join(self.library, 'Singer B', '2.mp3')
+        journal._write({'seq': 2, 'op': 'move', 'state': 'planned', 'args': {'src': src2, 'dst': dst2}})
+        shutil.move(src2, dst2)
+        journal._file.write('{"seq": 2, "op"')
+        journal.close()
+
+        calls = []
+        resumed = MergeJournal(self.journal_path)
+        self.assertEqual(resumed.start(), run_id)
+        self.assertFalse(resumed.perform('move', lambda: calls.append(1), src=src, dst=dst))
+        self.assertFalse(resumed.perform('move', lambda: calls.append(2), src=src2, dst=dst2))
+        self.assertEqual(calls, [])
+        resumed.finish()
+
+        # ריצה חדשה אחרי ריצה שהסתיימה
+        self.assertNotEqual(MergeJournal(self.journal_path).start(), run_id)
+
+    def test_staged_tags_survive_a_crash_before_flush(self):
+        preferred, other = os.path.join(self.root, 'preferred'), os.path.join(self.root, 'other')
+        os.makedirs(preferred)
+        os.makedirs(other)
+        make_mp3(os.path.join(preferred, '1.mp3'), title='שיר')
+        make_mp3(os.path.join(other, '1.mp3'), title='שיר', album='אלבום')
+        folder_files = {preferred: {'files': [{'file': '1.mp3', 'file_hash': 'h', 'bitrate': 320}]},
+                        other: {'files': [{'file': '1.mp3', 'file_hash': 'h', 'bitrate': 128}]}}
+        organized_info = {(preferred, other): ((90.0, {}), (80.0, {}))}
+        similar = [((preferred, other), {'weighted_score': 100.0})]
+
+        def merger(journal):
+            return MergeFolders(organized_info, folder_files, 'high', similar, TagBuffer(), journal)
+
+        journal = MergeJournal(self.journal_path)
+        journal.start()
+        merger(journal).merge()
+        # קריסה לפני flush_tags - הזוג לא סומן כממוזג
+        journal.close()
+        self.assertNotIn('album', EasyID3(os.path.join(preferred, '1.mp3')))
+
+        resumed = MergeJournal(self.journal_path)
+        resumed.start()
+        resumed_merger = merger(resumed)
+        resumed_merger.merge()
+        self.assertEqual(resumed_merger.flush_tags()['files_saved'], 1)
+        resumed.finish()
+        self.assertEqual(EasyID3(os.path.join(preferred, '1.mp3'))['album'], ['אלבום'])
+
+        self.assertEqual(MergeJournal(self.journal_path).undo(), 1)
+        self.assertNotIn('album', EasyID3(os.path.join(preferred, '1.mp3')))
+
+
+if __name__ == '__main__':
+    unittest.main()
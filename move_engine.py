@@ -0,0 +1,248 @@
+"""
+מנוע העברת קבצים - שינוי שם באותו כונן, העתקה מקבילית בין כוננים.
+
+shutil.move falls back to copy+delete file by file when source and
+target are on different drives (D: to E:). MoveEngine:
+
+- uses a plain rename when source and target share a device,
+- otherwise copies in parallel with os.copy_file_range / os.sendfile
+  (a buffered copy where those aren't available), verifies the copy
+  (size, or MD5 with verify='hash') and only then removes the source,
+- never overwrites: a move onto an existing file fails (as shutil.move
+  does on Windows), and the caller decides on another name,
+- reports files, bytes and throughput.
+
+Moves can go through a MergeJournal (see merge_journal.py).
+"""
+
+import os
+import time
+import uuid
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from merge_journal import journaled
+
+COPY_CHUNK = 8 * 1024 * 1024  # בתים לכל קריאת מערכת
+COPY_WORKERS = 4
+
+
+def _file_md5(file_path):
+    hash_md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash_md5.update(chunk)
+    return hash_md5.digest()
+
+
+def _existing_parent(path):
+    """The nearest existing directory at or above path (targets may not exist yet)."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def same_device(src, dst):
+    """True if dst (or its nearest existing parent) is on the same device as src."""
+    try:
+        return os.stat(src).st_dev == os.stat(_existing_parent(dst)).st_dev
+    except OSError:
+        return False
+
+
+def _copy_fd(fd_in, fd_out, size):
+    """Copy size bytes between file descriptors in the kernel where possible."""
+    offset = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < size:
+                sent = os.copy_file_range(fd_in, fd_out, min(COPY_CHUNK, size - offset))
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            # מערכת קבצים או ליבה שלא תומכות - ממשיכים מאותה נקודה
+            pass
+    if offset < size and hasattr(os, 'sendfile'):
+        try:
+            while offset < size:
+                sent = os.sendfile(fd_out, fd_in, offset, min(COPY_CHUNK, size - offset))
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            pass
+    if offset < size:
+        os.lseek(fd_in, offset, os.SEEK_SET)
+        os.lseek(fd_out, offset, os.SEEK_SET)
+        while True:
+            chunk = os.read(fd_in, COPY_CHUNK)
+            if not chunk:
+                break
+            os.write(fd_out, chunk)
+            offset += len(chunk)
+    return offset
+
+
+def copy_file(src, dst, verify='size'):
+    """
+    Copy src to dst with its metadata, then verify the copy. Returns bytes copied.
+    The copy is written under a temporary name and renamed to dst only when
+    it is complete, so a failed or interrupted copy never leaves a partial dst.
+    Raises FileExistsError if dst already exists.
+    """
+    tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{uuid.uuid4().hex}.part")
+    try:
+        with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            copied = _copy_fd(fsrc.fileno(), fdst.fileno(), size)
+        shutil.copystat(src, tmp)
+
+        ok = copied == size and os.path.getsize(tmp) == size
+        if ok and verify == 'hash':
+            ok = _file_md5(src) == _file_md5(tmp)
+        if not ok:
+            raise OSError(f"copy verification failed: {src} -> {dst}")
+        if os.path.lexists(dst):
+            raise FileExistsError(f"target exists: {dst}")
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return size
+
+
+class MoveEngine:
+    def __init__(self, workers=COPY_WORKERS, verify='size'):
+        self.workers = workers
+        # 'size' או 'hash' - בדיקת העותק לפני מחיקת המקור
+        self.verify = verify
+        self.stats = {'renamed': 0, 'copied': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def move(self, src, dst, journal=None):
+        """Move one file or folder (like shutil.move). Returns True on success."""
+        return self.move_files([(src, dst)], journal)['failed'] == 0
+
+    def move_files(self, pairs, journal=None):
+        """
+        Move (src, dst) pairs. Same-device pairs are renamed; the rest are
+        copied in parallel, verified and then removed. A pair whose target
+        already exists (or is the target of an earlier pair) is not moved
+        and counts as failed.
+        Returns a report dict for this call.
+        """
+        start = time.perf_counter()
+        report = {'renamed': 0, 'copied': 0, 'failed': 0, 'bytes': 0}
+        copies = []
+        copied_dirs = []
+        targets = set()
+
+        for src, dst in pairs:
+            if os.path.isdir(dst):
+                # כמו shutil.move - העברה לתוך תיקיה קיימת
+                dst = os.path.join(dst, os.path.basename(src))
+            # מקור שכבר אינו קיים - פעולה שהושלמה בריצה קודמת, היומן מדלג עליה
+            if os.path.exists(src) and (os.path.lexists(dst) or dst in targets):
+                print(f"Error moving {src} to {dst}: target exists")
+                report['failed'] += 1
+                continue
+            targets.add(dst)
+            if same_device(src, dst):
+                try:
+                    size = self._tree_size(src)
+                    journaled(journal, 'move', lambda s=src, d=dst: os.replace(s, d), src=src, dst=dst)
+                    report['renamed'] += 1
+                    report['bytes'] += size
+                except Exception as e:
+                    print(f"Error moving {src} to {dst}: {e}")
+                    report['failed'] += 1
+            elif os.path.isdir(src):
+                copies.extend(self._expand_dir(src, dst))
+                copied_dirs.append(src)
+            else:
+                copies.append((src, dst))
+
+        if copies:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(lambda pair: self._copy_move(pair[0], pair[1], journal), copies)
+                for size in results:
+                    if size is None:
+                        report['failed'] += 1
+                    else:
+                        report['copied'] += 1
+                        report['bytes'] += size
+
+        for folder in copied_dirs:
+            self._remove_empty_dirs(folder)
+
+        seconds = time.perf_counter() - start
+        for key in report:
+            self.stats[key] += report[key]
+        self.stats['seconds'] += seconds
+        report['seconds'] = seconds
+        if report['copied']:
+            print(f"Copied {report['copied']} files across devices: {self.throughput(report)}")
+        return report
+
+    def _copy_move(self, src, dst, journal):
+        """Copy, verify and remove the source. Returns the size, or None on failure."""
+        size = os.path.getsize(src)
+
+        def action():
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            copy_file(src, dst, self.verify)
+            os.remove(src)
+
+        try:
+            journaled(journal, 'move', action, src=src, dst=dst)
+            return size
+        except Exception as e:
+            print(f"Error moving {src} to {dst}: {e}")
+            return None
+
+    @staticmethod
+    def _tree_size(path):
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        return sum(os.path.getsize(os.path.join(root, f)) for root, dirs, files in os.walk(path) for f in files)
+
+    @staticmethod
+    def _expand_dir(src, dst):
+        """File pairs for a folder moved across devices."""
+        pairs = []
+        for root, dirs, files in os.walk(src):
+            target_root = os.path.join(dst, os.path.relpath(root, src))
+            os.makedirs(target_root, exist_ok=True)
+            for f in files:
+                pairs.append((os.path.join(root, f), os.path.join(target_root, f)))
+        return pairs
+
+    @staticmethod
+    def _remove_empty_dirs(folder):
+        """Remove a moved folder once every file in it was copied."""
+        for root, dirs, files in os.walk(folder, topdown=False):
+            if files:
+                print(f"Not removing {root}: some files were not moved.")
+                return
+            try:
+                os.rmdir(root)
+            except OSError as e:
+                print(f"Error removing folder {root}: {e}")
+                return
+
+    @staticmethod
+    def throughput(report):
+        seconds = report['seconds'] or 1e-9
+        mb = report['bytes'] / 1024 / 1024
+        return f"{mb:.1f} MB in {report['seconds']:.2f}s ({mb / seconds:.1f} MB/s)"
+
+    def print_report(self):
+        print(f"Moved {self.stats['renamed'] + self.stats['copied']} items "
+              f"({self.stats['renamed']} renamed, {self.stats['copied']} copied, {self.stats['failed']} failed), "
+              f"{self.throughput(self.stats)}")
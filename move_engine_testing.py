@@ -0,0 +1,111 @@
+# test_move_engine.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from move_engine import MoveEngine, copy_file
+from merge_journal import MergeJournal
+
+
+class TestMoveEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src = os.path.join(self.root, 'src')
+        self.dst = os.path.join(self.root, 'dst')
+        os.makedirs(os.path.join(self.src, 'album'))
+        os.makedirs(self.dst)
+        self.payloads = {}
+        for i in range(5):
+            name = os.path.join('album', f'{i}.mp3')
+            self.payloads[name] = os.urandom(100000 + i)
+            with open(os.path.join(self.src, name), 'wb') as f:
+                f.write(self.payloads[name])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def assert_moved(self, folder):
+        self.assertFalse(os.path.exists(os.path.join(self.src, 'album')))
+        for name, data in self.payloads.items():
+            with open(os.path.join(folder, name), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_same_device_rename(self):
+        report = MoveEngine().move_files([(os.path.join(self.src, 'album'), self.dst)])
+        self.assertEqual((report['renamed'], report['copied']), (1, 0))
+        self.assert_moved(self.dst)
+
+    @patch('move_engine.same_device', return_value=False)
+    def test_cross_device_copy(self, mock_same_device):
+        journal_path = os.path.join(self.root, 'journal.jsonl')
+        journal = MergeJournal(journal_path)
+        journal.start()
+        engine = MoveEngine(workers=3, verify='hash')
+        report = engine.move_files([(os.path.join(self.src, 'album'), self.dst)], journal)
+        journal.finish()
+        self.assertEqual((report['renamed'], report['copied'], report['failed']), (0, 5, 0))
+        self.assertEqual(report['bytes'], sum(len(d) for d in self.payloads.values()))
+        self.assert_moved(self.dst)
+
+        # כל העתקה נרשמה ביומן וניתנת לביטול
+        self.assertEqual(MergeJournal(journal_path).undo(), 5)
+        for name in self.payloads:
+            self.assertTrue(os.path.exists(os.path.join(self.src, name)))
+
+    def test_failed_verification_keeps_source(self):
+        src = os.path.join(self.src, 'album', '0.mp3')
+        dst = os.path.join(self.dst, '0.mp3')
+        with patch('move_engine._copy_fd', return_value=10):
+            with self.assertRaises(OSError):
+                copy_file(src, dst)
+        self.assertFalse(os.path.exists(dst))
+        self.assertTrue(os.path.exists(src))
+
+    def test_existing_target_is_not_overwritten(self):
+        first = os.path.join(self.src, 'album', '0.mp3')
+        second = os.path.join(self.src, 'album', '1.mp3')
+        target = os.path.join(self.dst, '0.mp3')
+        engine = MoveEngine()
+        self.assertTrue(engine.move(first, target))
+        self.assertFalse(engine.move(second, target))
+        with patch('move_engine.same_device', return_value=False):
+            self.assertFalse(engine.move(second, target))
+            # שני זוגות לאותו יעד באותה קריאה - רק הראשון עובר
+            report = engine.move_files([(second, os.path.join(self.dst, 'x.mp3')),
+                                        (os.path.join(self.src, 'album', '2.mp3'), os.path.join(self.dst, 'x.mp3'))])
+        self.assertEqual((report['copied'], report['failed']), (1, 1))
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), self.payloads[os.path.join('album', '0.mp3')])
+        self.assertTrue(os.path.exists(os.path.join(self.src, 'album', '2.mp3')))
+
+    def test_copy_file_refuses_existing_target(self):
+        src = os.path.join(self.src, 'album', '0.mp3')
+        dst = os.path.join(self.dst, '0.mp3')
+        with open(dst, 'wb') as f:
+            f.write(b'keep')
+        with self.assertRaises(FileExistsError):
+            copy_file(src, dst)
+        self.assertEqual(os.listdir(self.dst), ['0.mp3'])
+        with open(dst, 'rb') as f:
+            self.assertEqual(f.read(), b'keep')
+
+    def test_interrupted_copy_leaves_no_partial_file(self):
+        src = os.path.join(self.src, 'album', '0.mp3')
+        dst = os.path.join(self.dst, '0.mp3')
+
+        def copy_half(fd_in, fd_out, size):
+            os.write(fd_out, os.read(fd_in, size // 2))
+            raise OSError('device removed')
+
+        with patch('move_engine._copy_fd', side_effect=copy_half):
+            with self.assertRaises(OSError):
+                copy_file(src, dst)
+        self.assertEqual(os.listdir(self.dst), [])
+        self.assertTrue(os.path.exists(src))
+
+
+if __name__ == '__main__':
+    unittest.main()
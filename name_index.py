@@ -0,0 +1,54 @@
+"""
+אינדקס שמות - מציאת שמות דומים בלי להשוות כל זוג.
+
+SequenceMatcher.ratio() is 2*M / (len(a) + len(b)), where M is the
+number of matching characters. M can't exceed the characters the two
+names share as multisets (the quick_ratio bound). NameIndex keeps an
+inverted index from character to (name id, count). One pass over the
+query's characters gives that bound for every indexed name, so
+SequenceMatcher only runs on names that can still reach the threshold.
+"""
+
+from collections import defaultdict, Counter
+from difflib import SequenceMatcher
+
+
+class NameIndex:
+    def __init__(self, names=()):
+        self.names = []
+        # תו -> [(מזהה שם, מספר מופעים)]
+        self.postings = defaultdict(list)
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        name_id = len(self.names)
+        self.names.append(name)
+        for char, count in Counter(name).items():
+            self.postings[char].append((name_id, count))
+        return name_id
+
+    def neighbors(self, name, threshold):
+        """
+        (score, name) for every indexed name other than name itself with
+        a SequenceMatcher ratio of at least threshold, best first.
+        """
+        shared = defaultdict(int)
+        for char, count in Counter(name).items():
+            for name_id, other_count in self.postings.get(char, ()):
+                shared[name_id] += count if count < other_count else other_count
+
+        results = []
+        length = len(name)
+        for name_id, common in shared.items():
+            other = self.names[name_id]
+            if other == name or 2.0 * common / (length + len(other)) < threshold:
+                continue
+            score = SequenceMatcher(None, name, other).ratio()
+            if score >= threshold:
+                results.append((score, other))
+        results.sort(key=lambda item: -item[0])
+        return results
@@ -0,0 +1,22 @@
+# test_name_index.py
+import unittest
+from difflib import SequenceMatcher
+
+from name_index import NameIndex
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        names = ['אברהם פריד', 'אברהם פריד ', 'אברם פריד', 'מרדכי בן דוד', 'מרדכי בן-דוד',
+                 'ישי ריבו', 'ישי לפידות', 'Avraham Fried', 'MBD', '']
+        index = NameIndex(names)
+        for name in names:
+            for threshold in (0.5, 0.8, 0.95):
+                expected = sorted((SequenceMatcher(None, name, other).ratio(), other) for other in names
+                                  if other != name and SequenceMatcher(None, name, other).ratio() >= threshold)
+                self.assertEqual(sorted(index.neighbors(name, threshold)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
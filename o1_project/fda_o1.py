@@ -4,13 +4,19 @@ import json
 import hashlib
 import difflib
 from collections import defaultdict
-from mutagen import File
-from mutagen.id3 import ID3
-from PIL import Image
 import shutil
+import sys
+
+# מודולים משותפים מתיקיית הפרויקט הראשית
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from move_engine import MoveEngine
+from lazy_import import lazy_module, lazy_callable
+
+File = lazy_callable('mutagen', 'File')
+Image = lazy_module('PIL.Image')
 
 # הגדרות
-MUSIC_DIR = input("הכנס נתיב תיקיה >>>") # נתיב למאגר המוזיקה
+MUSIC_DIR = None  # נתיב למאגר המוזיקה - אם לא הוגדר, main() שואל
 DATA_FILE = "music_data.json"  # קובץ לשמירת נתוני הסריקה
 ALLOWED_EXTENSIONS = {'.mp3', '.flac', '.wav', '.aac', '.m4a', '.ogg'}  # סיומות קבצי מוזיקה
 IGNORED_FILES = {'cover.jpg', 'folder.jpg', 'Thumbs.db', 'desktop.ini'}  # קבצים להתעלמות
@@ -80,11 +86,12 @@ def extract_album_art(folder_path):
                 print(f"Error processing image {file} in {folder_path}: {e}")
     return None
 
-def scan_music_library():
+def scan_music_library(music_dir=None):
     """סורק את מאגר המוזיקה ואוסף נתונים"""
+    music_dir = music_dir or MUSIC_DIR
     music_data = load_existing_data()
     artists_map = load_artists_from_csv()  # טעינת רשימת הזמרים מקובץ ה-CSV
-    for root, dirs, files in os.walk(MUSIC_DIR):
+    for root, dirs, files in os.walk(music_dir):
         # פילטרת קבצי מוזיקה
         music_files = [f for f in files if os.path.splitext(f)[1].lower() in ALLOWED_EXTENSIONS]
         if not music_files:
@@ -245,20 +252,27 @@ def choose_preferred(folder1, folder2):
         else:
             return folder2['path']
 
-def merge_folders(preferred, duplicate):
+def merge_folders(preferred, duplicate, move_engine=None):
     """מזג את התיקיה המשנית לתיקיה המועדפת"""
+    move_engine = move_engine or MoveEngine()
+    pairs = []
     for file in duplicate['files']:
         src = os.path.join(duplicate['path'], file['filename'])
         dest = os.path.join(preferred['path'], file['filename'])
         if not os.path.exists(dest):
-            shutil.move(src, dest)
+            pairs.append((src, dest))
+    report = move_engine.move_files(pairs)
+    if report['failed']:
+        print(f"Keeping {duplicate['path']}: {report['failed']} files were not moved")
+        return
     # מחיקת התיקיה המשנית לאחר המיזוג
     shutil.rmtree(duplicate['path'])
     print(f"Merged {duplicate['path']} into {preferred['path']}")
 
 def main():
     # שלב 1: סריקת מאגר המוזיקה
-    music_data = scan_music_library()
+    music_dir = MUSIC_DIR or input("הכנס נתיב תיקיה >>>")
+    music_data = scan_music_library(music_dir)
 
     # שלב 2: מציאת תיקיות דומות
     similar_folders = find_similar_folders(music_data)
@@ -275,12 +289,14 @@ def main():
     # שלב 4: אפשרות למיזוג אוטומטי
     user_input = input("\nהאם ברצונך למזג את התיקיות הדומות? (y/n): ")
     if user_input.lower() == 'y':
+        move_engine = MoveEngine()
         for item in similar_folders:
             preferred_path = item['preferred']
             duplicate_path = item['folder2'] if preferred_path == item['folder1'] else item['folder1']
             preferred = music_data[hashlib.md5(preferred_path.encode('utf-8')).hexdigest()]
             duplicate = music_data[hashlib.md5(duplicate_path.encode('utf-8')).hexdigest()]
-            merge_folders(preferred, duplicate)
+            merge_folders(preferred, duplicate, move_engine)
+        move_engine.print_report()
         print("המיזוג הושלם.")
     else:
         print("המיזוג בוטל.")
@@ -1,21 +1,25 @@
 import os
+import sys
 import shutil
 import hashlib
 import logging
-import requests
 from mutagen import File
 from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, TCON
-from bs4 import BeautifulSoup
-from pydub import AudioSegment
 from difflib import SequenceMatcher
 from concurrent.futures import ThreadPoolExecutor
 
-# הגדרות לוגים
-logging.basicConfig(
-    filename='music_organizer.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# מודולים משותפים מתיקיית הפרויקט הראשית
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tag_buffer import TagBuffer
+from tag_padding import padding_policy
+from move_engine import MoveEngine
+from fingerprint import FingerprintIndex, fingerprint_file
+from singles_index import SinglesIndex
+from lazy_import import lazy_module, lazy_callable
+
+# רשת ו-HTML נטענים רק כשמחפשים עטיפה
+requests = lazy_module('requests')
+BeautifulSoup = lazy_callable('bs4', 'BeautifulSoup')
 
 # הגדרות ראשוניות
 MUSIC_DIR = 'C:\\Users\\משתמש\\Documents\\testspace'  # שנה את הנתיב לתיקיית המוזיקה שלך
@@ -23,6 +27,7 @@ BACKUP_DIR = 'C:\\Users\\משתמש\\Documents\\backup_1'    # נתיב לתיק
 SPOTIFY_API_URL = 'https://api.spotify.com/v1'  # URL של API ספוטיפיי
 SPOTIFY_API_KEY = 'YOUR_SPOTIFY_API_KEY'        # מפתח API של ספוטיפיי
 PROXY_SERVER = 'http://your.proxy.server:port'  # שרת פרוקסי במידת הצורך
+LOSSLESS_EXTENSIONS = ('.flac', '.wav')
 
 # פונקציה לחשב hash של קובץ
 def compute_file_hash(file_path):
@@ -39,6 +44,16 @@ def compute_file_hash(file_path):
         return None
     return hash_func.hexdigest()
 
+# איכות קובץ להשוואה בין עותקים: קודם lossless, אחר כך קצב סיביות
+def audio_quality(file_path):
+    try:
+        audio = File(file_path)
+        bitrate = getattr(audio.info, 'bitrate', 0) if audio is not None and audio.info else 0
+    except Exception as e:
+        logging.error(f"שגיאה בקריאת קצב הסיביות של {file_path}: {e}")
+        bitrate = 0
+    return (file_path.lower().endswith(LOSSLESS_EXTENSIONS), bitrate or 0)
+
 # פונקציה לחשב hash של תיקייה (אלבום)
 def compute_album_hash(album_path):
     hash_func = hashlib.md5()
@@ -57,9 +72,15 @@ def compute_album_hash(album_path):
 
 # מחלקה לניהול המוזיקה
 class MusicOrganizer:
-    def __init__(self, music_dir, backup_dir):
+    def __init__(self, music_dir, backup_dir, tag_buffer=None, move_engine=None, fingerprint_index=None):
         self.music_dir = music_dir
         self.backup_dir = backup_dir
+        # העברה לתיקיית הגיבוי - לרוב בכונן אחר, ולכן העתקה מקבילית ומאומתת
+        self.move_engine = move_engine or MoveEngine()
+        # TagBuffer אופציונלי - כל עדכוני התגיות נכתבים בסוף run_all, שמירה אחת לקובץ
+        self.tag_buffer = tag_buffer
+        # טביעות אצבע אקוסטיות - אפשר להעביר אינדקס שמור מריצה קודמת
+        self.fingerprint_index = fingerprint_index if fingerprint_index is not None else FingerprintIndex()
         self.album_hashes = {}
         self.song_hashes = {}
         self.duplicates = []
@@ -83,6 +104,16 @@ class MusicOrganizer:
                         logging.error(f"שגיאה בגיבוי קובץ {source} ל-{destination}: {e}")
         logging.info("גיבוי הושלם.")
 
+    def backup_path(self, name):
+        # שם פנוי בסל המיחזור - קובץ או אלבום קודם באותו שם לא נדרס
+        path = os.path.join(self.backup_dir, name)
+        base, ext = os.path.splitext(name)
+        counter = 1
+        while os.path.lexists(path):
+            counter += 1
+            path = os.path.join(self.backup_dir, f"{base} ({counter}){ext}")
+        return path
+
     def compare_albums(self):
         logging.info("משווה אלבומים זהים...")
         for root, dirs, files in os.walk(self.music_dir):
@@ -100,12 +131,14 @@ class MusicOrganizer:
                             if current_size > existing_size:
                                 logging.info(f"האלבום {album} איכותי יותר מהאלבום {os.path.basename(existing_album)}.")
                                 self.album_hashes[album_hash] = album_path
-                                shutil.move(existing_album, os.path.join(self.backup_dir, os.path.basename(existing_album)))
+                                self.move_engine.move(existing_album, self.backup_path(os.path.basename(existing_album)))
                             else:
                                 logging.info(f"האלבום {existing_album} איכותי יותר מהאלבום {album}.")
-                                shutil.move(album_path, os.path.join(self.backup_dir, album))
+                                self.move_engine.move(album_path, self.backup_path(album))
                         else:
                             self.album_hashes[album_hash] = album_path
+        stats = self.move_engine.stats
+        logging.info(f"העברות: {stats['renamed']} שינויי שם, {stats['copied']} קבצים הועתקו, {self.move_engine.throughput(stats)}")
         logging.info("השוואת אלבומים הושלמה.")
 
     def get_directory_size(self, directory):
@@ -151,27 +184,40 @@ class MusicOrganizer:
             logging.error(f"שגיאה בקריאת מטא נתונים מקובץ {file_path}: {e}")
         return metadata
 
+    def write_frames(self, file_path, frames):
+        """כתיבת מסגרות ID3 לקובץ - ישירות או דרך ה-TagBuffer"""
+        if self.tag_buffer is not None:
+            self.tag_buffer.stage_frames(file_path, frames)
+            return True
+        audio = File(file_path, easy=False)
+        if audio is None:
+            return False
+        if not audio.tags:
+            audio.add_tags()
+        for frame in frames:
+            audio.tags.add(frame)
+        audio.save(padding=padding_policy)
+        return True
+
     def apply_metadata(self, file_path, metadata):
         try:
-            audio = File(file_path, easy=False)
-            if audio is None:
-                logging.warning(f"קובץ {file_path} לא נתמך למטא נתונים.")
-                return
-            if not audio.tags:
-                audio.add_tags()
-            audio.tags['TIT2'] = TIT2(encoding=3, text=metadata['title'] if metadata['title'] else 'Unknown Title')
-            audio.tags['TPE1'] = TPE1(encoding=3, text=metadata['artist'] if metadata['artist'] else 'Unknown Artist')
-            audio.tags['TALB'] = TALB(encoding=3, text=metadata['album'] if metadata['album'] else 'Unknown Album')
-            audio.tags['TCON'] = TCON(encoding=3, text=metadata['genre'] if metadata['genre'] else 'Unknown Genre')
+            frames = [
+                TIT2(encoding=3, text=metadata['title'] if metadata['title'] else 'Unknown Title'),
+                TPE1(encoding=3, text=metadata['artist'] if metadata['artist'] else 'Unknown Artist'),
+                TALB(encoding=3, text=metadata['album'] if metadata['album'] else 'Unknown Album'),
+                TCON(encoding=3, text=metadata['genre'] if metadata['genre'] else 'Unknown Genre'),
+            ]
             if metadata['image']:
-                audio.tags['APIC'] = APIC(
+                frames.append(APIC(
                     encoding=3,
                     mime='image/jpeg',
                     type=3,
                     desc='Cover',
                     data=metadata['image']
-                )
-            audio.save()
+                ))
+            if not self.write_frames(file_path, frames):
+                logging.warning(f"קובץ {file_path} לא נתמך למטא נתונים.")
+                return
             logging.info(f"מטא נתונים עודכנו לקובץ {file_path}.")
         except Exception as e:
             logging.error(f"שגיאה בעדכון מטא נתונים לקובץ {file_path}: {e}")
@@ -199,7 +245,7 @@ class MusicOrganizer:
                                             desc='Cover',
                                             data=image
                                         )
-                                        audio.save()
+                                        audio.save(padding=padding_policy)
                                         logging.info(f"תמונת אלבום נוספה לקובץ {file_path}.")
                                         break  # הוספה לקובץ אחד מספיקה
                                 except Exception as e:
@@ -230,23 +276,17 @@ class MusicOrganizer:
             logging.error(f"שגיאה בהורדת תמונת אלבום: {e}")
         return None
 
-    def remove_duplicate_singles(self):
+    def remove_duplicate_singles(self, include_albums=True):
         logging.info("מסיר סינגלים כפולים...")
-        for root, dirs, files in os.walk(self.music_dir):
-            singles = [f for f in files if f.lower().endswith(('.mp3', '.flac', '.wav', '.m4a'))]
-            single_hashes = {}
-            for file in singles:
-                file_path = os.path.join(root, file)
-                file_hash = compute_file_hash(file_path)
-                if file_hash:
-                    if file_hash in single_hashes:
-                        try:
-                            shutil.move(file_path, os.path.join(self.backup_dir, file))
-                            logging.info(f"סינגל כפול {file} הועבר לסל המיחזור.")
-                        except Exception as e:
-                            logging.error(f"שגיאה בהעברת סינגל כפול {file} ל-{self.backup_dir}: {e}")
-                    else:
-                        single_hashes[file_hash] = file_path
+        # אינדקס אחד לכל הספרייה - גם סינגל שקיים באלבום או בתיקיית זמר אחר
+        singles_index = SinglesIndex().scan(self.music_dir)
+        for keep, duplicates in singles_index.duplicate_singles(include_albums):
+            for file_path in duplicates:
+                file = os.path.basename(file_path)
+                if self.move_engine.move(file_path, self.backup_path(file)):
+                    logging.info(f"סינגל כפול {file} (קיים ב-{keep}) הועבר לסל המיחזור.")
+                else:
+                    logging.error(f"שגיאה בהעברת סינגל כפול {file} ל-{self.backup_dir}")
         logging.info("הסרת סינגלים כפולים הושלמה.")
 
     def list_english_named_albums(self):
@@ -294,12 +334,7 @@ class MusicOrganizer:
 
     def update_genre(self, file_path, new_genre):
         try:
-            audio = File(file_path, easy=False)
-            if audio:
-                if not audio.tags:
-                    audio.add_tags()
-                audio.tags['TCON'] = TCON(encoding=3, text=new_genre)
-                audio.save()
+            if self.write_frames(file_path, [TCON(encoding=3, text=new_genre)]):
                 logging.info(f"ז'אנר עודכן לקובץ {file_path} ל-{new_genre}.")
         except Exception as e:
             logging.error(f"שגיאה בעדכון ז'אנר לקובץ {file_path}: {e}")
@@ -321,31 +356,43 @@ class MusicOrganizer:
                 if file.lower().endswith(('.mp3', '.flac', '.wav', '.m4a')):
                     file_path = os.path.join(root, file)
                     try:
-                        audio = File(file_path, easy=False)
-                        if audio:
-                            if not audio.tags:
-                                audio.add_tags()
-                            audio.tags['TPE1'] = TPE1(encoding=3, text=new_artist)
-                            audio.save()
+                        if self.write_frames(file_path, [TPE1(encoding=3, text=new_artist)]):
                             logging.info(f"שם האמן עודכן ל-{new_artist} בקובץ {file_path}.")
                     except Exception as e:
                         logging.error(f"שגיאה בעדכון שם האמן לקובץ {file_path}: {e}")
 
     def detect_duplicate_songs_by_audio(self):
         logging.info("מזהה שירים כפולים לפי פס הקול...")
+        # קבצים שכבר באינדקס (אינדקס שמור מריצה קודמת) לא נוספים שוב
+        indexed = set(self.fingerprint_index.tracks)
         for root, dirs, files in os.walk(self.music_dir):
             for file in files:
                 if file.lower().endswith(('.mp3', '.flac', '.wav', '.m4a')):
                     file_path = os.path.join(root, file)
                     try:
-                        audio = AudioSegment.from_file(file_path)
-                        audio_fingerprint = hashlib.md5(audio.raw_data).hexdigest()
-                        if audio_fingerprint in self.song_hashes:
-                            self.duplicates.append((file_path, self.song_hashes[audio_fingerprint]))
-                            shutil.move(file_path, os.path.join(self.backup_dir, file))
-                            logging.info(f"שיר כפול {file} הועבר לסל המיחזור.")
-                        else:
-                            self.song_hashes[audio_fingerprint] = file_path
+                        # פענוח במנות וטביעת אצבע - תואם גם קידוד אחר של אותו שיר
+                        fingerprint = fingerprint_file(file_path)
+                        # התאמה של הקובץ לעצמו, או לקובץ שכבר הועבר, אינה כפילות
+                        matches = [(score, track) for score, track in self.fingerprint_index.match(fingerprint)
+                                   if track != file_path and os.path.exists(track)]
+                        if matches:
+                            score, other = matches[0]
+                            # נשאר העותק האיכותי יותר, לא זה שנסרק ראשון
+                            if audio_quality(file_path) > audio_quality(other):
+                                keep, duplicate = file_path, other
+                            else:
+                                keep, duplicate = other, file_path
+                            if self.move_engine.move(duplicate, self.backup_path(os.path.basename(duplicate))):
+                                self.duplicates.append((duplicate, keep))
+                                logging.info(f"שיר כפול {duplicate} (התאמה {score:.0%} ל-{keep}) הועבר לסל המיחזור.")
+                            else:
+                                logging.error(f"שגיאה בהעברת שיר כפול {duplicate} ל-{self.backup_dir}")
+                            if keep == file_path and file_path not in indexed:
+                                self.fingerprint_index.add(file_path, fingerprint)
+                                indexed.add(file_path)
+                        elif file_path not in indexed:
+                            self.fingerprint_index.add(file_path, fingerprint)
+                            indexed.add(file_path)
                     except Exception as e:
                         logging.error(f"שגיאה בזיהוי שיר כפול בקובץ {file_path}: {e}")
         logging.info("זיהוי שירים כפולים הושלם.")
@@ -389,12 +436,7 @@ class MusicOrganizer:
 
     def update_title(self, file_path, new_title):
         try:
-            audio = File(file_path, easy=False)
-            if audio:
-                if not audio.tags:
-                    audio.add_tags()
-                audio.tags['TIT2'] = TIT2(encoding=3, text=new_title)
-                audio.save()
+            if self.write_frames(file_path, [TIT2(encoding=3, text=new_title)]):
                 logging.info(f"כותרת השיר בקובץ {file_path} עודכנה ל-{new_title}.")
         except Exception as e:
             logging.error(f"שגיאה בעדכון כותרת השיר לקובץ {file_path}: {e}")
@@ -410,11 +452,20 @@ class MusicOrganizer:
         self.reorder_artist_album_names()
         self.detect_duplicate_songs_by_audio()
         self.improve_song_titles()
+        if self.tag_buffer is not None:
+            report = self.tag_buffer.flush()
+            logging.info(f"תגיות נשמרו: {report['files_saved']} קבצים, נחסכו {report['rewrites_avoided']} שמירות.")
         # שליחת בקשה לרשימת תפוצה
         # self.send_mail_request("רעיונות לניהול מוזיקה", "יש לי כמה רעיונות...", ["recipient@example.com"])
 
 # הפעלת הסקריפט
 if __name__ == "__main__":
-    organizer = MusicOrganizer(MUSIC_DIR, BACKUP_DIR)
+    # הגדרות לוגים - בהרצה בלבד, ייבוא המודול לא יוצר קובץ לוג
+    logging.basicConfig(
+        filename='music_organizer.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    organizer = MusicOrganizer(MUSIC_DIR, BACKUP_DIR, TagBuffer())
     organizer.run_all()
     print("ארגון המוזיקה הושלם. בדוק את הלוגים לפרטים נוספים.")
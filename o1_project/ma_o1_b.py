@@ -8,12 +8,25 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 from mutagen import File
 from mutagen.id3 import ID3, TIT2, TPE1, TALB, APIC, error
-from sklearn.cluster import KMeans
-import requests
 from io import BytesIO
-from PIL import Image
-import tkinter as tk
-from tkinter import messagebox, filedialog
+
+# מודולים משותפים מתיקיית הפרויקט הראשית
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tag_buffer import TagBuffer
+from tag_padding import padding_policy
+from rename_planner import RenamePlanner
+from singles_index import SinglesIndex
+from stage_scheduler import StageScheduler, DEFAULT_WORKERS
+from run_metrics import RunMetrics
+from lazy_import import lazy_module, lazy_callable
+
+# sklearn, requests, PIL ו-tkinter נטענים רק כשפעולה או הממשק צריכים אותם
+KMeans = lazy_callable('sklearn.cluster', 'KMeans')
+requests = lazy_module('requests')
+Image = lazy_module('PIL.Image')
+tk = lazy_module('tkinter')
+messagebox = lazy_module('tkinter.messagebox')
+filedialog = lazy_module('tkinter.filedialog')
 
 # --------------------------- Configurations and Constants --------------------------- #
 
@@ -28,6 +41,7 @@ class Config:
     copy_metadata_based_on_quality: bool = True
     add_album_art: bool = True
     remove_duplicate_singles: bool = True
+    remove_singles_in_albums: bool = True  # also remove singles that exist inside an album
     find_english_named_files: bool = True
     compress_high_bitrate: bool = True
     remove_repeating_patterns: bool = True
@@ -43,12 +57,20 @@ class Config:
     language: str = "hebrew"  # future feature: allow user to choose
 
     # Directories
-    music_directory: str = input('הכנס נתיב תיקית מוזיקה >>>')
+    music_directory: str = ""  # ריק - נשאל ב-MusicAutomatic.run()
     recycle_bin: str = "./RecycleBin"
 
     # Bitrate settings
     high_bitrate_threshold: int = 320000  # in bits per second
 
+    # Renames are collected in a plan; if a file is given the plan is saved there,
+    # and with review_renames it is only saved (replay later with RenamePlanner.load)
+    rename_plan_file: str = ""
+    review_renames: bool = False
+
+    # Stages that don't depend on each other run at the same time (see MusicAutomatic.build_scheduler)
+    stage_workers: int = DEFAULT_WORKERS
+
 # --------------------------- Utility Functions --------------------------- #
 
 def compute_file_hash(file_path: str) -> str:
@@ -63,15 +85,24 @@ def compute_file_hash(file_path: str) -> str:
         print(f"Error computing hash for {file_path}: {e}")
         return ""
 
-def move_to_recycle_bin(file_path: str, config: Config):
-    """Move the specified file to the recycle bin."""
+def move_to_recycle_bin(file_path: str, config: Config, catalog: Optional["FileCatalog"] = None):
+    """Move the specified file to the recycle bin (and mark its record as removed)."""
     try:
         os.makedirs(config.recycle_bin, exist_ok=True)
         shutil.move(file_path, config.recycle_bin)
         print(f"Moved {file_path} to recycle bin.")
+        if catalog is not None:
+            catalog.mark_removed(file_path)
     except Exception as e:
         print(f"Error moving file {file_path} to recycle bin: {e}")
 
+def get_bitrate(file_path: str, catalog: Optional["FileCatalog"] = None) -> int:
+    """Bitrate of the file in bits per second, from its record when the catalog has one."""
+    if catalog is not None and file_path in catalog:
+        return catalog[file_path].bitrate
+    audio = File(file_path)
+    return getattr(audio.info, 'bitrate', 0) if audio and audio.info else 0
+
 def get_all_files(directory: str, extensions: List[str] = ['.mp3', '.flac', '.wav', '.m4a']) -> List[str]:
     """Recursively get all files with the specified extensions."""
     all_files = []
@@ -89,8 +120,10 @@ def replace_word_in_filename(file_path: str, old_word: str, new_word: str):
     try:
         os.rename(file_path, new_path)
         print(f"Renamed {file_path} to {new_path}")
+        return new_path
     except Exception as e:
         print(f"Error renaming file {file_path}: {e}")
+        return file_path
 
 def download_image(url: str) -> Optional[bytes]:
     """Download an image from the given URL."""
@@ -112,33 +145,148 @@ def get_spotify_album_art(track_title: str, artist: str) -> Optional[bytes]:
     placeholder_url = "https://via.placeholder.com/300"
     return download_image(placeholder_url)
 
+# --------------------------- File Records --------------------------- #
+
+class FileRecord:
+    """
+    One music file for the whole run: its original path (the key of the
+    rename plan and the tag buffer), whether a stage moved it away, and
+    what was read from it. Tags and stream info are read once, on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.removed = False
+        self._loaded = False
+        self._tags: Optional[Dict[str, List[str]]] = None
+        self._bitrate = 0
+        self._duration = 0.0
+        self._id3 = None
+        self._id3_loaded = False
+
+    def _load(self):
+        # שלבים מקבילים עשויים לקרוא את אותה רשומה - הקריאה זהה, אז אין צורך בנעילה
+        try:
+            audio = File(self.path, easy=True)
+        except Exception as e:
+            print(f"Error reading {self.path}: {e}")
+            audio = None
+        if audio is not None:
+            self._tags = {key: audio[key] for key in audio.keys()}
+            self._bitrate = getattr(audio.info, 'bitrate', 0) or 0
+            self._duration = getattr(audio.info, 'length', 0.0) or 0.0
+        self._loaded = True
+
+    @property
+    def tags(self) -> Optional[Dict[str, List[str]]]:
+        """Easy tags ({'title': [...], ...}), None for a format mutagen can't read."""
+        if not self._loaded:
+            self._load()
+        return self._tags
+
+    @property
+    def bitrate(self) -> int:
+        if not self._loaded:
+            self._load()
+        return self._bitrate
+
+    @property
+    def duration(self) -> float:
+        if not self._loaded:
+            self._load()
+        return self._duration
+
+    @property
+    def id3(self):
+        """The file's ID3 tag, None if it has none. Kept until release()."""
+        if not self._id3_loaded:
+            try:
+                self._id3 = ID3(self.path)
+            except Exception:
+                self._id3 = None
+            self._id3_loaded = True
+        return self._id3
+
+    def release(self):
+        """Drop the ID3 object (frames may hold cover images), keep the small values."""
+        self._id3 = None
+        self._id3_loaded = False
+
+
+class FileCatalog:
+    """The records of the music files of a run, by original path."""
+
+    def __init__(self, paths: Optional[List[str]] = None):
+        self.records: Dict[str, FileRecord] = {}
+        self.add(paths or [])
+
+    def add(self, paths: List[str]):
+        for path in paths:
+            if path not in self.records:
+                self.records[path] = FileRecord(path)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.records
+
+    def __getitem__(self, path: str) -> FileRecord:
+        return self.records[path]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def mark_removed(self, path: str):
+        if path in self.records:
+            self.records[path].removed = True
+
+    def live(self):
+        """Records of the files that are still in place, checked as the iteration goes."""
+        return (record for record in list(self.records.values()) if not record.removed)
+
+    def live_paths(self) -> List[str]:
+        return [record.path for record in self.live()]
+
+    def removed(self) -> List[FileRecord]:
+        return [record for record in self.records.values() if record.removed]
+
 # --------------------------- Metadata Handling --------------------------- #
 
 class MetadataHandler:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, tag_buffer: Optional[TagBuffer] = None,
+                 rename_planner: Optional[RenamePlanner] = None):
         self.config = config
+        # When set, tag changes are staged and saved once per file at the end of the run
+        self.tag_buffer = tag_buffer
+        # When set, renames are proposed to the planner instead of done right away
+        self.rename_planner = rename_planner
 
-    def fix_corrupted_metadata(self, file_path: str):
+    def fix_corrupted_metadata(self, file_path: str, tags: Optional[Dict[str, List[str]]] = None):
         """Attempt to fix corrupted metadata of a file."""
         try:
-            audio = File(file_path, easy=True)
+            # תגיות שכבר נקראו (FileRecord.tags) - רק כשהשינויים נרשמים ב-TagBuffer
+            audio = tags if tags is not None and self.tag_buffer is not None else File(file_path, easy=True)
             if audio is None:
                 print(f"Unsupported file format for metadata: {file_path}")
                 return
             # Example: ensure title and artist tags exist
+            changes = {}
             if 'title' not in audio or not audio['title']:
-                audio['title'] = "Unknown Title"
+                changes['title'] = "Unknown Title"
             if 'artist' not in audio or not audio['artist']:
-                audio['artist'] = "Unknown Artist"
-            audio.save()
+                changes['artist'] = "Unknown Artist"
+            if self.tag_buffer is not None:
+                self.tag_buffer.stage(file_path, changes)
+            else:
+                for key, value in changes.items():
+                    audio[key] = value
+                audio.save(padding=padding_policy)
             print(f"Fixed metadata for {file_path}")
         except Exception as e:
             print(f"Error fixing metadata for {file_path}: {e}")
 
-    def add_album_art(self, file_path: str):
+    def add_album_art(self, file_path: str, id3: Optional[ID3] = None):
         """Add album art to the file's metadata."""
         try:
-            audio = ID3(file_path)
+            audio = id3 if id3 is not None else ID3(file_path)
         except error:
             audio = ID3()
         # Fetch album art
@@ -146,43 +294,66 @@ class MetadataHandler:
         artist = audio.get('TPE1', TPE1(encoding=3, text='Unknown')).text[0]
         image_data = get_spotify_album_art(title, artist)
         if image_data:
-            audio.add(APIC(
+            cover = APIC(
                 encoding=3,
                 mime='image/jpeg',
                 type=3,  # Cover (front)
                 desc='Cover',
                 data=image_data
-            ))
-            audio.save(file_path)
+            )
+            if self.tag_buffer is not None:
+                self.tag_buffer.stage_frames(file_path, [cover])
+            else:
+                audio.add(cover)
+                audio.save(file_path, padding=padding_policy)
             print(f"Added album art to {file_path}")
         else:
             print(f"Failed to add album art to {file_path}")
 
-    def replace_track_word(self, file_path: str):
+    def replace_track_word(self, file_path: str, id3: Optional[ID3] = None):
         """Replace the word 'track' with 'רצועה' in the filename and metadata."""
-        replace_word_in_filename(file_path, "track", "רצועה")
+        if self.rename_planner is not None:
+            current = self.rename_planner.target(file_path)
+            directory, filename = os.path.split(current)
+            self.rename_planner.propose(current, os.path.join(directory, filename.replace("track", "רצועה")), 'track-word')
+        else:
+            new_path = replace_word_in_filename(file_path, "track", "רצועה")
+            if self.tag_buffer is not None:
+                self.tag_buffer.rename(file_path, new_path)
+            file_path = new_path
         try:
-            audio = ID3(file_path)
+            audio = id3 if id3 is not None else ID3(file_path)
+            frames = []
             if 'TIT2' in audio:
-                audio['TIT2'] = TIT2(encoding=3, text=[audio['TIT2'].text[0].replace("track", "רצועה")])
+                frames.append(TIT2(encoding=3, text=[audio['TIT2'].text[0].replace("track", "רצועה")]))
             if 'TALB' in audio:
-                audio['TALB'] = TALB(encoding=3, text=[audio['TALB'].text[0].replace("track", "רצועה")])
-            audio.save(file_path)
+                frames.append(TALB(encoding=3, text=[audio['TALB'].text[0].replace("track", "רצועה")]))
+            if self.tag_buffer is not None:
+                self.tag_buffer.stage_frames(file_path, frames)
+            else:
+                for frame in frames:
+                    audio[frame.FrameID] = frame
+                audio.save(file_path, padding=padding_policy)
             print(f"Replaced 'track' with 'רצועה' in metadata for {file_path}")
         except Exception as e:
             print(f"Error replacing word in metadata for {file_path}: {e}")
 
-    def rename_based_on_title(self, file_path: str):
+    def rename_based_on_title(self, file_path: str, tags: Optional[Dict[str, List[str]]] = None):
         """Rename file based on its title tag."""
         try:
-            audio = File(file_path, easy=True)
+            audio = tags if tags is not None else File(file_path, easy=True)
             if audio is None or 'title' not in audio:
                 return
             title = audio['title'][0]
             directory, _ = os.path.split(file_path)
             new_filename = f"{title}{os.path.splitext(file_path)[1]}"
             new_path = os.path.join(directory, new_filename)
+            if self.rename_planner is not None:
+                self.rename_planner.propose(file_path, new_path, 'title')
+                return
             os.rename(file_path, new_path)
+            if self.tag_buffer is not None:
+                self.tag_buffer.rename(file_path, new_path)
             print(f"Renamed {file_path} to {new_path} based on title")
         except Exception as e:
             print(f"Error renaming file based on title for {file_path}: {e}")
@@ -190,8 +361,10 @@ class MetadataHandler:
 # --------------------------- Duplicate Handling --------------------------- #
 
 class DuplicateHandler:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, catalog: Optional[FileCatalog] = None):
         self.config = config
+        # When set, bitrates come from the file records and removed files are marked there
+        self.catalog = catalog
         self.file_hashes = {}
 
     def find_and_remove_duplicates(self, files: List[str]):
@@ -204,21 +377,44 @@ class DuplicateHandler:
                 existing_file = self.file_hashes[file_hash]
                 # Compare quality (e.g., bitrate)
                 if self.is_higher_quality(file_path, existing_file):
-                    move_to_recycle_bin(existing_file, self.config)
+                    move_to_recycle_bin(existing_file, self.config, self.catalog)
                     self.file_hashes[file_hash] = file_path
                 else:
-                    move_to_recycle_bin(file_path, self.config)
+                    move_to_recycle_bin(file_path, self.config, self.catalog)
             else:
                 self.file_hashes[file_hash] = file_path
 
+    def remove_duplicate_singles(self, files: List[str], include_albums: bool = True):
+        """Find duplicate singles across the whole library and keep the higher quality copy."""
+        singles_index = SinglesIndex()
+        tracks_per_folder: Dict[str, int] = {}
+        for file_path in files:
+            folder = os.path.dirname(file_path)
+            tracks_per_folder[folder] = tracks_per_folder.get(folder, 0) + 1
+        for file_path in files:
+            tracks_in_folder = tracks_per_folder[os.path.dirname(file_path)]
+            if self.catalog is not None and file_path in self.catalog:
+                record = self.catalog[file_path]
+                singles_index.add_tags(file_path, record.tags or {}, record.duration, record.bitrate,
+                                       tracks_in_folder=tracks_in_folder)
+            else:
+                singles_index.add_file(file_path, tracks_in_folder=tracks_in_folder)
+
+        for members in singles_index.duplicate_groups(include_albums):
+            best_file = members[0].path
+            # עותק באלבום נשאר תמיד - רק סינגלים מוסרים
+            album_copy = not members[0].single
+            for file_path in (entry.path for entry in members[1:] if entry.single):
+                if not album_copy and self.is_higher_quality(file_path, best_file):
+                    move_to_recycle_bin(best_file, self.config, self.catalog)
+                    best_file = file_path
+                else:
+                    move_to_recycle_bin(file_path, self.config, self.catalog)
+
     def is_higher_quality(self, file1: str, file2: str) -> bool:
         """Determine if file1 has higher quality than file2 based on bitrate."""
         try:
-            audio1 = File(file1)
-            audio2 = File(file2)
-            bitrate1 = audio1.info.bitrate if audio1 and audio1.info else 0
-            bitrate2 = audio2.info.bitrate if audio2 and audio2.info else 0
-            return bitrate1 > bitrate2
+            return get_bitrate(file1, self.catalog) > get_bitrate(file2, self.catalog)
         except Exception as e:
             print(f"Error comparing quality between {file1} and {file2}: {e}")
             return False
@@ -226,8 +422,9 @@ class DuplicateHandler:
 # --------------------------- Album Handling --------------------------- #
 
 class AlbumHandler:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, catalog: Optional[FileCatalog] = None):
         self.config = config
+        self.catalog = catalog
 
     def compare_albums(self, albums: Dict[str, List[str]]):
         """Compare albums and keep the higher quality copy."""
@@ -237,19 +434,15 @@ class AlbumHandler:
             best_file = files[0]
             for file in files[1:]:
                 if self.is_higher_quality(file, best_file):
-                    move_to_recycle_bin(best_file, self.config)
+                    move_to_recycle_bin(best_file, self.config, self.catalog)
                     best_file = file
                 else:
-                    move_to_recycle_bin(file, self.config)
+                    move_to_recycle_bin(file, self.config, self.catalog)
 
     def is_higher_quality(self, file1: str, file2: str) -> bool:
         """Determine if file1 has higher quality than file2 based on bitrate."""
         try:
-            audio1 = File(file1)
-            audio2 = File(file2)
-            bitrate1 = audio1.info.bitrate if audio1 and audio1.info else 0
-            bitrate2 = audio2.info.bitrate if audio2 and audio2.info else 0
-            return bitrate1 > bitrate2
+            return get_bitrate(file1, self.catalog) > get_bitrate(file2, self.catalog)
         except Exception as e:
             print(f"Error comparing album quality between {file1} and {file2}: {e}")
             return False
@@ -257,17 +450,18 @@ class AlbumHandler:
 # --------------------------- Bitrate Compression --------------------------- #
 
 class BitrateCompressor:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, catalog: Optional[FileCatalog] = None):
         self.config = config
+        self.catalog = catalog
 
     def compress_files(self, files: List[str]):
         """Compress high bitrate files to a lower bitrate."""
         for file_path in files:
             try:
-                audio = File(file_path)
-                if audio and hasattr(audio.info, 'bitrate') and audio.info.bitrate > self.config.high_bitrate_threshold:
+                bitrate = get_bitrate(file_path, self.catalog)
+                if bitrate > self.config.high_bitrate_threshold:
                     # Placeholder for actual compression logic
-                    print(f"Compressing {file_path} from {audio.info.bitrate} bps")
+                    print(f"Compressing {file_path} from {bitrate} bps")
                     # Implement actual compression using ffmpeg or similar
                     # Example:
                     # os.system(f"ffmpeg -i {file_path} -b:a 192k {file_path}_compressed.mp3")
@@ -278,12 +472,15 @@ class BitrateCompressor:
 # --------------------------- Repeating Pattern Handler --------------------------- #
 
 class RepeatingPatternHandler:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, rename_planner: Optional[RenamePlanner] = None):
         self.config = config
+        self.rename_planner = rename_planner
 
     def remove_repeating_patterns(self, files: List[str]):
         """Identify and remove repeating patterns in filenames."""
         for file_path in files:
+            if self.rename_planner is not None:
+                file_path = self.rename_planner.target(file_path)
             directory, filename = os.path.split(file_path)
             name, ext = os.path.splitext(filename)
             album_name = self.extract_album_name(name)
@@ -291,6 +488,9 @@ class RepeatingPatternHandler:
                 new_name = re.sub(re.escape(album_name), '', name, flags=re.IGNORECASE).strip(' -_')
                 new_filename = f"{new_name}{ext}"
                 new_path = os.path.join(directory, new_filename)
+                if self.rename_planner is not None:
+                    self.rename_planner.propose(file_path, new_path, 'repeating-pattern')
+                    continue
                 try:
                     os.rename(file_path, new_path)
                     print(f"Removed repeating pattern in {file_path}, renamed to {new_path}")
@@ -416,102 +616,158 @@ class UserInterface:
 # --------------------------- Main Application --------------------------- #
 
 class MusicAutomatic:
-    def __init__(self):
-        self.config = Config()
-        self.ui = UserInterface(self.config)
-        self.metadata_handler = MetadataHandler(self.config)
-        self.duplicate_handler = DuplicateHandler(self.config)
-        self.album_handler = AlbumHandler(self.config)
-        self.compressor = BitrateCompressor(self.config)
-        self.pattern_handler = RepeatingPatternHandler(self.config)
+    def __init__(self, config: Optional[Config] = None, metrics: Optional[RunMetrics] = None):
+        self.config = config or Config()
+        self.ui = None  # חלון tkinter נפתח רק ב-run()
+        # RunMetrics אופציונלי - זמן לכל שלב
+        self.metrics = metrics
+        self.tag_buffer = TagBuffer()
+        self.rename_planner = RenamePlanner()
+        # רשומה אחת לכל קובץ - כל השלבים קוראים ממנה ומסמנים בה קבצים שהועברו לסל המיחזור
+        self.catalog = FileCatalog()
+        self.metadata_handler = MetadataHandler(self.config, self.tag_buffer, self.rename_planner)
+        self.duplicate_handler = DuplicateHandler(self.config, self.catalog)
+        self.album_handler = AlbumHandler(self.config, self.catalog)
+        self.compressor = BitrateCompressor(self.config, self.catalog)
+        self.pattern_handler = RepeatingPatternHandler(self.config, self.rename_planner)
         self.language_handler = LanguageHandler(self.config)
         self.ml_handler = MachineLearningHandler(self.config)
         self.overview = OverviewGenerator(self.config)
 
     def run(self):
         """Run the entire automation process."""
+        if not self.config.music_directory:
+            self.config.music_directory = input('הכנס נתיב תיקית מוזיקה >>>')
+
         # Run user interface to get user preferences
+        self.ui = UserInterface(self.config)
         self.ui.run()
 
+        self.process()
+
+    def process(self):
+        """Run the selected actions on the music directory, without prompts."""
         # Get all music files
         music_files = get_all_files(self.config.music_directory)
         print(f"נמצאו {len(music_files)} קבצי מוזיקה.")
+        self.catalog.add(music_files)
 
-        # Fix corrupted metadata
-        if self.config.auto_metadata_fix:
-            print("מתקן מטאדאטה פגומה...")
-            for file in music_files:
-                self.metadata_handler.fix_corrupted_metadata(file)
+        self.build_scheduler().run(items=self.catalog.live, after_item=FileRecord.release)
+
+        # Generate overview and recommendations
+        self.overview.generate_report()
+
+        print("תהליך האוטומציה הושלם.")
+
+    def build_scheduler(self) -> StageScheduler:
+        """
+        The selected actions as stages over these resources:
+        'library' - which files are on disk (the recycle bin stages write it),
+        'tags' - the staged tag changes, 'names' - the planned renames.
+        Files are only moved by the removal stages until the renames and tags
+        are written at the end, so the removal stages run first and the per-file
+        stages then make one pass over the files that are left. Stages that
+        only report (language, compress) run next to that pass.
+        """
+        scheduler = StageScheduler(self.config.stage_workers, self.metrics)
+        config = self.config
+        handler = self.metadata_handler
 
         # Remove duplicates
-        if self.config.remove_duplicates:
-            print("מזהה ומסיר שירים כפולים...")
-            self.duplicate_handler.find_and_remove_duplicates(music_files)
+        if config.remove_duplicates:
+            scheduler.add('duplicates', self.remove_duplicates, outputs=['library'])
+
+        # Compare albums and keep higher quality
+        if config.compare_albums:
+            scheduler.add('albums', self.compare_albums, inputs=['library'], outputs=['library'])
+
+        # Remove duplicate singles
+        if config.remove_duplicate_singles:
+            scheduler.add('singles', self.remove_duplicate_singles, inputs=['library'], outputs=['library'])
+
+        # Fix corrupted metadata
+        if config.auto_metadata_fix:
+            scheduler.add('metadata_fix', lambda record: handler.fix_corrupted_metadata(record.path, record.tags),
+                          inputs=['library'], outputs=['tags'], per_file=True)
 
         # Rename tracks based on title
-        if self.config.rename_tracks:
-            print("שומר שם הקובץ לפי הכותרת...")
-            for file in music_files:
-                self.metadata_handler.rename_based_on_title(file)
+        if config.rename_tracks:
+            scheduler.add('rename_title', lambda record: handler.rename_based_on_title(record.path, record.tags),
+                          inputs=['library'], outputs=['names'], per_file=True)
 
         # Replace 'track' with 'רצועה'
-        if self.config.replace_track_word:
-            print("מחליף 'track' ב-'רצועה' בשמות קבצים ובמטאדאטה...")
-            for file in music_files:
-                self.metadata_handler.replace_track_word(file)
-
-        # Compare albums and keep higher quality
-        if self.config.compare_albums:
-            print("משווה בין אלבומים ושומר עותק באיכות גבוהה יותר...")
-            albums = self.organize_albums(music_files)
-            self.album_handler.compare_albums(albums)
+        if config.replace_track_word:
+            scheduler.add('track_word', lambda record: handler.replace_track_word(record.path, record.id3),
+                          inputs=['library', 'names'], outputs=['names', 'tags'], per_file=True)
 
         # Add album art
-        if self.config.add_album_art:
-            print("מוסיף תמונת אלבום לכל קובץ...")
-            for file in music_files:
-                self.metadata_handler.add_album_art(file)
+        if config.add_album_art:
+            scheduler.add('album_art', lambda record: handler.add_album_art(record.path, record.id3),
+                          inputs=['library'], outputs=['tags'], per_file=True)
 
-        # Remove duplicate singles
-        if self.config.remove_duplicate_singles:
-            print("מזהה ומסיר סינגלים כפולים...")
-            # Placeholder: Implement logic to identify and remove duplicate singles
-            # Example: Identify singles based on metadata and remove lower quality
-            pass
+        # Remove repeating patterns in filenames
+        if config.remove_repeating_patterns:
+            scheduler.add('patterns', lambda record: self.pattern_handler.remove_repeating_patterns([record.path]),
+                          inputs=['library', 'names'], outputs=['names'], per_file=True)
 
         # Find files with English names and suggest fixes
-        if self.config.find_english_named_files:
-            print("מחפש קבצים עם שמות באנגלית ומציע תיקון...")
-            english_files = self.language_handler.find_english_named_files(music_files)
-            self.language_handler.suggest_fix_language(english_files)
+        if config.find_english_named_files:
+            scheduler.add('language', self.suggest_language_fixes, inputs=['library'])
 
         # Compress high bitrate files
-        if self.config.compress_high_bitrate:
-            print("מחפש קבצים בעלי קצב סיביות גבוה מדי ומכווץ אותם...")
-            self.compressor.compress_files(music_files)
-
-        # Remove repeating patterns in filenames
-        if self.config.remove_repeating_patterns:
-            print("מזהה ומסיר תבניות חזרתיות בשמות קבצים...")
-            self.pattern_handler.remove_repeating_patterns(music_files)
+        if config.compress_high_bitrate:
+            scheduler.add('compress', lambda: self.compressor.compress_files(self.catalog.live_paths()),
+                          inputs=['library'])
 
         # Machine learning enhancements
-        if self.config.optional_actions.get("machine_learning_metadata"):
-            print("מריץ למידת מכונה לשיפור המטאדאטה...")
+        if config.optional_actions.get("machine_learning_metadata"):
             # Placeholder: Implement ML-based metadata enhancement
-            pass
-
-        # Generate overview and recommendations
-        self.overview.generate_report()
-
-        print("תהליך האוטומציה הושלם.")
+            scheduler.add('machine_learning', lambda: print("מריץ למידת מכונה לשיפור המטאדאטה..."))
+
+        scheduler.add('write', self.write_changes, inputs=['library', 'names', 'tags'],
+                      outputs=['library', 'names', 'tags'])
+        return scheduler
+
+    def remove_duplicates(self):
+        print("מזהה ומסיר שירים כפולים...")
+        self.duplicate_handler.find_and_remove_duplicates(self.catalog.live_paths())
+
+    def compare_albums(self):
+        print("משווה בין אלבומים ושומר עותק באיכות גבוהה יותר...")
+        albums = self.organize_albums(self.catalog.live_paths())
+        self.album_handler.compare_albums(albums)
+
+    def remove_duplicate_singles(self):
+        print("מזהה ומסיר סינגלים כפולים...")
+        self.duplicate_handler.remove_duplicate_singles(self.catalog.live_paths(), self.config.remove_singles_in_albums)
+
+    def suggest_language_fixes(self):
+        print("מחפש קבצים עם שמות באנגלית ומציע תיקון...")
+        english_files = self.language_handler.find_english_named_files(self.catalog.live_paths())
+        self.language_handler.suggest_fix_language(english_files)
+
+    def write_changes(self):
+        """Run all planned renames in one batch per directory, then write the staged tag changes."""
+        # קבצים שהועברו לסל המיחזור - שינויי שם ותגיות שלהם כבר לא רלוונטיים
+        for record in self.catalog.removed():
+            self.rename_planner.discard(record.path)
+            self.tag_buffer.discard(record.path)
+
+        # The buffer follows the renamed paths
+        if self.config.rename_plan_file:
+            self.rename_planner.save(self.config.rename_plan_file)
+        if not self.config.review_renames:
+            self.rename_planner.execute(tag_buffer=self.tag_buffer)
+
+        # Write all staged tag changes, one save per file
+        self.tag_buffer.flush()
 
     def organize_albums(self, files: List[str]) -> Dict[str, List[str]]:
         """Organize files into albums based on metadata."""
         albums = {}
         for file in files:
             try:
-                audio = File(file, easy=True)
+                audio = self.catalog[file].tags if file in self.catalog else File(file, easy=True)
                 if audio and 'album' in audio:
                     album = audio['album'][0]
                     albums.setdefault(album, []).append(file)
@@ -0,0 +1,233 @@
+"""
+מתכנן שינויי שמות - איסוף, בדיקת התנגשויות וביצוע באצווה.
+
+Rules (track word, name by title, repeating patterns, ...) propose
+renames instead of calling os.rename while the folder is being walked.
+The planner then:
+
+- chains proposals for the same file (a -> b by one rule, b -> c by the next),
+- detects collisions (two files to one name, target already on disk,
+  names that are not valid file names),
+- orders each directory's renames so no file is overwritten and breaks
+  cycles (a -> b, b -> a) through a temporary name,
+- runs one batch per directory.
+
+Plans can be saved to JSON for review and replayed later.
+"""
+
+import os
+import json
+import uuid
+from collections import defaultdict
+
+INVALID_NAME_CHARS = set('<>:"/\\|?*')
+
+
+def _key(path):
+    """Comparable form of a path (case-insensitive on Windows)."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class RenamePlanner:
+    def __init__(self):
+        # original path -> {'src', 'dst', 'rules'}
+        self.renames = {}
+        # planned destination key -> original path, for chaining rules
+        self._by_target = {}
+        self.conflicts = []
+
+    def target(self, path):
+        """The name a file will have after the planned renames."""
+        entry = self.renames.get(self._origin(path))
+        return entry['dst'] if entry else path
+
+    def _origin(self, path):
+        """
+        Original path of a file given its current or planned path.
+        A path that is still on disk is that file, even if another rename targets it.
+        """
+        if path in self.renames or os.path.exists(path):
+            return path
+        return self._by_target.get(_key(path), path)
+
+    def propose(self, src, dst, rule=None):
+        """
+        Propose renaming src to dst. src may be a name planned by an earlier
+        rule, in which case the proposals are chained.
+        """
+        origin = self._origin(src)
+        entry = self.renames.get(origin)
+        if entry is None:
+            if origin == dst:
+                return
+            entry = self.renames[origin] = {'src': origin, 'dst': origin, 'rules': []}
+        else:
+            self._by_target.pop(_key(entry['dst']), None)
+
+        entry['dst'] = dst
+        if rule:
+            entry['rules'].append(rule)
+        if origin == dst:
+            # the rules cancelled each other out
+            del self.renames[origin]
+        else:
+            self._by_target[_key(dst)] = origin
+
+    def discard(self, path):
+        """Drop the planned rename of a file that was moved away or deleted."""
+        entry = self.renames.pop(self._origin(path), None)
+        if entry is not None:
+            self._by_target.pop(_key(entry['dst']), None)
+
+    def __len__(self):
+        return len(self.renames)
+
+    # --------------------------- Validation --------------------------- #
+
+    def check(self):
+        """
+        Find renames that can't run. Returns a list of conflict dicts
+        ({'src', 'dst', 'reason'}); those renames are skipped by execute().
+        """
+        conflicts = {}
+        while True:
+            # a skipped rename leaves its file in place, which may block another target
+            sources = {_key(src) for src in self.renames if src not in conflicts}
+            claimed = {}
+            found = False
+            for src, entry in sorted(self.renames.items()):
+                if src in conflicts:
+                    continue
+                dst = entry['dst']
+                name = os.path.basename(dst)
+                reason = None
+
+                if not name or name in ('.', '..') or INVALID_NAME_CHARS & set(name) or name != name.rstrip(' .'):
+                    reason = 'invalid file name'
+                elif not os.path.exists(src):
+                    reason = 'source missing'
+                elif _key(dst) in claimed:
+                    reason = f"same target as {claimed[_key(dst)]}"
+                elif os.path.exists(dst) and _key(dst) not in sources and _key(dst) != _key(src):
+                    reason = 'target exists'
+
+                if reason:
+                    conflicts[src] = {'src': src, 'dst': dst, 'reason': reason}
+                    found = True
+                else:
+                    claimed[_key(dst)] = src
+            if not found:
+                break
+
+        self.conflicts = list(conflicts.values())
+        return self.conflicts
+
+    # --------------------------- Execution --------------------------- #
+
+    def batches(self):
+        """Valid renames grouped by directory, in directory order."""
+        skipped = {c['src'] for c in self.check()}
+        by_dir = defaultdict(list)
+        for src, entry in self.renames.items():
+            if src not in skipped:
+                by_dir[os.path.dirname(src)].append((src, entry['dst']))
+        return [(folder, sorted(by_dir[folder])) for folder in sorted(by_dir)]
+
+    def execute(self, dry_run=False, tag_buffer=None):
+        """
+        Run the plan, one batch per directory.
+        Returns {old path: new path} for every rename that was done.
+        """
+        batches = self.batches()
+        for conflict in self.conflicts:
+            print(f"Skipping rename {conflict['src']} -> {conflict['dst']}: {conflict['reason']}")
+
+        done = {}
+        for folder, batch in batches:
+            count = 0
+            for src, dst, origin in self._order(batch):
+                if dry_run:
+                    if not self._is_tmp(dst):
+                        print(f"Would rename: {origin} -> {dst}")
+                    continue
+                if os.path.exists(dst) and _key(dst) != _key(src):
+                    print(f"Skipping rename {src} -> {dst}: target exists")
+                    continue
+                try:
+                    os.rename(src, dst)
+                except Exception as e:
+                    print(f"Error renaming file {src}: {e}")
+                    continue
+                if not self._is_tmp(dst):
+                    done[origin] = dst
+                    count += 1
+            if not dry_run:
+                print(f"Renamed {count} files in {folder}")
+
+        if tag_buffer is not None:
+            for src, dst in done.items():
+                tag_buffer.rename(src, dst)
+
+        for src in done:
+            self.renames.pop(src, None)
+        self._by_target = {_key(e['dst']): src for src, e in self.renames.items()}
+        return done
+
+    @staticmethod
+    def _is_tmp(path):
+        return os.path.basename(path).startswith('.rename-')
+
+    def _order(self, batch):
+        """
+        Order renames so each target is free when its rename runs.
+        Cycles are broken by moving one file to a temporary name first.
+        Yields (src, dst, original path) steps.
+        """
+        pending = {_key(src): (src, dst, src) for src, dst in batch}
+        ordered = []
+        while pending:
+            ready = [k for k, (src, dst, _) in pending.items() if _key(dst) not in pending or _key(dst) == k]
+            if ready:
+                for k in ready:
+                    ordered.append(pending.pop(k))
+                continue
+            # only cycles left - park one file under a temporary name
+            k = next(iter(pending))
+            src, dst, origin = pending.pop(k)
+            tmp = os.path.join(os.path.dirname(src), f".rename-{uuid.uuid4().hex}{os.path.splitext(src)[1]}")
+            ordered.append((src, tmp, origin))
+            pending[_key(tmp)] = (tmp, dst, origin)
+        return ordered
+
+    # --------------------------- Serialization --------------------------- #
+
+    def to_dict(self):
+        return {
+            'version': 1,
+            'renames': [
+                {'src': e['src'], 'dst': e['dst'], 'rules': e['rules']}
+                for e in sorted(self.renames.values(), key=lambda e: e['src'])
+            ],
+            'conflicts': self.check(),
+        }
+
+    def save(self, plan_file):
+        """Write the plan to a JSON file for review."""
+        with open(plan_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+        print(f"Rename plan saved to {plan_file} ({len(self)} renames).")
+
+    @classmethod
+    def load(cls, plan_file):
+        """Load a saved plan, ready to execute (replay)."""
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        planner = cls()
+        for item in data.get('renames', []):
+            # src עשוי להיות שם מתוכנן של רשומה קודמת, או שההצעה בוטלה (src == dst)
+            origin = planner._origin(item['src'])
+            planner.propose(item['src'], item['dst'])
+            entry = planner.renames.get(origin)
+            if entry is not None:
+                entry['rules'].extend(item.get('rules', []))
+        return planner
@@ -0,0 +1,110 @@
+# test_rename_planner.py
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from rename_planner import RenamePlanner
+from tag_buffer import TagBuffer
+
+
+class TestRenamePlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name in ['a.mp3', 'b.mp3', 'c.mp3', 'track 1.mp3']:
+            with open(self.path(name), 'w') as f:
+                f.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_chained_rules(self):
+        # כלל אחד משנה את השם וכלל שני ממשיך מהשם המתוכנן
+        planner = RenamePlanner()
+        planner.propose(self.path('track 1.mp3'), self.path('רצועה 1.mp3'), 'track-word')
+        planner.propose(planner.target(self.path('track 1.mp3')), self.path('שיר.mp3'), 'title')
+        self.assertEqual(len(planner), 1)
+        done = planner.execute()
+        self.assertEqual(done, {self.path('track 1.mp3'): self.path('שיר.mp3')})
+        self.assertEqual(self.read('שיר.mp3'), 'track 1.mp3')
+
+    def test_collisions_are_skipped(self):
+        planner = RenamePlanner()
+        planner.propose(self.path('a.mp3'), self.path('new.mp3'))
+        planner.propose(self.path('b.mp3'), self.path('new.mp3'))
+        planner.propose(self.path('track 1.mp3'), self.path('bad:name.mp3'))
+        planner.propose(self.path('c.mp3'), self.path('track 1.mp3'))
+        reasons = {c['src']: c['reason'] for c in planner.check()}
+        self.assertIn('same target', reasons[self.path('b.mp3')])
+        self.assertEqual(reasons[self.path('track 1.mp3')], 'invalid file name')
+        # track 1 נשאר במקומו ולכן c לא יכול לקבל את השם שלו
+        self.assertEqual(reasons[self.path('c.mp3')], 'target exists')
+        planner.execute()
+        self.assertEqual(self.read('new.mp3'), 'a.mp3')
+        self.assertEqual(self.read('b.mp3'), 'b.mp3')
+        self.assertEqual(self.read('c.mp3'), 'c.mp3')
+
+    def test_chain_and_cycle(self):
+        planner = RenamePlanner()
+        planner.propose(self.path('a.mp3'), self.path('b.mp3'))
+        planner.propose(self.path('b.mp3'), self.path('a.mp3'))
+        planner.propose(self.path('c.mp3'), self.path('d.mp3'))
+        planner.propose(self.path('track 1.mp3'), self.path('c.mp3'))
+        self.assertEqual(planner.check(), [])
+        planner.execute()
+        self.assertEqual(self.read('a.mp3'), 'b.mp3')
+        self.assertEqual(self.read('b.mp3'), 'a.mp3')
+        self.assertEqual(self.read('d.mp3'), 'c.mp3')
+        self.assertEqual(self.read('c.mp3'), 'track 1.mp3')
+        self.assertEqual(sorted(os.listdir(self.folder)), ['a.mp3', 'b.mp3', 'c.mp3', 'd.mp3'])
+
+    def test_discard_removed_file(self):
+        planner = RenamePlanner()
+        planner.propose(self.path('a.mp3'), self.path('new.mp3'))
+        planner.propose(self.path('b.mp3'), self.path('b2.mp3'))
+        # a הועבר לסל המיחזור - השם המתוכנן שלו מתפנה
+        os.remove(self.path('a.mp3'))
+        planner.discard(self.path('a.mp3'))
+        planner.propose(self.path('c.mp3'), self.path('new.mp3'))
+        self.assertEqual(planner.check(), [])
+        self.assertEqual(planner.execute(), {self.path('b.mp3'): self.path('b2.mp3'), self.path('c.mp3'): self.path('new.mp3')})
+
+    def test_save_and_replay(self):
+        planner = RenamePlanner()
+        planner.propose(self.path('a.mp3'), self.path('z.mp3'), 'title')
+        plan_file = os.path.join(self.folder, 'plan.json')
+        planner.save(plan_file)
+
+        buffer = TagBuffer()
+        buffer.stage(self.path('a.mp3'), {'title': 'z'})
+        replay = RenamePlanner.load(plan_file)
+        self.assertEqual(replay.renames[self.path('a.mp3')]['rules'], ['title'])
+        replay.execute(tag_buffer=buffer)
+        self.assertEqual(self.read('z.mp3'), 'a.mp3')
+        self.assertEqual(buffer.get(self.path('z.mp3'), 'title'), ['z'])
+
+    def test_load_chained_and_cancelled_entries(self):
+        plan_file = os.path.join(self.folder, 'plan.json')
+        with open(plan_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'renames': [
+                {'src': self.path('c.mp3'), 'dst': self.path('x.mp3'), 'rules': ['title']},
+                {'src': self.path('x.mp3'), 'dst': self.path('y.mp3'), 'rules': ['track-word']},
+                {'src': self.path('a.mp3'), 'dst': self.path('a.mp3'), 'rules': []},
+            ]}, f)
+        replay = RenamePlanner.load(plan_file)
+        self.assertEqual(len(replay), 1)
+        self.assertEqual(replay.renames[self.path('c.mp3')]['dst'], self.path('y.mp3'))
+        self.assertEqual(replay.renames[self.path('c.mp3')]['rules'], ['title', 'track-word'])
+
+
+if __name__ == '__main__':
+    unittest.main()
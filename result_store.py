@@ -0,0 +1,77 @@
+"""
+מאגר תוצאות - זוגות תיקיות ממוינים לפי ציון.
+
+The GUI used to build one list item per folder pair. ResultStore keeps
+the pairs in one list sorted by weighted_score and answers "how many
+rows are above the threshold" and "which pair is row i" in O(log n) /
+O(1). A view built on it only asks for the rows it shows.
+
+add() inserts one pair with insort, which is O(n) because the list has
+to shift. Batches that stream in during a scan go through add_many(),
+which appends the batch and sorts once: the existing keys are already
+one sorted run, so Timsort merges the k new keys in about O(n + k log k)
+instead of k separate O(n) inserts.
+"""
+
+from bisect import bisect_right, insort
+
+
+def pair_score(similarity):
+    return similarity.get('weighted_score', 0.0)
+
+
+def similarity_details(folder_pair, similarity):
+    """Text for the details dialog, built only when a row is opened."""
+    lines = [f"Folder: {folder_pair[0]}", f"Similar folder: {folder_pair[1]}"]
+    if similarity.get('identical'):
+        lines.append("Folders are identical based on file hashes.")
+    for parameter, score in similarity.items():
+        if parameter in ('weighted_score', 'identical'):
+            continue
+        if parameter == 'additional_metadata':
+            lines.append("Additional Metadata Matches:")
+            lines.extend(f"  {meta.capitalize()}: {meta_score:.2f}" for meta, meta_score in score.items())
+        else:
+            lines.append(f"{parameter.capitalize()}: {score:.2f}")
+    lines.append(f"Total Similarity Score: {pair_score(similarity):.2f}%")
+    return "\n".join(lines)
+
+
+class ResultStore:
+    def __init__(self):
+        # (-ציון, סדר הגעה) - הציון הגבוה ראשון, ובשוויון לפי סדר ההגעה
+        self._keys = []
+        self._pairs = []
+        self._similarities = []
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def add(self, folder_pair, similarity):
+        position = len(self._pairs)
+        self._pairs.append(folder_pair)
+        self._similarities.append(similarity)
+        insort(self._keys, (-pair_score(similarity), position))
+
+    def add_many(self, results):
+        for folder_pair, similarity in results:
+            self._keys.append((-pair_score(similarity), len(self._pairs)))
+            self._pairs.append(folder_pair)
+            self._similarities.append(similarity)
+        self._keys.sort()
+
+    def count_above(self, threshold):
+        """Number of pairs with weighted_score >= threshold."""
+        return bisect_right(self._keys, (-threshold, len(self._pairs)))
+
+    def entry(self, row, threshold=0.0, ascending=False):
+        """(folder pair, similarity) of a row among the pairs above threshold."""
+        if ascending:
+            row = self.count_above(threshold) - 1 - row
+        position = self._keys[row][1]
+        return self._pairs[position], self._similarities[position]
+
+    def clear(self):
+        self._keys.clear()
+        self._pairs.clear()
+        self._similarities.clear()
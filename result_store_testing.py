@@ -0,0 +1,47 @@
+# test_result_store.py
+import random
+import unittest
+
+from result_store import ResultStore, similarity_details
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.results = [((f'a{i}', f'b{i}'), {'weighted_score': rng.choice([10.0, 35.5, 50.0, 100.0, rng.uniform(0, 100)])})
+                        for i in range(500)]
+        self.store = ResultStore()
+        # מגיע במנות, כמו בזמן סריקה
+        for start in range(0, len(self.results), 64):
+            self.store.add_many(self.results[start:start + 64])
+
+    def expected(self, threshold, ascending=False):
+        rows = [item for item in self.results if item[1]['weighted_score'] >= threshold]
+        rows.sort(key=lambda item: -item[1]['weighted_score'])  # sort יציב - סדר הגעה בשוויון
+        return rows[::-1] if ascending else rows
+
+    def test_rows_sorted_and_filtered(self):
+        for threshold in (0.0, 30.0, 35.5, 50.0, 100.0, 101.0):
+            for ascending in (False, True):
+                expected = self.expected(threshold, ascending)
+                self.assertEqual(self.store.count_above(threshold), len(expected))
+                rows = [self.store.entry(row, threshold, ascending) for row in range(len(expected))]
+                self.assertEqual(rows, expected)
+
+    def test_add_and_add_many_agree(self):
+        store = ResultStore()
+        for folder_pair, similarity in self.results:
+            store.add(folder_pair, similarity)
+        self.assertEqual([store.entry(row) for row in range(len(store))],
+                         [self.store.entry(row) for row in range(len(self.store))])
+
+    def test_details(self):
+        text = similarity_details(('x', 'y'), {'file_hash': 0.5, 'additional_metadata': {'genre': 1.0}, 'weighted_score': 42.0})
+        self.assertIn("File_hash: 0.50", text)
+        self.assertIn("  Genre: 1.00", text)
+        self.assertTrue(text.endswith("Total Similarity Score: 42.00%"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+מדדי ריצה - זמן לכל שלב ומונים, עם ייצוא ל-JSON ול-Prometheus.
+
+A run records wall time per stage (walk, tag_parse, hash, cover,
+scoring, quality, merge; 'folder' is a whole gather_file_info call and
+contains the per-file stages) and plain counters (files, bytes, cache
+hits/misses, pairs). report() adds the derived numbers - files and
+bytes per second, hit rate per cache, pairs pruned - and the report is
+written as JSON, or as a Prometheus textfile for node_exporter's
+textfile collector:
+
+    metrics = RunMetrics()
+    with metrics.stage('hash'):
+        ...
+    metrics.count('bytes_hashed', size)
+    metrics.save_json('run.json')
+    metrics.save_prometheus('/var/lib/node_exporter/music_automatic.prom')
+"""
+
+import os
+import json
+import time
+import functools
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = 'music_automatic'
+REPORT_NAME = 'music_automatic_report.json'
+
+
+def _write_atomic(path, text):
+    # node_exporter קורא את הקובץ בכל רגע - כותבים לקובץ זמני ומחליפים
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def timed_stage(name):
+    """Method decorator: time the call under self.metrics.stage(name), traced with its first argument."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name, path=args[0] if args else None):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RunMetrics:
+    def __init__(self, tracer=None):
+        # Tracer אופציונלי (tracing.py) - כל שלב נרשם גם כ-span
+        self.tracer = tracer
+        self.stages = {}
+        self.calls = {}
+        self.counters = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **args):
+        """Time a block. Repeated blocks of the same stage add up; args only go to the trace."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.stages[name] = self.stages.get(name, 0.0) + end - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self.tracer is not None:
+                self.tracer.add(name, start, end, args)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def hit(self, cache, hit):
+        """Count a lookup in `cache`: <cache>_hits or <cache>_misses."""
+        self.count(f"{cache}_hits" if hit else f"{cache}_misses")
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def rates(self):
+        """Files and bytes per second of the stages that handle them, and hit rate per cache."""
+        rates = {}
+        per_file = sum(self.stages.get(name, 0.0) for name in ('tag_parse', 'hash'))
+        if per_file > 0:
+            rates['files_per_second'] = self.counters.get('files', 0) / per_file
+        if self.stages.get('hash', 0.0) > 0:
+            rates['bytes_per_second'] = self.counters.get('bytes_hashed', 0) / self.stages['hash']
+        caches = {name.rsplit('_', 1)[0] for name in self.counters if name.endswith(('_hits', '_misses'))}
+        for cache in caches:
+            hits = self.counters.get(f"{cache}_hits", 0)
+            lookups = hits + self.counters.get(f"{cache}_misses", 0)
+            rates[f"{cache}_hit_rate"] = hits / lookups if lookups else 0.0
+        return rates
+
+    def report(self):
+        return {
+            'started': self.started,
+            'elapsed': self.elapsed(),
+            'stages': {name: {'seconds': seconds, 'calls': self.calls[name]} for name, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+            'rates': self.rates(),
+        }
+
+    def save_json(self, path):
+        _write_atomic(path, json.dumps(self.report(), ensure_ascii=False, indent=4))
+
+    def prometheus_text(self, prefix=PROMETHEUS_PREFIX):
+        """The report in the Prometheus text exposition format."""
+        report = self.report()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        lines += [f'{prefix}_stage_seconds{{stage="{name}"}} {stage["seconds"]:.6f}'
+                  for name, stage in sorted(report['stages'].items())]
+        for name, value in sorted(report['counters'].items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        for name, value in sorted(report['rates'].items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value:.6f}"]
+        lines += [
+            f"# TYPE {prefix}_run_seconds gauge", f"{prefix}_run_seconds {report['elapsed']:.6f}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {report['started']:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def save_prometheus(self, path, prefix=PROMETHEUS_PREFIX):
+        _write_atomic(path, self.prometheus_text(prefix))
@@ -0,0 +1,92 @@
+# test_run_metrics.py
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from run_metrics import RunMetrics, timed_stage
+from find_duplic_albums import SelectQuality
+
+from library_generator import generate_library
+
+
+class Stage:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    @timed_stage('work')
+    def work(self, value):
+        return value * 2
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_stages_counters_and_rates(self):
+        metrics = RunMetrics()
+        self.assertEqual(Stage(metrics).work(3), 6)
+        Stage(metrics).work(4)
+        with metrics.stage('hash'):
+            pass
+        metrics.count('files', 10)
+        metrics.count('bytes_hashed', 4096)
+        for hit in (True, True, True, False):
+            metrics.hit('folder_cache', hit)
+        metrics.hit('tag_cache', False)
+
+        report = metrics.report()
+        self.assertEqual(report['stages']['work']['calls'], 2)
+        self.assertEqual(report['counters']['files'], 10)
+        self.assertEqual(report['rates']['folder_cache_hit_rate'], 0.75)
+        self.assertEqual(report['rates']['tag_cache_hit_rate'], 0.0)
+        self.assertIn('bytes_per_second', report['rates'])
+
+    def test_exports(self):
+        metrics = RunMetrics()
+        with metrics.stage('walk'):
+            metrics.count('folders', 3)
+        json_path = os.path.join(self.test_dir, 'run.json')
+        prom_path = os.path.join(self.test_dir, 'run.prom')
+        metrics.save_json(json_path)
+        metrics.save_prometheus(prom_path)
+
+        with open(json_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['counters'], {'folders': 3})
+        with open(prom_path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('music_automatic_stage_seconds{stage="walk"}', text)
+        self.assertIn('music_automatic_folders 3\n', text)
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['run.json', 'run.prom'])
+
+    def test_pipeline_is_instrumented(self):
+        root = os.path.join(self.test_dir, 'library')
+        summary = generate_library(root, folders=6, tracks=4, duplicate_rate=0.5, flac_rate=0.0, seed=5)
+        metrics = RunMetrics()
+        comparer = SelectQuality([root], 'high', metrics=metrics)
+        comparer.DATA_FILE = os.path.join(self.test_dir, 'music_data.json')
+        comparer.music_data = {}
+        with patch('sys.stdout', new=StringIO()):
+            comparer.get_file_lists()
+            comparer.scan_music_library()
+            comparer.scan_music_library()
+            comparer.find_similar_folders()
+
+        report = metrics.report()
+        for stage in ('walk', 'tag_parse', 'hash', 'cover', 'scoring'):
+            self.assertIn(stage, report['stages'])
+        # כל קובץ נסרק פעמיים: get_file_lists ו-scan_music_library
+        self.assertEqual(report['counters']['files'], 2 * summary['files'])
+        self.assertEqual(report['rates']['folder_cache_hit_rate'], 0.5)
+        self.assertEqual(report['counters']['pairs_candidates'] + report['counters']['pairs_pruned'], 6 * 5 // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
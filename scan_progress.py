@@ -0,0 +1,68 @@
+"""
+התקדמות סריקה - מונים, זמן משוער וביטול.
+
+FolderComparer reports its stages (folders scanned, pairs scored)
+through an optional ScanProgress. The callback gets a snapshot dict at
+most every `interval` seconds and at the end of each stage, so a GUI
+thread is not flooded with updates. cancel() may be called from any
+thread; the scan stops with ScanCancelled at the next item.
+"""
+
+import time
+
+
+class ScanCancelled(Exception):
+    """Raised inside the scan after ScanProgress.cancel()."""
+
+
+class ScanProgress:
+    def __init__(self, callback=None, interval=0.1):
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+        self.stage = None
+        self.done = 0
+        self.total = 0
+        self.started = None
+        self._last_report = 0.0
+
+    def start(self, stage, total):
+        self.check()
+        self.stage = stage
+        self.done = 0
+        self.total = total
+        self.started = time.perf_counter()
+        self._report(force=True)
+
+    def advance(self, count=1):
+        self.check()
+        self.done += count
+        self._report(force=self.done >= self.total)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise ScanCancelled(self.stage)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started is not None else 0.0
+
+    def eta(self):
+        """Seconds left in the current stage, from the rate so far (None until there is one)."""
+        if not self.done or self.total <= self.done:
+            return None if not self.done else 0.0
+        return self.elapsed() / self.done * (self.total - self.done)
+
+    def snapshot(self):
+        return {'stage': self.stage, 'done': self.done, 'total': self.total,
+                'elapsed': self.elapsed(), 'eta': self.eta()}
+
+    def _report(self, force=False):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.callback(self.snapshot())
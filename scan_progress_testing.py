@@ -0,0 +1,38 @@
+# test_scan_progress.py
+import unittest
+
+from scan_progress import ScanProgress, ScanCancelled
+from find_duplic_albums import FolderComparer
+
+
+class TestScanProgress(unittest.TestCase):
+
+    def test_snapshots_and_eta(self):
+        snapshots = []
+        progress = ScanProgress(snapshots.append, interval=3600)
+        progress.start('pairs', 4)
+        self.assertIsNone(progress.eta())
+        progress.advance()
+        self.assertGreaterEqual(progress.eta(), 0.0)
+        for _ in range(3):
+            progress.advance()
+        # רק התחלה וסוף - המרווח ארוך
+        self.assertEqual([(s['stage'], s['done']) for s in snapshots], [('pairs', 0), ('pairs', 4)])
+        self.assertEqual(snapshots[-1]['eta'], 0.0)
+
+    def test_cancel_stops_comparison(self):
+        comparer = FolderComparer(['/path/to/music'], 'high')
+        for name in 'abcd':
+            comparer.folder_files[name] = {'files': [{'file': 'x.mp3', 'file_hash': name}],
+                                           'file_similarity': 0.0, 'title_similarity': 0.0, 'album_art': None}
+        found = []
+        with self.assertRaises(ScanCancelled):
+            for folder_pair, similarity in comparer.iter_similar_folders():
+                found.append(folder_pair)
+                comparer.progress.cancel()
+        self.assertEqual(found, [('a', 'b')])
+        self.assertEqual(comparer.progress.snapshot()['total'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
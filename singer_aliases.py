@@ -0,0 +1,140 @@
+"""
+מפענח כינויי זמרים - רשימת ה-CSV כאינדקס מהודר.
+
+singer-list.csv maps a spelling of a singer name to the canonical name.
+AliasResolver normalizes Hebrew (final letters, niqqud, punctuation and
+whitespace), so spellings that differ only in those still match, and
+offers:
+
+- resolve(name): exact lookup of the normalized name,
+- search(name): fuzzy lookup through a character trigram index,
+- match(name): exact, then the best fuzzy match above a threshold.
+
+The compiled index is pickled next to the CSV (CACHE_SUFFIX) and reused
+as long as the CSV content is unchanged.
+"""
+
+import csv
+import hashlib
+import pickle
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+CACHE_SUFFIX = '.cache'
+CACHE_VERSION = 1
+FUZZY_THRESHOLD = 0.85
+FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+# טעמים ונקודות (U+0591-U+05C7), מלבד מקף עברי וסוף פסוק
+NIQQUD = re.compile('[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]')
+PUNCTUATION = re.compile(r'[^\w\s]|_')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_hebrew(text):
+    """Comparable form of a name: no niqqud, no final letters, no punctuation, single spaces."""
+    if not text:
+        return ''
+    text = NIQQUD.sub('', text)
+    text = text.translate(FINAL_LETTERS)
+    text = PUNCTUATION.sub(' ', text)
+    return WHITESPACE.sub(' ', text).strip().casefold()
+
+
+def _trigrams(key):
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AliasResolver:
+    def __init__(self, pairs):
+        # (כינוי, שם קנוני) כפי שהופיעו בקובץ
+        self.pairs = [(alias.strip(), canonical.strip()) for alias, canonical in pairs]
+        self.exact = {}
+        for alias, canonical in self.pairs:
+            self.exact.setdefault(normalize_hebrew(canonical), canonical)
+        for alias, canonical in self.pairs:
+            self.exact[normalize_hebrew(alias)] = canonical
+        self.exact.pop('', None)
+
+        self.keys = list(self.exact)
+        self.grams = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in _trigrams(key):
+                self.grams.setdefault(gram, []).append(key_id)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __contains__(self, name):
+        return normalize_hebrew(name) in self.exact
+
+    def resolve(self, name):
+        """Canonical name for an exact (normalized) alias, or None."""
+        return self.exact.get(normalize_hebrew(name))
+
+    def search(self, name, threshold=FUZZY_THRESHOLD, limit=5):
+        """
+        Fuzzy lookup. Returns up to limit (canonical name, score, alias key)
+        tuples with a SequenceMatcher ratio of at least threshold, best first.
+        """
+        key = normalize_hebrew(name)
+        if not key:
+            return []
+        counts = Counter()
+        for gram in _trigrams(key):
+            counts.update(self.grams.get(gram, ()))
+
+        results = []
+        for key_id, shared in counts.most_common():
+            candidate = self.keys[key_id]
+            # גבול עליון ליחס לפי אורכים
+            if 2 * min(len(key), len(candidate)) / (len(key) + len(candidate)) < threshold:
+                continue
+            matcher = SequenceMatcher(None, key, candidate)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold:
+                results.append((self.exact[candidate], score, candidate))
+        results.sort(key=lambda item: -item[1])
+        return results[:limit]
+
+    def match(self, name, threshold=FUZZY_THRESHOLD):
+        """Exact lookup, then the best fuzzy match. Returns the canonical name or None."""
+        canonical = self.resolve(name)
+        if canonical is None:
+            found = self.search(name, threshold, limit=1)
+            canonical = found[0][0] if found else None
+        return canonical
+
+    # --------------------------- Loading --------------------------- #
+
+    @classmethod
+    def load(cls, csv_path, cache_path=None):
+        """
+        Load the alias list from a two-column CSV, through the binary cache
+        when the CSV hasn't changed since it was compiled.
+        """
+        with open(csv_path, mode='r', encoding='utf-8') as csvfile:
+            text = csvfile.read()
+        digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+        cache_path = cache_path or csv_path + CACHE_SUFFIX
+
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get('version') == CACHE_VERSION and cached.get('digest') == digest:
+                return cached['resolver']
+        except Exception:
+            pass  # אין מטמון, או מטמון ישן/פגום - בונים מחדש
+
+        rows = [row for row in csv.reader(text.splitlines()) if len(row) == 2]
+        resolver = cls(rows)
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'digest': digest, 'resolver': resolver}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Error saving alias cache {cache_path}: {e}")
+        return resolver
@@ -0,0 +1,44 @@
+# test_singer_aliases.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from singer_aliases import AliasResolver, normalize_hebrew, CACHE_SUFFIX
+
+
+class TestSingerAliases(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.folder, 'singers.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write('אברהם פריד,אברהם פריד\nא. פריד,אברהם פריד\nמרדכי בן דוד,מרדכי בן דוד\nMBD,מרדכי בן דוד\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_normalize_hebrew(self):
+        self.assertEqual(normalize_hebrew('אַבְרָהָם  פְּרִיד'), 'אברהמ פריד')
+        self.assertEqual(normalize_hebrew('ר\' שלמה-קרליבך'), 'ר שלמה קרליבכ')
+        self.assertEqual(normalize_hebrew('שלום'), normalize_hebrew('שלומ'))
+
+    def test_exact_and_fuzzy(self):
+        resolver = AliasResolver.load(self.csv_path)
+        self.assertEqual(resolver.resolve('א פריד'), 'אברהם פריד')
+        self.assertEqual(resolver.resolve('mbd'), 'מרדכי בן דוד')
+        self.assertIsNone(resolver.resolve('מרדכי בן דויד'))
+        self.assertEqual(resolver.match('מרדכי בן דויד'), 'מרדכי בן דוד')
+        self.assertIsNone(resolver.match('ישי ריבו'))
+
+    def test_cache(self):
+        AliasResolver.load(self.csv_path)
+        self.assertTrue(os.path.exists(self.csv_path + CACHE_SUFFIX))
+        with open(self.csv_path, 'a', encoding='utf-8') as f:
+            f.write('ישי ריבו,ישי ריבו\n')
+        # הקובץ השתנה - המטמון נבנה מחדש
+        self.assertEqual(AliasResolver.load(self.csv_path).resolve('ישי ריבו'), 'ישי ריבו')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""
+אינדקס סינגלים - סינגלים כפולים בכל הספרייה במעבר אחד.
+
+remove_duplicate_singles hashed files one directory at a time, so a
+single that also sits inside an album, or in another singer's folder,
+was never found, and any re-encode or tag edit changed the hash.
+SinglesIndex keys every track by normalized (artist, title) plus a
+duration bucket:
+
+- two tracks match when the keys are equal and the durations are within
+  DURATION_TOLERANCE (neighbouring buckets are checked too),
+- when a duration is unknown, the audio payload hash (the file without
+  its tags) decides,
+- a group is reported only if it holds at least one single. A copy
+  inside an album comes first and is always kept, so an album never
+  loses a track; otherwise the best bitrate comes first and the caller
+  passes the rest to its quality selector.
+
+Files without an artist or title tag are not indexed from their tags:
+a name like "Track 01" says nothing about the song, and such files in
+different albums would be grouped as the same single.
+"""
+
+import os
+import struct
+import hashlib
+from collections import defaultdict, namedtuple
+
+from lazy_import import lazy_callable
+from singer_aliases import normalize_hebrew
+from duration_index import DURATION_TOLERANCE
+
+File = lazy_callable('mutagen', 'File')
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.wav', '.m4a')
+ALBUM_MIN_TRACKS = 4  # תיקייה עם פחות רצועות נחשבת תיקיית סינגלים
+SINGLE_WORDS = ('סינגל', 'single')
+
+SongEntry = namedtuple('SongEntry', 'path artist title duration bitrate single')
+
+
+def normalize_title(title):
+    """Comparable song title: normalized Hebrew without a leading track number."""
+    key = normalize_hebrew(title)
+    parts = key.split(' ', 1)
+    if len(parts) == 2 and parts[0].isdigit():
+        key = parts[1]
+    return key
+
+
+def duration_bucket(duration):
+    if not duration:
+        return None
+    return int(duration // DURATION_TOLERANCE)
+
+
+def payload_hash(file_path):
+    """MD5 of the audio payload: ID3v2/ID3v1 or FLAC metadata blocks are skipped."""
+    size = os.path.getsize(file_path)
+    start, end = 0, size
+    with open(file_path, 'rb') as f:
+        header = f.read(10)
+        if header[:3] == b'ID3' and len(header) == 10:
+            start = 10 + ((header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9])
+        elif header[:4] == b'fLaC':
+            start = 4
+            f.seek(start)
+            while True:
+                block = f.read(4)
+                if len(block) < 4:
+                    break
+                start += 4 + struct.unpack('>I', b'\0' + block[1:])[0]
+                f.seek(start)
+                if block[0] & 0x80:  # הבלוק האחרון
+                    break
+        if size >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b'TAG':
+                end = size - 128
+
+        md5 = hashlib.md5()
+        f.seek(start)
+        remaining = max(end - start, 0)
+        while remaining:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            md5.update(chunk)
+            remaining -= len(chunk)
+    return md5.hexdigest()
+
+
+class SinglesIndex:
+    def __init__(self, alias_resolver=None):
+        # AliasResolver אופציונלי - כינויים שונים של אותו זמר נחשבים אמן אחד
+        self.alias_resolver = alias_resolver
+        self.entries = []
+        # (אמן, כותרת, דלי משך) -> [מזהי רשומות]
+        self.buckets = defaultdict(list)
+        self._payloads = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def artist_key(self, artist):
+        if self.alias_resolver is not None:
+            artist = self.alias_resolver.resolve(artist) or artist
+        return normalize_hebrew(artist)
+
+    def add(self, path, artist, title, duration=0, bitrate=0, single=True):
+        entry_id = len(self.entries)
+        self.entries.append(SongEntry(path, artist, title, duration or 0, bitrate or 0, single))
+        key = (self.artist_key(artist), normalize_title(title))
+        if key[1]:
+            self.buckets[key + (duration_bucket(duration),)].append(entry_id)
+        return entry_id
+
+    def add_file(self, file_path, single=None, tracks_in_folder=None):
+        """Read tags and stream info with mutagen and index the file. Returns the entry id or None."""
+        try:
+            audio = File(file_path, easy=True)
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            return None
+        tags = (audio.tags if audio is not None else None) or {}
+        info = audio.info if audio is not None else None
+        return self.add_tags(file_path, tags, getattr(info, 'length', 0), getattr(info, 'bitrate', 0),
+                             single, tracks_in_folder)
+
+    def add_tags(self, file_path, tags, duration=0, bitrate=0, single=None, tracks_in_folder=None):
+        """
+        Index a file from tags that were already read ({easy key: [values]}).
+        Returns the entry id, or None when the artist or title tag is missing.
+        """
+        artist = (tags.get('artist') or [''])[0]
+        title = (tags.get('title') or [''])[0]
+        if not normalize_hebrew(artist) or not normalize_hebrew(title):
+            return None
+        album = (tags.get('album') or [''])[0]
+        if single is None:
+            single = self.is_single(album, title, tracks_in_folder)
+        return self.add(file_path, artist, title, duration, bitrate, single)
+
+    @staticmethod
+    def is_single(album, title, tracks_in_folder=None):
+        """A track without an album, with a "single" album, or in a folder of only a few tracks."""
+        album_key = normalize_hebrew(album)
+        if not album_key or album_key == normalize_hebrew(title):
+            return True
+        if any(word in album_key for word in SINGLE_WORDS):
+            return True
+        return tracks_in_folder is not None and tracks_in_folder < ALBUM_MIN_TRACKS
+
+    def scan(self, root_dir):
+        """Index every audio file under root_dir."""
+        for root, dirs, files in os.walk(root_dir):
+            tracks = [f for f in files if f.lower().endswith(AUDIO_EXTENSIONS)]
+            for file in tracks:
+                self.add_file(os.path.join(root, file), tracks_in_folder=len(tracks))
+        return self
+
+    def payload(self, entry_id):
+        if entry_id not in self._payloads:
+            try:
+                self._payloads[entry_id] = payload_hash(self.entries[entry_id].path)
+            except OSError as e:
+                print(f"Error hashing {self.entries[entry_id].path}: {e}")
+                self._payloads[entry_id] = None
+        return self._payloads[entry_id]
+
+    def same_song(self, id1, id2):
+        d1, d2 = self.entries[id1].duration, self.entries[id2].duration
+        if d1 and d2:
+            return abs(d1 - d2) <= DURATION_TOLERANCE
+        # משך לא ידוע - רק תוכן זהה
+        payload = self.payload(id1)
+        return payload is not None and payload == self.payload(id2)
+
+    def duplicate_groups(self, include_albums=True):
+        """
+        Groups of entries that are the same song: album copies first, then
+        by bitrate. Only groups with a single are returned; with
+        include_albums=False, a single that also appears in an album is
+        left alone.
+        """
+        parent = list(range(len(self.entries)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for (artist, title, bucket), ids in self.buckets.items():
+            # אותו דלי ודלי שכן אחד קדימה - כל זוג נבדק פעם אחת
+            neighbours = self.buckets.get((artist, title, bucket + 1), []) if bucket is not None else []
+            unknown = self.buckets.get((artist, title, None), []) if bucket is not None else []
+            for i, id1 in enumerate(ids):
+                for id2 in ids[i + 1:] + neighbours + unknown:
+                    if find(id1) != find(id2) and self.same_song(id1, id2):
+                        parent[find(id2)] = find(id1)
+
+        groups = defaultdict(list)
+        for entry_id in range(len(self.entries)):
+            groups[find(entry_id)].append(self.entries[entry_id])
+
+        result = []
+        for members in groups.values():
+            if len(members) < 2 or not any(entry.single for entry in members):
+                continue
+            if not include_albums and not all(entry.single for entry in members):
+                continue
+            # העותק שבאלבום קודם - גם כשלסינגל קצב סיביות גבוה יותר; אחר כך קצב סיביות גבוה
+            members.sort(key=lambda entry: (entry.single, -entry.bitrate, entry.path))
+            result.append(members)
+        result.sort(key=lambda members: members[0].path)
+        return result
+
+    def duplicate_singles(self, include_albums=True):
+        """
+        (keep, [copies to remove]) for every group, as paths. Only singles
+        are listed for removal; album copies are never removed.
+        """
+        return [(members[0].path, [entry.path for entry in members[1:] if entry.single])
+                for members in self.duplicate_groups(include_albums)]
@@ -0,0 +1,102 @@
+# test_singles_index.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen.id3 import ID3, TIT2, TPE1, TALB
+
+from singles_index import SinglesIndex, normalize_title, payload_hash
+
+# MPEG1 Layer III, 44.1 kHz: אינדקס קצב הסיביות בכותרת המסגרת
+BITRATE_INDEX = {128: 9, 320: 14}
+
+
+def make_track(path, title, artist, album='', kbps=128, seconds=10):
+    frame = bytes([0xff, 0xfb, BITRATE_INDEX[kbps] << 4, 0]).ljust(144000 * kbps // 44100, b'\x00')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(frame * int(seconds * 44100 / 1152))
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=title))
+    tags.add(TPE1(encoding=3, text=artist))
+    if album:
+        tags.add(TALB(encoding=3, text=album))
+    tags.save(path)
+
+
+class TestSinglesIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def test_single_inside_album_and_other_folder(self):
+        make_track(self.path('אמן', 'שיר יפה.mp3'), 'שיר יפה', 'אמן', kbps=128, seconds=10)
+        make_track(self.path('זמר אחר', 'שיר-יפה.mp3'), 'שיר יפה!', 'אמן', kbps=128, seconds=11)
+        for i in range(4):
+            make_track(self.path('אמן', 'אלבום', f'{i}.mp3'), f'{i + 1:02d} שיר {i}', 'אמן', 'אלבום', kbps=320)
+        make_track(self.path('אמן', 'אלבום', '5.mp3'), '05 שיר יפה', 'אמן', 'אלבום', kbps=320, seconds=10)
+        # שיר אחר עם אותו שם אבל משך שונה
+        make_track(self.path('אמן', 'רמיקס', 'שיר יפה.mp3'), 'שיר יפה', 'אמן', kbps=128, seconds=30)
+
+        duplicates = SinglesIndex().scan(self.root).duplicate_singles()
+        self.assertEqual(len(duplicates), 1)
+        keep, lower = duplicates[0]
+        self.assertEqual(keep, self.path('אמן', 'אלבום', '5.mp3'))
+        self.assertEqual(sorted(lower), sorted([self.path('אמן', 'שיר יפה.mp3'), self.path('זמר אחר', 'שיר-יפה.mp3')]))
+
+    def test_album_copy_is_kept_over_a_better_single(self):
+        make_track(self.path('אמן', 'שיר.mp3'), 'שיר', 'אמן', kbps=320)
+        make_track(self.path('סינגלים', 'שיר.mp3'), 'שיר', 'אמן', kbps=128)
+        for i in range(4):
+            make_track(self.path('אמן', 'אלבום', f'{i}.mp3'), 'שיר' if i == 0 else f'אחר {i}', 'אמן', 'אלבום', kbps=128)
+        keep, remove = SinglesIndex().scan(self.root).duplicate_singles()[0]
+        self.assertEqual(keep, self.path('אמן', 'אלבום', '0.mp3'))
+        self.assertEqual(sorted(remove), sorted([self.path('אמן', 'שיר.mp3'), self.path('סינגלים', 'שיר.mp3')]))
+
+    def test_albums_can_be_excluded(self):
+        make_track(self.path('אמן', 'שיר.mp3'), 'שיר', 'אמן')
+        for i in range(4):
+            make_track(self.path('אמן', 'אלבום', f'{i}.mp3'), 'שיר' if i == 0 else f'אחר {i}', 'אמן', 'אלבום', kbps=320)
+        index = SinglesIndex().scan(self.root)
+        self.assertEqual(len(index.duplicate_singles(include_albums=True)), 1)
+        self.assertEqual(index.duplicate_singles(include_albums=False), [])
+
+    def test_untagged_files_are_not_indexed(self):
+        # "Track 01" בלי תגיות בשני אלבומים שונים אינו אותו סינגל
+        for folder in ('אלבום א', 'אלבום ב'):
+            make_track(self.path(folder, 'Track 01.mp3'), 'x', 'x', seconds=10)
+            ID3(self.path(folder, 'Track 01.mp3')).delete()
+        make_track(self.path('ג', 'Track 01.mp3'), 'Track 01', '', seconds=10)
+        index = SinglesIndex().scan(self.root)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.duplicate_singles(), [])
+
+    def test_payload_hash_decides_without_duration(self):
+        make_track(self.path('a', 'x.mp3'), 'שיר', 'אמן', seconds=5)
+        make_track(self.path('b', 'y.mp3'), 'Other tags', 'x', seconds=5)
+        make_track(self.path('c', 'z.mp3'), 'שיר', 'אמן', seconds=6)
+        self.assertEqual(payload_hash(self.path('a', 'x.mp3')), payload_hash(self.path('b', 'y.mp3')))
+        self.assertNotEqual(payload_hash(self.path('a', 'x.mp3')), payload_hash(self.path('c', 'z.mp3')))
+
+        index = SinglesIndex()
+        index.add(self.path('a', 'x.mp3'), 'אמן', 'שיר')
+        index.add(self.path('b', 'y.mp3'), 'אמן', 'שיר')
+        index.add(self.path('c', 'z.mp3'), 'אמן', 'שיר')
+        groups = index.duplicate_groups()
+        self.assertEqual([[entry.path for entry in group] for group in groups],
+                         [[self.path('a', 'x.mp3'), self.path('b', 'y.mp3')]])
+
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title('03 - שלום עליכם'), normalize_title('שלום עליכם'))
+        self.assertEqual(normalize_title('Hello, World'), 'hello world')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+מתזמן שלבים - גרף תלויות בין שלבי הריצה, הרצה מקבילית ומעבר אחד לכל קובץ.
+
+Every stage declares the resources it reads (inputs) and writes
+(outputs). Stages are added in program order, and a stage waits for an
+earlier one when it reads what the earlier stage writes, writes what it
+reads, or both write the same resource. Stages with no such path between
+them run at the same time on a thread pool.
+
+Per-file stages (per_file=True) are called with one item at a time.
+Per-file stages that no whole-run stage separates are fused into a
+single pass: the items are walked once and each item goes through all
+the fused stages in program order, so state cached on the item (tags
+read once) is shared by them. A per-file stage may only rely on what
+earlier per-file stages did to the same item; a stage that needs the
+results for all items is a whole-run stage.
+
+    scheduler = StageScheduler(workers=4)
+    scheduler.add('dedup', remove_duplicates, outputs=['library'])
+    scheduler.add('fix', fix_tags, inputs=['library'], outputs=['tags'], per_file=True)
+    scheduler.add('names', plan_names, inputs=['library'], outputs=['names'], per_file=True)
+    scheduler.run(items=live_files)
+
+items is called when a pass starts, so a pass sees the items that are
+left after the stages it waits for (files moved away are not visited).
+"""
+
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_WORKERS = 4
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=(), per_file=False):
+        self.name = name
+        self.func = func
+        self.inputs = frozenset(inputs)
+        self.outputs = frozenset(outputs)
+        self.per_file = per_file
+
+    def depends_on(self, earlier):
+        """True if this stage has to run after `earlier` (added before it)."""
+        return bool(self.inputs & earlier.outputs or self.outputs & earlier.inputs or self.outputs & earlier.outputs)
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+class StageScheduler:
+    def __init__(self, workers=DEFAULT_WORKERS, metrics=None):
+        self.workers = workers
+        # RunMetrics אופציונלי - זמן לכל שלב (שלבים לכל קובץ מצטברים על כל הקבצים)
+        self.metrics = metrics
+        self.stages = []
+
+    def add(self, name, func, inputs=(), outputs=(), per_file=False):
+        if any(stage.name == name for stage in self.stages):
+            raise ValueError(f"Duplicate stage name: {name}")
+        stage = Stage(name, func, inputs, outputs, per_file)
+        self.stages.append(stage)
+        return stage
+
+    def dependencies(self):
+        """{stage name: names of the earlier stages it waits for}."""
+        return {
+            stage.name: {earlier.name for earlier in self.stages[:index] if stage.depends_on(earlier)}
+            for index, stage in enumerate(self.stages)
+        }
+
+    def plan(self):
+        """
+        The nodes of the run in program order: [(stages, indices of the nodes
+        it waits for)]. A node is one whole-run stage or the fused stages of
+        one per-file pass.
+        """
+        dependencies = self.dependencies()
+        ancestors = {}
+        for stage in self.stages:
+            ancestors[stage.name] = set(dependencies[stage.name])
+            for name in dependencies[stage.name]:
+                ancestors[stage.name] |= ancestors[name]
+
+        nodes = []
+        node_of = {}
+        for stage in self.stages:
+            joined = None
+            if stage.per_file:
+                # מצטרף למעבר קיים אם כל מה שהוא מחכה לו כבר הסתיים לפני המעבר או נמצא בו
+                for index in reversed(range(len(nodes))):
+                    members = nodes[index]
+                    if not members[0].per_file:
+                        continue
+                    names = {member.name for member in members}
+                    before = set().union(*(ancestors[member.name] for member in members)) - names
+                    if ancestors[stage.name] <= names | before:
+                        joined = index
+                        break
+            if joined is None:
+                joined = len(nodes)
+                nodes.append([])
+            nodes[joined].append(stage)
+            node_of[stage.name] = joined
+
+        return [
+            (members, {node_of[name] for member in members for name in dependencies[member.name]} - {index})
+            for index, members in enumerate(nodes)
+        ]
+
+    def run(self, items=None, after_item=None):
+        """
+        Run every stage once its dependencies are done. items() gives the
+        items of a per-file pass; after_item(item) is called when an item
+        has been through all the stages of its pass.
+        An exception in a stage stops the run (running stages finish) and is raised.
+        """
+        nodes = self.plan()
+        done = set()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(done) < len(nodes):
+                for index, (members, waits) in enumerate(nodes):
+                    if index not in done and index not in running.values() and waits <= done:
+                        running[executor.submit(self._run_node, members, items, after_item)] = index
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    future.result()
+                    done.add(index)
+
+    def _run_node(self, members, items, after_item):
+        if not members[0].per_file:
+            with self._timed(members[0].name):
+                members[0].func()
+            return
+        for item in items():
+            for stage in members:
+                with self._timed(stage.name):
+                    stage.func(item)
+            if after_item is not None:
+                after_item(item)
+
+    def _timed(self, name):
+        return self.metrics.stage(name) if self.metrics is not None else nullcontext()
@@ -0,0 +1,118 @@
+# test_stage_scheduler.py
+import io
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import contextlib
+from unittest.mock import patch
+
+from stage_scheduler import StageScheduler
+from run_metrics import RunMetrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'o1_project'))
+from library_generator import generate_library
+
+
+class TestStageScheduler(unittest.TestCase):
+
+    def test_dependencies_and_fused_pass(self):
+        scheduler = StageScheduler()
+        noop = lambda *args: None
+        scheduler.add('dedup', noop, outputs=['library'])
+        scheduler.add('fix', noop, inputs=['library'], outputs=['tags'], per_file=True)
+        scheduler.add('title', noop, inputs=['library'], outputs=['names'], per_file=True)
+        scheduler.add('index', noop, inputs=['names'], outputs=['index'])
+        scheduler.add('words', noop, inputs=['index'], outputs=['names'], per_file=True)
+        scheduler.add('report', noop, inputs=['library'])
+        scheduler.add('write', noop, inputs=['names', 'tags'], outputs=['library'])
+
+        self.assertEqual(scheduler.dependencies()['title'], {'dedup'})
+        plan = [([stage.name for stage in members], waits) for members, waits in scheduler.plan()]
+        self.assertEqual(plan, [
+            (['dedup'], set()),
+            (['fix', 'title'], {0}),
+            # words מחכה לשלב שרץ על כל הקבצים אחרי title - מעבר נפרד
+            (['index'], {1}),
+            (['words'], {1, 2}),
+            (['report'], {0}),
+            (['write'], {0, 1, 3, 4}),
+        ])
+        with self.assertRaises(ValueError):
+            scheduler.add('fix', noop)
+
+    def test_independent_stages_run_together(self):
+        barrier = threading.Barrier(2, timeout=5)
+        scheduler = StageScheduler(workers=2)
+        scheduler.add('language', barrier.wait, inputs=['library'])
+        scheduler.add('compress', barrier.wait, inputs=['library'])
+        scheduler.run()
+
+    def test_pass_visits_live_items_once(self):
+        items = {'a': True, 'b': True, 'c': True}
+        calls = []
+        metrics = RunMetrics()
+        scheduler = StageScheduler(metrics=metrics)
+        scheduler.add('remove', lambda: items.update(b=False), outputs=['library'])
+        scheduler.add('first', lambda item: calls.append(('first', item)), inputs=['library'], per_file=True)
+        scheduler.add('second', lambda item: calls.append(('second', item)), inputs=['library'], per_file=True)
+        scheduler.run(items=lambda: [item for item, live in items.items() if live],
+                      after_item=lambda item: calls.append(('done', item)))
+
+        self.assertEqual(calls, [('first', 'a'), ('second', 'a'), ('done', 'a'),
+                                 ('first', 'c'), ('second', 'c'), ('done', 'c')])
+        self.assertEqual(metrics.calls['first'], 2)
+        self.assertEqual(metrics.calls['remove'], 1)
+
+    def test_stage_error_stops_the_run(self):
+        ran = []
+
+        def fail():
+            raise RuntimeError('broken')
+
+        scheduler = StageScheduler()
+        scheduler.add('fail', fail, outputs=['library'])
+        scheduler.add('after', lambda: ran.append('after'), inputs=['library'])
+        with self.assertRaises(RuntimeError):
+            scheduler.run()
+        self.assertEqual(ran, [])
+
+
+class TestMusicAutomaticStages(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.library_dir = os.path.join(self.temp_dir, 'library')
+        self.library = generate_library(self.library_dir, folders=8, tracks=4, duplicate_rate=0.5, flac_rate=0, seed=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_removed_files_are_not_visited(self):
+        import ma_o1_b
+
+        config = ma_o1_b.Config(music_directory=self.library_dir, add_album_art=False,
+                                recycle_bin=os.path.join(self.temp_dir, 'bin'))
+        app = ma_o1_b.MusicAutomatic(config)
+        opened = []
+        read_file = ma_o1_b.File
+        out = io.StringIO()
+        with patch.object(ma_o1_b, 'File', lambda path, **kwargs: opened.append(path) or read_file(path, **kwargs)), \
+                contextlib.redirect_stdout(out):
+            app.process()
+
+        removed = {record.path for record in app.catalog.removed()}
+        self.assertTrue(removed)
+        self.assertFalse(any(os.path.exists(path) for path in removed))
+        # התגיות והמידע של כל קובץ נקראים פעם אחת
+        self.assertEqual(sorted(opened), sorted(set(opened)))
+        self.assertNotIn('No such file', out.getvalue())
+        self.assertNotIn('source missing', out.getvalue())
+        self.assertEqual(len(app.rename_planner), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
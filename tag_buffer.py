@@ -0,0 +1,150 @@
+"""
+מאגר שינויי תגיות - שמירה אחת לכל קובץ.
+
+Stages tag changes from every stage of a run (jibrish fix, track names,
+metadata merge, genre/artist/title updates) and writes them at the end
+with a single save per file, in directory order.
+"""
+
+import os
+
+from lazy_import import lazy_module, lazy_callable
+from tag_padding import padding_policy, rewrite_report
+
+File = lazy_callable('mutagen', 'File')
+id3 = lazy_module('mutagen.id3')
+easyid3 = lazy_module('mutagen.easyid3')
+
+
+class TagBuffer:
+    """Collect per-file tag changes and flush them with one save per file."""
+
+    def __init__(self):
+        # path -> {easy key: value}
+        self.pending = {}
+        # path -> {frame hash key: mutagen ID3 frame}
+        self.pending_frames = {}
+        # number of saves the stages would have done on their own
+        self.staged_writes = 0
+
+    def stage(self, file_path, changes):
+        """
+        Stage easy-key changes (e.g. {'title': 'שיר'}) for a file.
+        Later stages override earlier values for the same key.
+        """
+        if not changes:
+            return
+        self.pending.setdefault(file_path, {}).update(changes)
+        self.staged_writes += 1
+
+    def stage_frames(self, file_path, frames):
+        """Stage raw ID3 frames (APIC, TCON, ...) for an MP3 file."""
+        if not frames:
+            return
+        staged = self.pending_frames.setdefault(file_path, {})
+        for frame in frames:
+            staged[frame.HashKey] = frame
+        self.staged_writes += 1
+
+    def get(self, file_path, key, default=None):
+        """Return the staged value of an easy key, so later stages see earlier changes."""
+        value = self.pending.get(file_path, {}).get(key)
+        if value is None:
+            return default
+        return value if isinstance(value, list) else [value]
+
+    def rename(self, old_path, new_path):
+        """Move staged changes along with a renamed file."""
+        if old_path in self.pending:
+            self.pending.setdefault(new_path, {}).update(self.pending.pop(old_path))
+        if old_path in self.pending_frames:
+            self.pending_frames.setdefault(new_path, {}).update(self.pending_frames.pop(old_path))
+
+    def discard(self, file_path):
+        """Drop staged changes for a file that was moved away or deleted."""
+        self.pending.pop(file_path, None)
+        self.pending_frames.pop(file_path, None)
+
+    def __len__(self):
+        return len(set(self.pending) | set(self.pending_frames))
+
+    def ordered_paths(self):
+        """Files with staged changes, grouped by directory."""
+        paths = set(self.pending) | set(self.pending_frames)
+        return sorted(paths, key=lambda p: (os.path.dirname(p), os.path.basename(p)))
+
+    def apply(self, file_path):
+        """Load a file and apply its staged changes. Returns the mutagen object (not saved)."""
+        changes = self.pending.get(file_path, {})
+        frames = self.pending_frames.get(file_path, {})
+
+        if not frames:
+            audio = File(file_path, easy=True)
+            if audio is None:
+                raise ValueError("unsupported file format")
+            if audio.tags is None:
+                audio.add_tags()
+            for key, value in changes.items():
+                audio[key] = value
+            return audio
+
+        audio = File(file_path)
+        if audio is None:
+            raise ValueError("unsupported file format")
+        if audio.tags is None:
+            audio.add_tags()
+        if not isinstance(audio.tags, id3.ID3):
+            raise ValueError("raw ID3 frames staged for a non-ID3 file")
+        # ממפה מפתחות easy למסגרות ID3 כמו ש-EasyID3 עושה
+        for key, value in changes.items():
+            easyid3.EasyID3.Set[key](audio.tags, key, value if isinstance(value, list) else [value])
+        for frame in frames.values():
+            audio.tags.add(frame)
+        return audio
+
+    def rewrite_report(self):
+        """List staged files that would need a full rewrite (nothing is written)."""
+        return rewrite_report(self)
+
+    def flush(self, save_kwargs=None, wrap_save=None):
+        """
+        Write every staged change with one save per file.
+        Saves reuse the existing padding (see tag_padding.padding_policy).
+        wrap_save(file_path, save), if given, is called instead of save(),
+        e.g. to journal each save.
+        Returns a report dict: files saved, failures and rewrites avoided.
+        """
+        saved = 0
+        failed = []
+        missing = 0
+        for file_path in self.ordered_paths():
+            if not os.path.exists(file_path):
+                # הקובץ הועבר או נמחק אחרי שהשינויים נרשמו
+                print(f"Skipping staged tags for missing file: {file_path}")
+                missing += 1
+                continue
+            try:
+                audio = self.apply(file_path)
+                save = lambda: audio.save(**(save_kwargs or {'padding': padding_policy}))
+                if wrap_save is not None:
+                    wrap_save(file_path, save)
+                else:
+                    save()
+                saved += 1
+            except Exception as e:
+                print(f"Error saving staged tags for {file_path}: {e}")
+                failed.append(file_path)
+
+        report = {
+            'files_saved': saved,
+            'files_failed': len(failed),
+            'files_missing': missing,
+            'staged_writes': self.staged_writes,
+            'rewrites_avoided': max(self.staged_writes - saved - len(failed) - missing, 0),
+        }
+        print(f"Tag buffer: {saved} files saved, {report['rewrites_avoided']} rewrites avoided.")
+
+        self.pending.clear()
+        self.pending_frames.clear()
+        self.staged_writes = 0
+        return report
@@ -0,0 +1,119 @@
+# test_tag_buffer.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen.easyid3 import EasyID3
+from mutagen.id3 import ID3, TCON, TXXX
+
+from tag_buffer import TagBuffer
+from library_generator import write_mp3
+
+
+def make_mp3(path, index):
+    write_mp3(path, {'title': f'שיר {index}', 'artist': 'אמן', 'album': 'Album Name',
+                     'tracknumber': str(index + 1), 'genre': 'Pop', 'encoding': 3})
+
+
+class TestTagBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for i in range(3):
+            make_mp3(self.path(f'{i}.mp3'), i)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def test_stage_and_get(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path('0.mp3'), {'title': 'שיר', 'genre': ['Pop', 'Rock']})
+        buffer.stage(self.path('0.mp3'), {'title': 'שיר חדש'})
+        buffer.stage(self.path('1.mp3'), {})
+        # שלב מאוחר יותר רואה את הערך האחרון שנרשם
+        self.assertEqual(buffer.get(self.path('0.mp3'), 'title'), ['שיר חדש'])
+        self.assertEqual(buffer.get(self.path('0.mp3'), 'genre'), ['Pop', 'Rock'])
+        self.assertIsNone(buffer.get(self.path('0.mp3'), 'album'))
+        self.assertEqual(buffer.get(self.path('1.mp3'), 'title', []), [])
+        self.assertEqual(len(buffer), 1)
+        # שום דבר לא נכתב לפני flush
+        self.assertEqual(EasyID3(self.path('0.mp3'))['title'], ['שיר 0'])
+
+    def test_one_save_per_file(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path('0.mp3'), {'title': 'א'})
+        buffer.stage(self.path('0.mp3'), {'artist': 'ב'})
+        buffer.stage(self.path('0.mp3'), {'album': 'ג'})
+        buffer.stage(self.path('1.mp3'), {'title': 'ד'})
+
+        saved = []
+        report = buffer.flush(wrap_save=lambda file_path, save: saved.append(file_path) or save())
+
+        self.assertEqual(saved, [self.path('0.mp3'), self.path('1.mp3')])
+        self.assertEqual(report, {'files_saved': 2, 'files_failed': 0, 'files_missing': 0,
+                                  'staged_writes': 4, 'rewrites_avoided': 2})
+        tags = EasyID3(self.path('0.mp3'))
+        self.assertEqual((tags['title'], tags['artist'], tags['album']), (['א'], ['ב'], ['ג']))
+        self.assertEqual(len(buffer), 0)
+
+    def test_rename_follows_the_file(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path('0.mp3'), {'title': 'שיר'})
+        buffer.stage_frames(self.path('0.mp3'), [TCON(encoding=3, text='Rock')])
+        os.rename(self.path('0.mp3'), self.path('new.mp3'))
+        buffer.rename(self.path('0.mp3'), self.path('new.mp3'))
+
+        self.assertIsNone(buffer.get(self.path('0.mp3'), 'title'))
+        self.assertEqual(buffer.get(self.path('new.mp3'), 'title'), ['שיר'])
+        self.assertEqual(buffer.ordered_paths(), [self.path('new.mp3')])
+        self.assertEqual(buffer.flush()['files_saved'], 1)
+        tags = ID3(self.path('new.mp3'))
+        self.assertEqual(str(tags['TIT2']), 'שיר')
+        self.assertEqual(str(tags['TCON']), 'Rock')
+
+    def test_stage_frames(self):
+        buffer = TagBuffer()
+        buffer.stage_frames(self.path('0.mp3'), [TXXX(encoding=3, desc='source', text='cd')])
+        # מסגרת עם אותו מפתח מחליפה את הקודמת
+        buffer.stage_frames(self.path('0.mp3'), [TXXX(encoding=3, desc='source', text='web')])
+        buffer.stage(self.path('0.mp3'), {'title': 'שיר'})
+        buffer.flush()
+
+        tags = ID3(self.path('0.mp3'))
+        self.assertEqual(tags.getall('TXXX:source')[0].text, ['web'])
+        self.assertEqual(str(tags['TIT2']), 'שיר')
+        self.assertEqual(str(tags['TALB']), 'Album Name')
+
+    def test_flush_report_missing_and_failed(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path('0.mp3'), {'title': 'א'})
+        buffer.stage(self.path('gone.mp3'), {'title': 'ב'})
+        with open(self.path('notes.txt'), 'w') as f:
+            f.write('not audio')
+        buffer.stage(self.path('notes.txt'), {'title': 'ג'})
+
+        report = buffer.flush()
+        self.assertEqual(report, {'files_saved': 1, 'files_failed': 1, 'files_missing': 1,
+                                  'staged_writes': 3, 'rewrites_avoided': 0})
+        # flush מרוקן את המאגר גם כשחלק מהקבצים נכשלו
+        self.assertEqual(buffer.flush()['files_saved'], 0)
+
+    def test_discard(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path('0.mp3'), {'title': 'א'})
+        buffer.stage_frames(self.path('0.mp3'), [TCON(encoding=3, text='Rock')])
+        buffer.stage(self.path('1.mp3'), {'title': 'ב'})
+        buffer.discard(self.path('0.mp3'))
+        buffer.discard(self.path('2.mp3'))
+
+        self.assertEqual(buffer.ordered_paths(), [self.path('1.mp3')])
+        self.assertEqual(buffer.flush()['files_saved'], 1)
+        self.assertEqual(str(ID3(self.path('0.mp3'))['TIT2']), 'שיר 0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+כתיבת תגיות עם ריפוד (padding) - בלי לשכתב את כל הקובץ.
+
+mutagen rewrites the whole file whenever a tag no longer fits in the
+space the old tag and its padding used. Hebrew UTF-16 values from a
+jibrish fix are often longer than the old latin-1 ones, so a 10 MB MP3
+gets copied just to change the title.
+
+- padding_policy(): a mutagen padding callback that always reuses the
+  existing padding and, when a rewrite can't be avoided, reserves
+  PADDING_RESERVE bytes so the next edits fit in place.
+- would_rewrite(): dry run - tells if saving a loaded file would need a
+  full rewrite, without writing anything.
+- repad_library(): optional bulk pass that restores headroom.
+
+    python tag_padding.py <music folder> [--repad] [--dry-run]
+"""
+
+import os
+import argparse
+from lazy_import import lazy_callable
+
+File = lazy_callable('mutagen', 'File')
+
+PADDING_RESERVE = 8 * 1024  # מקום פנוי שנשאר אחרי שכתוב מלא
+MIN_HEADROOM = 1024  # פחות מזה - הקובץ מועמד לריפוד מחדש
+MAX_PADDING = 1024 * 1024  # ריפוד גדול מזה מקוצץ בשכתוב הבא
+PADDED_EXTENSIONS = {'.mp3', '.flac'}
+
+
+def padding_policy(info):
+    """
+    mutagen padding callback.
+    Keeps whatever padding is left (so the header is rewritten in place)
+    and reserves PADDING_RESERVE bytes when the tag has to grow.
+    """
+    if 0 <= info.padding <= MAX_PADDING:
+        return info.padding
+    return PADDING_RESERVE
+
+
+class _ProbeDone(Exception):
+    """Stops mutagen before it writes anything."""
+
+
+def tag_headroom(audio):
+    """
+    Return the padding that would be left if the loaded mutagen object were
+    saved now (negative means the file would be rewritten). Nothing is written:
+    mutagen asks for padding before it touches the file, and the probe aborts there.
+    """
+    result = {}
+
+    def probe(info):
+        result['padding'] = info.padding
+        raise _ProbeDone()
+
+    try:
+        audio.save(padding=probe)
+    except _ProbeDone:
+        pass
+    return result.get('padding')
+
+
+def would_rewrite(audio):
+    """True if saving the loaded (and modified) mutagen object rewrites the whole file."""
+    headroom = tag_headroom(audio)
+    return headroom is not None and headroom < 0
+
+
+def rewrite_report(tag_buffer):
+    """
+    List the files in a TagBuffer whose staged changes would force a full
+    rewrite. Returns a list of (path, file size) tuples.
+    """
+    rewrites = []
+    for file_path in tag_buffer.ordered_paths():
+        try:
+            audio = tag_buffer.apply(file_path)
+            if would_rewrite(audio):
+                rewrites.append((file_path, os.path.getsize(file_path)))
+        except Exception as e:
+            print(f"Error checking padding for {file_path}: {e}")
+
+    total = sum(size for _, size in rewrites)
+    for file_path, size in rewrites:
+        print(f"Full rewrite ({size / 1024 / 1024:.1f} MB): {file_path}")
+    print(f"{len(rewrites)} of {len(tag_buffer)} files need a full rewrite ({total / 1024 / 1024:.1f} MB).")
+    return rewrites
+
+
+def repad_library(root_dir, min_headroom=MIN_HEADROOM, dry_run=False):
+    """
+    Give every MP3/FLAC under root_dir with less than min_headroom bytes
+    of padding a PADDING_RESERVE sized padding. This costs one full rewrite
+    per file now, so later tag edits are done in place.
+    """
+    repadded = []
+    bytes_rewritten = 0
+    for root, dirs, files in os.walk(root_dir):
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() not in PADDED_EXTENSIONS:
+                continue
+            file_path = os.path.join(root, file)
+            try:
+                audio = File(file_path)
+                if audio is None:
+                    continue
+                if audio.tags is None:
+                    audio.add_tags()
+                headroom = tag_headroom(audio)
+                if headroom is None or headroom >= min_headroom:
+                    continue
+                if not dry_run:
+                    audio.save(padding=lambda info: PADDING_RESERVE)
+                repadded.append(file_path)
+                bytes_rewritten += os.path.getsize(file_path)
+                print(f"{'Would re-pad' if dry_run else 'Re-padded'} ({headroom} bytes free): {file_path}")
+            except Exception as e:
+                print(f"Error re-padding {file_path}: {e}")
+
+    print(f"Files {'to re-pad' if dry_run else 're-padded'}: {len(repadded)} ({bytes_rewritten / 1024 / 1024:.1f} MB)")
+    return repadded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and restore tag padding")
+    parser.add_argument('root_dir', help="music folder")
+    parser.add_argument('--repad', action='store_true', help="re-pad files with too little headroom")
+    parser.add_argument('--dry-run', action='store_true', help="only list the files")
+    parser.add_argument('--min-headroom', type=int, default=MIN_HEADROOM)
+    args = parser.parse_args()
+
+    repad_library(args.root_dir, args.min_headroom, dry_run=args.dry_run or not args.repad)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# test_tag_padding.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen import File
+from mutagen.id3 import ID3, TIT2
+
+from tag_buffer import TagBuffer
+from tag_padding import PADDING_RESERVE, padding_policy, tag_headroom, would_rewrite, repad_library
+
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+
+
+class TestTagPadding(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'song.mp3')
+        with open(self.path, 'wb') as f:
+            f.write(MP3_FRAME * 50)
+        tags = ID3()
+        tags.add(TIT2(encoding=0, text='\xf9\xe9\xf8'))  # ג'יבריש קצר
+        tags.save(self.path, padding=lambda info: 0)  # בלי ריפוד בכלל
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_probe_does_not_write(self):
+        # בדיקה יבשה - הקובץ לא משתנה
+        with open(self.path, 'rb') as f:
+            before = f.read()
+        audio = File(self.path, easy=True)
+        audio['title'] = 'שיר ארוך בהרבה בקידוד UTF-16'
+        self.assertTrue(would_rewrite(audio))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+
+    def test_rewrite_reserves_padding_then_edits_in_place(self):
+        audio = File(self.path, easy=True)
+        audio['title'] = 'שיר'
+        audio.save(padding=padding_policy)
+        self.assertEqual(tag_headroom(File(self.path)), PADDING_RESERVE)
+        size = os.path.getsize(self.path)
+
+        # עריכה נוספת נכנסת בריפוד הקיים
+        audio = File(self.path, easy=True)
+        audio['title'] = 'שיר עם כותרת ארוכה יותר'
+        self.assertFalse(would_rewrite(audio))
+        audio.save(padding=padding_policy)
+        self.assertEqual(os.path.getsize(self.path), size)
+
+    def test_buffer_rewrite_report(self):
+        buffer = TagBuffer()
+        buffer.stage(self.path, {'title': 'שיר ארוך בהרבה בקידוד UTF-16'})
+        self.assertEqual([path for path, _ in buffer.rewrite_report()], [self.path])
+
+    def test_repad_library(self):
+        self.assertEqual(repad_library(self.folder, dry_run=True), [self.path])
+        self.assertLess(tag_headroom(File(self.path)), 1024)
+        repad_library(self.folder)
+        self.assertEqual(tag_headroom(File(self.path)), PADDING_RESERVE)
+        self.assertEqual(repad_library(self.folder, dry_run=True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,386 @@
+"""
+קורא תגיות רזה עבור סריקות.
+
+Reads only what a scan needs (artist, album, title, track number,
+bitrate and duration) straight from the file bytes:
+
+- MP3: the ID3v2 tag region, the last 128 bytes (ID3v1) and the first
+  MPEG frame header (plus its Xing/Info header, if any).
+- FLAC: the metadata blocks (STREAMINFO and VORBIS_COMMENT).
+
+Anything unusual (unsynchronised or compressed frames, stacked tags,
+VBRI headers, other formats) makes read_tags() return None, and the
+caller should fall back to mutagen.
+"""
+
+import os
+import re
+import struct
+
+LEAN_EXTENSIONS = {'.mp3', '.flac'}
+
+# ID3v2 frame id -> easy key, per tag version
+ID3_FRAMES = {
+    2: {b'TT2': 'title', b'TP1': 'artist', b'TAL': 'album', b'TRK': 'tracknumber'},
+    3: {b'TIT2': 'title', b'TPE1': 'artist', b'TALB': 'album', b'TRCK': 'tracknumber'},
+    4: {b'TIT2': 'title', b'TPE1': 'artist', b'TALB': 'album', b'TRCK': 'tracknumber'},
+}
+
+VORBIS_KEYS = {'title', 'artist', 'album', 'tracknumber'}
+
+# (version, layer) -> kbps, index 0 is "free" and 15 is invalid
+MPEG_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MPEG_BITRATES[(2, 3)] = MPEG_BITRATES[(2, 2)]
+for _layer in (1, 2, 3):
+    MPEG_BITRATES[(2.5, _layer)] = MPEG_BITRATES[(2, _layer)]
+
+MPEG_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+LAME_VERSION = re.compile(rb'(?:LAME|L)(\d)\.?(\d+)')
+
+# how much audio to read after the tag when looking for frame headers
+FRAME_PROBE_SIZE = 8192
+MIN_FRAMES = 2
+ENOUGH_FRAMES = 4
+
+
+class UnusualFile(Exception):
+    """Raised internally when a file should be handed to mutagen."""
+
+
+def read_tags(filepath):
+    """
+    Read artist, album, title, track number, bitrate and duration without mutagen.
+
+    Returns a dict shaped like FolderComparer.extract_metadata() output
+    (bitrate in kbps), or None if the file needs the mutagen fallback.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in LEAN_EXTENSIONS:
+        return None
+    try:
+        with open(filepath, 'rb') as f:
+            if ext == '.mp3':
+                return _read_mp3(f)
+            return _read_flac(f)
+    except (OSError, UnusualFile, struct.error, UnicodeDecodeError, IndexError, KeyError, ValueError):
+        return None
+
+
+# --------------------------- MP3 --------------------------- #
+
+def _syncsafe(data):
+    """Decode a 4 byte syncsafe integer."""
+    if any(b & 0x80 for b in data):
+        raise UnusualFile("invalid syncsafe integer")
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_text_frame(payload):
+    """Decode the first value of an ID3v2 text frame."""
+    if not payload:
+        return None
+    encoding, data = payload[0], payload[1:]
+    if encoding == 0:
+        text = data.decode('latin-1')
+    elif encoding == 1:
+        text = data.decode('utf-16')
+    elif encoding == 2:
+        text = data.decode('utf-16-be')
+    elif encoding == 3:
+        text = data.decode('utf-8')
+    else:
+        raise UnusualFile("unknown text encoding")
+    value = text.split('\x00')[0]
+    return value or None
+
+
+def _parse_id3v2(f):
+    """
+    Parse the ID3v2 tag at the start of the file.
+
+    Returns (fields, audio_offset). fields is empty and audio_offset is 0
+    if there is no tag.
+    """
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return {}, 0
+
+    version, flags = header[3], header[5]
+    if version not in ID3_FRAMES:
+        raise UnusualFile("unsupported ID3v2 version")
+    # tag-level unsynchronisation or the v2.2 compression bit
+    if flags & 0x80 or (version == 2 and flags & 0x40):
+        raise UnusualFile("unsynchronised ID3v2 tag")
+
+    tag_size = _syncsafe(header[6:10])
+    audio_offset = 10 + tag_size + (10 if version == 4 and flags & 0x10 else 0)
+    data = f.read(tag_size)
+    if len(data) < tag_size:
+        raise UnusualFile("truncated ID3v2 tag")
+
+    pos = 0
+    if version >= 3 and flags & 0x40:
+        if version == 3:
+            pos = 4 + struct.unpack('>I', data[:4])[0]
+        else:
+            pos = _syncsafe(data[:4])
+
+    frames = ID3_FRAMES[version]
+    id_len, header_len = (3, 6) if version == 2 else (4, 10)
+    fields = {}
+    while pos + header_len <= len(data):
+        frame_id = data[pos:pos + id_len]
+        if frame_id[0] == 0:
+            break  # padding
+        if not all(48 <= c <= 57 or 65 <= c <= 90 for c in frame_id):
+            raise UnusualFile("invalid frame id")
+
+        if version == 2:
+            size = int.from_bytes(data[pos + 3:pos + 6], 'big')
+            frame_flags = 0
+        elif version == 3:
+            size = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+            frame_flags = struct.unpack('>H', data[pos + 8:pos + 10])[0]
+        else:
+            size = _syncsafe(data[pos + 4:pos + 8])
+            frame_flags = struct.unpack('>H', data[pos + 8:pos + 10])[0]
+
+        start = pos + header_len
+        end = start + size
+        if end > len(data):
+            raise UnusualFile("frame overruns tag")
+        pos = end
+
+        key = frames.get(frame_id)
+        if key is None or key in fields:
+            continue
+
+        # compressed, encrypted or unsynchronised frames go to mutagen
+        if version == 3:
+            if frame_flags & 0x00C0:
+                raise UnusualFile("compressed or encrypted frame")
+            if frame_flags & 0x0020:
+                start += 1
+        elif version == 4:
+            if frame_flags & 0x000E:
+                raise UnusualFile("compressed, encrypted or unsynchronised frame")
+            if frame_flags & 0x0040:
+                start += 1
+            if frame_flags & 0x0001:
+                start += 4
+
+        value = _decode_text_frame(data[start:end])
+        if value is not None:
+            fields[key] = value
+
+    # WMP stacks several tags, mutagen knows how to skip those
+    f.seek(audio_offset)
+    if f.read(3) == b'ID3':
+        raise UnusualFile("stacked ID3v2 tags")
+
+    return fields, audio_offset
+
+
+def _parse_id3v1(f):
+    """Parse the ID3v1 tag in the last 128 bytes, the way mutagen does."""
+    try:
+        f.seek(-128, 2)
+    except OSError:
+        return {}
+    data = f.read(128)
+    if data[:3] != b'TAG':
+        return {}
+
+    def fix(raw):
+        return raw.split(b'\x00')[0].strip().decode('latin-1')
+
+    comment = data[97:127]
+    fields = {
+        'title': fix(data[3:33]),
+        'artist': fix(data[33:63]),
+        'album': fix(data[63:93]),
+    }
+    if comment[-2] == 0 and comment[-1]:
+        fields['tracknumber'] = str(comment[-1])
+    return {key: value for key, value in fields.items() if value}
+
+
+def _parse_frame_header(data, offset):
+    """
+    Parse an MPEG audio frame header.
+
+    Returns (version, layer, bitrate, sample_rate, mode, frame_size,
+    frame_length) or None if the bytes are not a valid header.
+    """
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack('>I', data[offset:offset + 4])[0]
+    if header >> 21 != 0x7FF:
+        return None
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    padding = (header >> 9) & 0x1
+    mode = (header >> 6) & 0x3
+    if version_bits == 1 or layer_bits == 0 or rate_index == 3 or bitrate_index in (0, 15):
+        return None
+
+    version = [2.5, None, 2, 1][version_bits]
+    layer = 4 - layer_bits
+    bitrate = MPEG_BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+
+    if layer == 1:
+        frame_size, slot = 384, 4
+    elif version >= 2 and layer == 3:
+        frame_size, slot = 576, 1
+    else:
+        frame_size, slot = 1152, 1
+    frame_length = ((frame_size // 8 * bitrate) // sample_rate + padding) * slot
+    return version, layer, bitrate, sample_rate, mode, frame_size, frame_length
+
+
+def _xing_offset(version, mode):
+    """Offset of the Xing/Info header from the start of the first frame."""
+    mono = mode == 3
+    if version == 1:
+        return 4 + (17 if mono else 32)
+    return 4 + (9 if mono else 17)
+
+
+def _lame_samples(data, pos):
+    """Encoder delay + padding (samples) from a LAME tag at pos, the way mutagen reads it."""
+    tag = data[pos:pos + 36]
+    if len(tag) < 36 or not tag.startswith((b'LAME', b'L3.99')):
+        return 0
+    match = LAME_VERSION.match(tag)
+    if match is None or (int(match.group(1)), int(match.group(2))) <= (3, 90):
+        raise UnusualFile("old or unknown LAME version")
+    if tag[9] >> 4 != 0:
+        return 0  # גרסת כותרת מורחבת לא מוכרת - mutagen מתעלם ממנה
+    delay = (tag[21] << 4) | (tag[22] >> 4)
+    padding = ((tag[22] & 0x0F) << 8) | tag[23]
+    return delay + padding
+
+
+def _mpeg_stream_info(f, audio_offset):
+    """Read the bitrate (bps) and length (seconds) from the first MPEG frame after the tag."""
+    f.seek(audio_offset)
+    data = f.read(FRAME_PROBE_SIZE)
+    first = _parse_frame_header(data, 0)
+    if first is None:
+        raise UnusualFile("no MPEG sync at audio start")
+    version, layer, bitrate, sample_rate, mode, frame_size, frame_length = first
+
+    if layer == 3:
+        xing = _xing_offset(version, mode)
+        marker = data[xing:xing + 4]
+        if marker in (b'Xing', b'Info'):
+            flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+            if not (flags & 0x1 and flags & 0x2):
+                raise UnusualFile("Xing header without frame and byte counts")
+            frames, total_bytes = struct.unpack('>II', data[xing + 8:xing + 16])
+            samples = frame_size * frames
+            if samples <= 0:
+                raise UnusualFile("empty Xing header")
+            audio_bytes = max(0, total_bytes - frame_length)
+            bitrate = int(round(audio_bytes * 8 * sample_rate / float(samples)))
+            lame_pos = xing + 16 + (100 if flags & 0x4 else 0) + (4 if flags & 0x8 else 0)
+            samples = max(samples - _lame_samples(data, lame_pos), 0)
+            return bitrate, samples / float(sample_rate)
+        if data[36:40] == b'VBRI':
+            raise UnusualFile("VBRI header")
+
+    # without a VBR header mutagen wants several consistent frames
+    frames_seen = 1
+    offset = frame_length
+    while frames_seen < ENOUGH_FRAMES and _parse_frame_header(data, offset):
+        offset += _parse_frame_header(data, offset)[6]
+        frames_seen += 1
+    if frames_seen < MIN_FRAMES:
+        raise UnusualFile("could not confirm MPEG sync")
+    # CBR: מתוך גודל הקובץ, כמו mutagen (כולל תג ID3v1 אם יש)
+    f.seek(0, 2)
+    return bitrate, 8 * (f.tell() - audio_offset) / float(bitrate)
+
+
+def _read_mp3(f):
+    fields, audio_offset = _parse_id3v2(f)
+    for key, value in _parse_id3v1(f).items():
+        fields.setdefault(key, value)
+    bitrate, length = _mpeg_stream_info(f, audio_offset)
+    fields['bitrate'] = bitrate // 1000
+    if length > 0:
+        fields['duration'] = round(length, 2)
+    return fields
+
+
+# --------------------------- FLAC --------------------------- #
+
+def _read_flac(f):
+    if f.read(4) != b'fLaC':
+        raise UnusualFile("not a bare FLAC stream")
+
+    fields = {}
+    length = None
+    last = False
+    while not last:
+        block_header = f.read(4)
+        if len(block_header) < 4:
+            raise UnusualFile("truncated metadata block")
+        last = bool(block_header[0] & 0x80)
+        block_type = block_header[0] & 0x7F
+        size = int.from_bytes(block_header[1:4], 'big')
+
+        if block_type == 0:
+            info = f.read(size)
+            sample_rate = int.from_bytes(info[10:13], 'big') >> 4
+            total_samples = int.from_bytes(info[13:18], 'big') & 0xFFFFFFFFF
+            length = total_samples / float(sample_rate) if sample_rate else 0.0
+        elif block_type == 4:
+            _parse_vorbis_comment(f.read(size), fields)
+        elif block_type == 127:
+            raise UnusualFile("invalid metadata block")
+        else:
+            f.seek(size, 1)
+
+    if length is None:
+        raise UnusualFile("missing STREAMINFO")
+
+    # mutagen counts everything after the metadata blocks as audio
+    start = f.tell()
+    f.seek(0, 2)
+    bitrate = int((f.tell() - start) * 8 / length) if length else 0
+    fields['bitrate'] = bitrate // 1000
+    if length > 0:
+        fields['duration'] = round(length, 2)
+    return fields
+
+
+def _parse_vorbis_comment(data, fields):
+    """Fill fields from a VORBIS_COMMENT block (little endian lengths)."""
+    vendor_length = struct.unpack('<I', data[:4])[0]
+    pos = 4 + vendor_length
+    count = struct.unpack('<I', data[pos:pos + 4])[0]
+    pos += 4
+    for _ in range(count):
+        comment_length = struct.unpack('<I', data[pos:pos + 4])[0]
+        pos += 4
+        comment = data[pos:pos + comment_length].decode('utf-8', 'replace')
+        pos += comment_length
+        key, sep, value = comment.partition('=')
+        key = key.lower()
+        if sep and key in VORBIS_KEYS and key not in fields:
+            fields[key] = value
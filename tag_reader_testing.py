@@ -0,0 +1,98 @@
+# test_tag_reader.py
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from mutagen import File
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, TRCK
+
+from tag_reader import read_tags
+
+# MPEG1 Layer III, 128 kbps, 44.1 kHz
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+
+
+def mutagen_fields(path):
+    audio = File(path, easy=True)
+    fields = {key: audio.get(key, [None])[0] for key in ('artist', 'album', 'title', 'tracknumber') if key in audio}
+    fields['bitrate'] = audio.info.bitrate // 1000
+    if audio.info.length > 0:
+        fields['duration'] = round(audio.info.length, 2)
+    return fields
+
+
+class TestReadTags(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def make_mp3(self, name, frames=20, v2_version=4, payload=None):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(payload if payload is not None else MP3_FRAME * frames)
+        tags = ID3()
+        tags.add(TIT2(encoding=1, text='שיר ראשון'))
+        tags.add(TPE1(encoding=0, text='\xee\xf9\xe4'))  # ג'יבריש - נשמר כמו ש-mutagen קורא
+        tags.add(TALB(encoding=3, text='אלבום'))
+        tags.add(TRCK(encoding=3, text='3/12'))
+        tags.save(path, v2_version=v2_version)
+        return path
+
+    def test_id3v24_matches_mutagen(self):
+        path = self.make_mp3('a.mp3')
+        self.assertEqual(read_tags(path), mutagen_fields(path))
+
+    def test_id3v23_matches_mutagen(self):
+        path = self.make_mp3('b.mp3', v2_version=3)
+        self.assertEqual(read_tags(path), mutagen_fields(path))
+
+    def test_id3v1_fills_missing_fields(self):
+        # קובץ עם ID3v1 בלבד
+        path = os.path.join(self.folder, 'c.mp3')
+        v1 = b'TAG' + b'Title'.ljust(30, b'\x00') + b'Artist'.ljust(30, b'\x00') + \
+            b'Album'.ljust(30, b'\x00') + b'2020' + b'\x00' * 28 + b'\x00\x07' + b'\x0d'
+        with open(path, 'wb') as f:
+            f.write(MP3_FRAME * 20 + v1)
+        tags = read_tags(path)
+        self.assertEqual(tags, mutagen_fields(path))
+        self.assertEqual(tags['tracknumber'], '7')
+
+    def test_xing_bitrate_matches_mutagen(self):
+        # פריים ראשון עם כותרת Xing עבור קובץ VBR
+        xing = b'Xing' + struct.pack('>III', 0x3, 19, 417 * 20)
+        first = MP3_FRAME[:36] + xing + MP3_FRAME[36 + len(xing):]
+        path = self.make_mp3('d.mp3', payload=first + MP3_FRAME * 19)
+        self.assertEqual(read_tags(path), mutagen_fields(path))
+
+    def test_lame_delay_matches_mutagen(self):
+        # תג LAME אחרי Xing: עיכוב 576 ו-1000 דגימות ריפוד יורדים מהמשך
+        lame = b'LAME3.100' + b'\x00' * 12 + bytes([576 >> 4, ((576 & 0xF) << 4) | (1000 >> 8), 1000 & 0xFF]) + b'\x00' * 12
+        xing = b'Xing' + struct.pack('>III', 0x3, 19, 417 * 20) + lame
+        first = MP3_FRAME[:36] + xing + MP3_FRAME[36 + len(xing):]
+        path = self.make_mp3('g.mp3', payload=first + MP3_FRAME * 19)
+        tags = read_tags(path)
+        self.assertEqual(tags, mutagen_fields(path))
+        self.assertEqual(tags['duration'], round((19 * 1152 - 1576) / 44100.0, 2))
+
+    def test_unusual_files_fall_back(self):
+        # סיומת לא נתמכת, קובץ חסר וקובץ ללא סנכרון MPEG
+        self.assertIsNone(read_tags(os.path.join(self.folder, 'song.m4a')))
+        self.assertIsNone(read_tags(os.path.join(self.folder, 'missing.mp3')))
+        path = self.make_mp3('e.mp3', payload=b'\x00' * 5000)
+        self.assertIsNone(read_tags(path))
+
+    def test_unsynchronised_tag_falls_back(self):
+        path = self.make_mp3('f.mp3')
+        with open(path, 'r+b') as f:
+            f.seek(5)
+            f.write(b'\x80')
+        self.assertIsNone(read_tags(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+מעקב ריצה - קובץ Chrome trace / Perfetto עם span לכל תיקייה, קובץ וזוג.
+
+Opt-in: RunMetrics(tracer=Tracer()) turns every metrics.stage() block
+into a span as well, with its arguments (folder, file, pair), so a slow
+run shows which folders and files took the time. Without a tracer the
+stages cost what they cost before. A span is kept as a tuple and only
+turned into a trace event in save(). Open the file in chrome://tracing
+or https://ui.perfetto.dev.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Tracer:
+    def __init__(self, category='music_automatic'):
+        self.category = category
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, start, end, args=None):
+        """Record a finished span; start and end are time.perf_counter() values."""
+        self.spans.append((name, start, end, threading.get_ident(), args))
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), args)
+
+    def events(self):
+        """The spans as Chrome trace 'complete' events (times in microseconds)."""
+        threads = {}
+        events = []
+        for name, start, end, thread_id, args in self.spans:
+            # מזהי שרשור קטנים וקבועים - קל יותר לקרוא בציר הזמן
+            tid = threads.setdefault(thread_id, len(threads) + 1)
+            event = {'name': name, 'cat': self.category, 'ph': 'X', 'pid': self.pid, 'tid': tid,
+                     'ts': round((start - self.origin) * 1e6, 3), 'dur': round((end - start) * 1e6, 3)}
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            events.append(event)
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                       'args': {'name': 'main' if tid == 1 else f"worker {tid}"}}
+                      for tid in threads.values())
+        return events
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
@@ -0,0 +1,67 @@
+# test_tracing.py
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from tracing import Tracer
+from run_metrics import RunMetrics
+from find_duplic_albums import FolderComparer
+
+from library_generator import generate_library
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_spans_become_complete_events(self):
+        tracer = Tracer()
+        with tracer.span('outer', folder='/music/אלבום'):
+            with tracer.span('inner'):
+                pass
+        worker = threading.Thread(target=lambda: tracer.add('pair', tracer.origin, tracer.origin + 0.5))
+        worker.start()
+        worker.join()
+
+        path = os.path.join(self.test_dir, 'trace.json')
+        tracer.save(path)
+        with open(path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        spans = {event['name']: event for event in events if event['ph'] == 'X'}
+        self.assertEqual(spans['outer']['args'], {'folder': '/music/אלבום'})
+        self.assertNotIn('args', spans['inner'])
+        self.assertLessEqual(spans['outer']['ts'], spans['inner']['ts'])
+        self.assertGreaterEqual(spans['outer']['dur'], spans['inner']['dur'])
+        self.assertEqual(spans['pair']['dur'], 500000)
+        self.assertEqual(spans['outer']['tid'], 1)
+        self.assertEqual(spans['pair']['tid'], 2)
+        self.assertEqual(len([event for event in events if event['ph'] == 'M']), 2)
+
+    def test_metrics_stages_are_traced(self):
+        root = os.path.join(self.test_dir, 'library')
+        generate_library(root, folders=4, tracks=3, duplicate_rate=0.5, flac_rate=0.0, seed=7)
+        tracer = Tracer()
+        comparer = FolderComparer([root], 'high', metrics=RunMetrics(tracer))
+        with patch('sys.stdout', new=StringIO()):
+            comparer.get_file_lists()
+            comparer.find_similar_folders()
+
+        names = {}
+        for name, _, _, _, args in tracer.spans:
+            names.setdefault(name, []).append(args)
+        self.assertEqual(sorted(args['path'] for args in names['folder']), sorted(comparer.folder_files))
+        self.assertTrue(all(args['path'].endswith('.mp3') for args in names['hash']))
+        self.assertTrue(all(set(args) == {'folder', 'other'} for args in names.get('scoring', [])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+עמודות מאפיינים - מערך NumPy לכל מאפיין של רצועה, וצבירה לפי תיקייה.
+
+FeatureTable reads folder_files once and keeps one contiguous array per
+numeric feature: bitrate, duration, lossless, hebrew, jibrish, complete
+(title, artist and album present and not jibrish), lyrics, the ids of
+the artist and album tags, and the folder id of each track. Folder
+aggregates - average bitrate, the quality ratios - are then group-by
+reductions over folder_id (np.bincount) instead of a dict walk per
+folder.
+
+The flags follow compute_folder_quality: they are read from the tag
+values in 'metadata' as extract_metadata returned them. bitrate is the
+track's 'bitrate', or the one in 'metadata' when a record has no such
+key. A missing bitrate is 0 and a missing duration is NaN.
+"""
+
+from lazy_import import lazy_module, lazy_callable
+
+np = lazy_module('numpy')
+check_jibrish = lazy_callable('jibrish_to_hebrew', 'check_jibrish')
+
+LOSSLESS_EXTENSIONS = {'.flac', '.wav'}
+
+
+def contains_hebrew(text):
+    """Check if the text contains Hebrew characters."""
+    return any('\u0590' <= c <= '\u05EA' for c in text)
+
+
+class FeatureTable:
+    FLAGS = ('lossless', 'hebrew', 'jibrish', 'complete', 'lyrics')
+
+    def __init__(self, folders, bitrate, duration, lossless, hebrew, jibrish, complete, lyrics, artist_id, album_id, folder_id):
+        self.folders = folders
+        self.folder_index = {folder: index for index, folder in enumerate(folders)}
+        self.bitrate = bitrate
+        self.duration = duration
+        self.lossless = lossless
+        self.hebrew = hebrew
+        self.jibrish = jibrish
+        self.complete = complete
+        self.lyrics = lyrics
+        self.artist_id = artist_id
+        self.album_id = album_id
+        self.folder_id = folder_id
+
+    @classmethod
+    def from_folder_files(cls, folder_files, lossless_extensions=LOSSLESS_EXTENSIONS):
+        folders = list(folder_files)
+        columns = {name: [] for name in ('bitrate', 'duration', 'artist_id', 'album_id', 'folder_id') + cls.FLAGS}
+        # אמן ואלבום חוזרים בכל רצועה - בדיקת עברית וג'יבריש פעם אחת לכל מחרוזת
+        text_flags = {}
+        tag_ids = {}
+
+        def flags(text):
+            if text not in text_flags:
+                text_flags[text] = (contains_hebrew(text), check_jibrish(text))
+            return text_flags[text]
+
+        for folder_id, folder_data in enumerate(folder_files.values()):
+            for file_info in folder_data['files']:
+                metadata = file_info.get('metadata', {})
+                tags = [metadata.get('title'), metadata.get('artist'), metadata.get('album')]
+                tag_flags = [flags(tag) for tag in tags if tag]
+                bitrate = file_info['bitrate'] if 'bitrate' in file_info else metadata.get('bitrate')
+                duration = file_info.get('duration')
+
+                columns['bitrate'].append(bitrate or 0)
+                columns['duration'].append(duration if duration is not None else np.nan)
+                columns['lossless'].append(file_info.get('extension') in lossless_extensions)
+                columns['hebrew'].append(any(hebrew for hebrew, _ in tag_flags))
+                columns['jibrish'].append(any(jibrish for _, jibrish in tag_flags))
+                columns['complete'].append(len(tag_flags) == 3 and not any(jibrish for _, jibrish in tag_flags))
+                columns['lyrics'].append('lyrics' in metadata)
+                columns['artist_id'].append(tag_ids.setdefault(tags[1], len(tag_ids)) if tags[1] else -1)
+                columns['album_id'].append(tag_ids.setdefault(tags[2], len(tag_ids)) if tags[2] else -1)
+                columns['folder_id'].append(folder_id)
+
+        return cls(
+            folders,
+            bitrate=np.array(columns['bitrate'], dtype=np.float64),
+            duration=np.array(columns['duration'], dtype=np.float64),
+            artist_id=np.array(columns['artist_id'], dtype=np.int64),
+            album_id=np.array(columns['album_id'], dtype=np.int64),
+            folder_id=np.array(columns['folder_id'], dtype=np.int64),
+            **{flag: np.array(columns[flag], dtype=bool) for flag in cls.FLAGS}
+        )
+
+    def __len__(self):
+        return len(self.folder_id)
+
+    def group_sum(self, values, mask=None):
+        """Per folder sum of a column (booleans count)."""
+        folder_id = self.folder_id if mask is None else self.folder_id[mask]
+        values = values if mask is None else values[mask]
+        return np.bincount(folder_id, weights=values.astype(np.float64), minlength=len(self.folders))
+
+    def counts(self):
+        return np.bincount(self.folder_id, minlength=len(self.folders)).astype(np.float64)
+
+    def ratio(self, values):
+        """Per folder sum of a column divided by the number of tracks (0 for an empty folder)."""
+        counts = self.counts()
+        return np.divide(self.group_sum(values), counts, out=np.zeros(len(self.folders)), where=counts > 0)
+
+    def average_bitrate(self):
+        """Per folder mean of the known bitrates, 0 when none is known (MergeFolders.get_average_bitrate)."""
+        known = self.bitrate > 0
+        totals = self.group_sum(self.bitrate, known)
+        counts = np.bincount(self.folder_id[known], minlength=len(self.folders))
+        return np.divide(totals, counts, out=np.zeros(len(self.folders)), where=counts > 0)
+
+    def distinct(self, ids):
+        """Per folder number of different ids, ignoring -1 (missing tag)."""
+        present = ids >= 0
+        pairs = np.unique(np.stack([self.folder_id[present], ids[present]]), axis=1)
+        return np.bincount(pairs[0], minlength=len(self.folders))
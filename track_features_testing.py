@@ -0,0 +1,66 @@
+# test_track_features.py
+import unittest
+
+import numpy as np
+
+from track_features import FeatureTable
+from track_records import TrackRecord
+from find_duplic_albums import SelectQuality, MergeFolders
+
+
+def track(title='שיר', artist='אמן', album='אלבום', bitrate=320, extension='.mp3', **extra):
+    metadata = {key: value for key, value in (('title', title), ('artist', artist), ('album', album)) if value}
+    metadata.update(bitrate=bitrate, **extra)
+    return TrackRecord('x' + extension, artist, album, title, bitrate, 200.0, metadata, None, extension)
+
+
+class TestFeatureTable(unittest.TestCase):
+
+    def setUp(self):
+        self.folder_files = {
+            '/a': {'files': [track(extension='.flac', lyrics='...'), track(bitrate=None)]},
+            '/b': {'files': [track(title='Song', artist='Artist', album='Album', bitrate=128),
+                             track(title='àìáåí', artist='Other', album='Album', bitrate=128)]},
+            '/empty': {'files': []},
+        }
+        self.table = FeatureTable.from_folder_files(self.folder_files)
+
+    def test_columns(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(self.table.folder_id.tolist(), [0, 0, 1, 1])
+        self.assertEqual(self.table.bitrate.tolist(), [320, 0, 128, 128])
+        self.assertEqual(self.table.lossless.tolist(), [True, False, False, False])
+        self.assertEqual(self.table.hebrew.tolist(), [True, True, False, False])
+        self.assertEqual(self.table.jibrish.tolist(), [False, False, False, True])
+        self.assertEqual(self.table.complete.tolist(), [True, True, True, False])
+        self.assertEqual(self.table.lyrics.tolist(), [True, False, False, False])
+
+    def test_group_by(self):
+        self.assertEqual(self.table.average_bitrate().tolist(), [320.0, 128.0, 0.0])
+        self.assertEqual(self.table.ratio(self.table.bitrate).tolist(), [160.0, 128.0, 0.0])
+        self.assertEqual(self.table.ratio(self.table.hebrew).tolist(), [1.0, 0.0, 0.0])
+        self.assertEqual(self.table.distinct(self.table.artist_id).tolist(), [1, 2, 0])
+        self.assertEqual(self.table.distinct(self.table.album_id).tolist(), [1, 1, 0])
+
+    def test_quality_and_bitrate_match_the_single_folder_path(self):
+        quality = SelectQuality.__new__(SelectQuality)
+        quality.preferred_bitrate = 'high'
+        quality.LOSSLESS_EXTENSIONS = {'.flac', '.wav'}
+        scores = quality.compute_folders_quality(self.folder_files)
+        for folder_path, folder_data in self.folder_files.items():
+            self.assertEqual(scores[folder_path], quality.compute_folder_quality(folder_path, folder_data))
+        self.assertIsInstance(scores['/a'][0], float)
+        self.assertEqual(scores['/empty'][1]['Bitrate Score'], 0.0)
+
+        merger = MergeFolders({}, self.folder_files, 'high', [])
+        self.assertEqual(merger.average_bitrates(), {'/a': 320.0, '/b': 128.0, '/empty': 0.0})
+        self.assertEqual(merger.get_average_bitrate(self.folder_files['/b']), 128.0)
+        # כמו בטבלה: קצב מתוך metadata כשאין מפתח 'bitrate', ו-0 כשאף קצב אינו ידוע
+        self.assertEqual(merger.get_average_bitrate({'files': [{'metadata': {'bitrate': 192}}, {'bitrate': None}]}), 192.0)
+        self.assertEqual(merger.get_average_bitrate(self.folder_files['/empty']), 0.0)
+        self.assertEqual(merger.decide_preferred_folder('/b', '/a', 90.0, 10.0), ('/a', '/b'))
+        self.assertTrue(np.isnan(FeatureTable.from_folder_files({'/c': {'files': [{'metadata': {}}]}}).duration[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
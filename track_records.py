@@ -0,0 +1,113 @@
+"""
+רשומות קומפקטיות ל-folder_files - __slots__, מחרוזות משותפות ותקציר בינארי.
+
+folder_files used to hold a dict per track plus a second 'metadata' dict
+that repeated the artist, album, title, bitrate and duration, and the
+MD5 as a 32 character hex string. TrackRecord keeps the fields in slots,
+interns the strings that repeat across a library (artist, album,
+extension, tag names and values such as genre), keeps the MD5 as its
+16 raw bytes, and stores from the metadata only what the slots do not
+already hold.
+
+Both records are read-only Mappings with the old keys, so code written
+for the dicts (record['file'], record.get('file_hash'),
+record['metadata']['genre']) works unchanged and plain dicts can still
+be mixed in.
+"""
+
+import sys
+from collections.abc import Mapping
+
+# מפתחות שנשמרים בשדות הרשומה ולא שוב במילון המטא-נתונים
+SHARED_KEYS = ('artist', 'album', 'title', 'bitrate', 'duration')
+
+
+def intern_text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def pack_digest(file_hash):
+    """32 hex characters -> 16 bytes. Anything else is kept as it is."""
+    if isinstance(file_hash, str) and len(file_hash) == 32:
+        try:
+            return bytes.fromhex(file_hash)
+        except ValueError:
+            pass
+    return file_hash
+
+
+class TrackRecord(Mapping):
+    __slots__ = ('file', 'artist', 'album', 'title', 'bitrate', 'duration', 'extension', 'digest', '_shared', '_extra')
+    KEYS = ('file', 'artist', 'album', 'title', 'bitrate', 'duration', 'metadata', 'file_hash', 'extension')
+
+    def __init__(self, file, artist=None, album=None, title=None, bitrate=None, duration=None, metadata=None,
+                 file_hash=None, extension=None):
+        self.file = file
+        self.artist = intern_text(artist)
+        self.album = intern_text(album)
+        self.title = title
+        self.bitrate = bitrate
+        self.duration = duration
+        self.extension = intern_text(extension)
+        self.digest = pack_digest(file_hash)
+
+        # ביט לכל מפתח משותף שערכו במטא-נתונים זהה לשדה; השאר נשמר ב-_extra
+        shared = 0
+        extra = {}
+        for key, value in (metadata or {}).items():
+            if key in SHARED_KEYS and getattr(self, key) == value:
+                shared |= 1 << SHARED_KEYS.index(key)
+            else:
+                extra[sys.intern(key)] = intern_text(value)
+        self._shared = shared
+        self._extra = extra or None
+
+    @property
+    def file_hash(self):
+        return self.digest.hex() if isinstance(self.digest, bytes) else self.digest
+
+    @property
+    def metadata(self):
+        metadata = {key: getattr(self, key) for bit, key in enumerate(SHARED_KEYS) if self._shared >> bit & 1}
+        if self._extra:
+            metadata.update(self._extra)
+        return metadata
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"TrackRecord({dict(self)!r})"
+
+
+class FolderRecord(Mapping):
+    __slots__ = ('files', 'file_similarity', 'title_similarity', 'album_art')
+    KEYS = __slots__
+
+    def __init__(self, files, file_similarity=0.0, title_similarity=0.0, album_art=None):
+        self.files = files
+        self.file_similarity = file_similarity
+        self.title_similarity = title_similarity
+        self.album_art = album_art
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"FolderRecord({dict(self)!r})"
@@ -0,0 +1,64 @@
+# test_track_records.py
+import hashlib
+import unittest
+
+from track_records import TrackRecord, FolderRecord, pack_digest
+
+
+def track_dict(**changes):
+    track = {
+        'file': '01 - שיר.mp3',
+        'artist': 'אברהם פריד',
+        'album': 'אלבום',
+        'title': 'שיר',
+        'bitrate': 320,
+        'duration': 201.5,
+        'metadata': {'title': 'שיר', 'artist': 'àáøäí ôøéã', 'album': 'אלבום', 'genre': 'Pop',
+                     'tracknumber': '1', 'bitrate': 320, 'duration': 201.5},
+        'file_hash': hashlib.md5(b'audio').hexdigest(),
+        'extension': '.mp3',
+    }
+    track.update(changes)
+    return track
+
+
+class TestTrackRecord(unittest.TestCase):
+
+    def test_reads_like_the_dict(self):
+        track = track_dict()
+        record = TrackRecord(**track)
+        self.assertEqual(dict(record), track)
+        self.assertEqual(record, track)
+        self.assertEqual(record['file_hash'], track['file_hash'])
+        self.assertEqual(record.get('metadata', {})['genre'], 'Pop')
+        # אמן שתוקן מג'יבריש - הערך המקורי נשמר במטא-נתונים
+        self.assertEqual(record['metadata']['artist'], 'àáøäí ôøéã')
+        self.assertIsNone(record.get('lyrics'))
+        self.assertNotIn('lyrics', record)
+        with self.assertRaises(KeyError):
+            record['lyrics']
+
+    def test_compact_storage(self):
+        record = TrackRecord(**track_dict())
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(len(record.digest), 16)
+        other = TrackRecord(**track_dict(artist=''.join(['אברהם', ' ', 'פריד'])))
+        self.assertIs(record.artist, other.artist)
+
+    def test_missing_and_odd_values(self):
+        record = TrackRecord(**track_dict(file_hash=None, metadata={}, bitrate=None, duration=None))
+        self.assertIsNone(record['file_hash'])
+        self.assertEqual(record['metadata'], {})
+        self.assertEqual(pack_digest('hash1'), 'hash1')
+        self.assertEqual(TrackRecord('a.mp3', file_hash='hash1')['file_hash'], 'hash1')
+
+    def test_folder_record(self):
+        folder = FolderRecord([TrackRecord(**track_dict())], 0.5, 0.25, 'abc')
+        self.assertEqual(folder['title_similarity'], 0.25)
+        self.assertEqual(folder.get('album_art'), 'abc')
+        self.assertEqual(len(folder['files']), 1)
+        self.assertEqual(set(folder), {'files', 'file_similarity', 'title_similarity', 'album_art'})
+
+
+if __name__ == '__main__':
+    unittest.main()